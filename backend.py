@@ -0,0 +1,249 @@
+import os
+import csv
+import time
+from collections import Counter, deque
+from utils import BackgroundInput
+from flowctl import QueueFull
+
+
+class RealClock:
+    """系统时钟: perf_counter + 条件变量超时等待"""
+    now = staticmethod(time.perf_counter)
+    # 本机计时校准结果 (calibration.MachineProfile)，未校准为 None
+    profile = None
+
+    @staticmethod
+    def wait(cond, timeout):
+        cond.wait(timeout)
+
+
+# 真实输入后端 Win32Backend 依赖 pywin32 / keyboard，位于 winbackend.py (仅 Windows，按需导入)
+# 本模块只含时钟与模拟后端，可在任意平台上运行
+
+# 自旋等待时让出 CPU: Linux 上 sleep(0) 受 50µs 定时器松弛影响，优先用 sched_yield (Windows 上 sleep(0) 即 Sleep(0))
+_yield = getattr(os, "sched_yield", None) or (lambda: time.sleep(0))
+
+
+class CalibratedClock(RealClock):
+    """
+    按本机校准结果补偿睡眠超调: 提前 lead 醒来，剩余不超过 spin 的部分让出 CPU 自旋到截止时刻
+    计时粒度粗于自旋上限时剩余部分仍为普通等待 (调用方会循环检查剩余时间)
+    自旋期间释放条件变量，停止信号最多延迟 spin 秒生效
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.lead = profile.lead
+        self.spin = profile.spin
+
+    def wait(self, cond, timeout):
+        if timeout is None:
+            cond.wait()
+        elif timeout > self.lead:
+            cond.wait(timeout - self.lead)
+        elif timeout <= self.spin:
+            end = time.perf_counter() + timeout
+            cond.release()
+            try:
+                while time.perf_counter() < end:
+                    _yield()
+            finally:
+                cond.acquire()
+        else:
+            cond.wait(timeout)
+
+
+class VirtualClock:
+    """虚拟时钟: 等待时直接把时间推进到截止时刻，不真正睡眠 (用于模拟运行)"""
+    profile = None
+
+    def __init__(self, start=0.0):
+        self.t = start
+
+    def now(self):
+        return self.t
+
+    def wait(self, cond, timeout):
+        self.t += timeout
+
+
+class NullBackend:
+    """
+    空输入后端: 不调用任何系统接口，只按时钟记录事件
+    事件为 (时刻, 类型, hwnd, 内容)；类型: send / down / up / char / move / click / text
+    """
+    _VK_NAMES = {vk: name for name, vk in BackgroundInput.VK_MAP.items()}
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.t0 = clock.now()
+        self.events = []
+
+    def _record(self, kind, hwnd, detail):
+        self.events.append((self.clock.now() - self.t0, kind, hwnd, detail))
+
+    @staticmethod
+    def is_window(hwnd):
+        return True
+
+    @staticmethod
+    def client_size(hwnd):
+        return 65535, 65535
+
+    # 模拟探测立即返回 (或推进虚拟时间)，在执行线程同步调用
+    probe_blocks = False
+
+    @staticmethod
+    def probe(hwnd, timeout):
+        return 0.0
+
+    def send_key(self, key):
+        self._record("send", 0, key.lower())
+
+    def press_key(self, key):
+        self._record("down", 0, key.lower())
+
+    def release_key(self, key):
+        self._record("up", 0, key.lower())
+
+    def key_down(self, hwnd, vk):
+        self._record("down", hwnd, self._VK_NAMES.get(vk, chr(vk).lower()))
+
+    def key_up(self, hwnd, vk):
+        self._record("up", hwnd, self._VK_NAMES.get(vk, chr(vk).lower()))
+
+    def post_chars(self, hwnd, units):
+        self._record("char", hwnd, len(units))
+
+    def mouse_move(self, hwnd, lparam):
+        self._record("move", hwnd, (lparam & 0xFFFF, lparam >> 16))
+
+    def mouse_click(self, hwnd, button, lparam, double=False):
+        self._record("click", hwnd, (button, lparam & 0xFFFF, lparam >> 16, double))
+
+    def cursor_move(self, x, y):
+        self._record("move", 0, (x, y))
+
+    def cursor_click(self, button, double=False):
+        self._record("click", 0, (button, None, None, double))
+
+    def send_input(self, batch):
+        self._record("text", 0, len(batch) // 2)
+
+
+class SlowConsumerBackend(NullBackend):
+    """
+    模拟处理缓慢的目标窗口 (配合 VirtualClock 测试流控):
+    后台消息进入一个按 rate 条/秒消费的队列，stalls 为 [(开始, 结束)] 卡顿区间 (相对起点，秒)，
+    卡顿期间不消费；队列超过 capacity 时投递抛出 QueueFull
+    每个后台事件的送达延迟记录在 delays 中
+    """
+
+    def __init__(self, clock, rate=200.0, capacity=10000, stalls=()):
+        super().__init__(clock)
+        self.rate = rate
+        self.capacity = capacity
+        self.stalls = sorted(stalls)
+        self.delays = []
+        self.rejected = 0
+        self._queue = deque()   # 各条消息的处理完成时刻
+        self._busy_until = 0.0
+
+    def _serve_from(self, t):
+        """t 之后最早可以开始处理的时刻 (跳过卡顿区间)"""
+        for start, end in self.stalls:
+            if start <= t < end:
+                t = end
+        return t
+
+    def _drain(self, now):
+        queue = self._queue
+        while queue and queue[0] <= now:
+            queue.popleft()
+
+    def _post(self, n):
+        now = self.clock.now() - self.t0
+        self._drain(now)
+        if len(self._queue) + n > self.capacity:
+            self.rejected += 1
+            raise QueueFull("消息队列已满")
+        done = max(now, self._busy_until)
+        for _ in range(n):
+            done = self._serve_from(done) + 1.0 / self.rate
+            self._queue.append(done)
+        self._busy_until = done
+        self.delays.append((now, done - now))
+
+    def backlog(self):
+        """当前积压的消息数"""
+        self._drain(self.clock.now() - self.t0)
+        return len(self._queue)
+
+    def max_delay(self):
+        return max((d for _, d in self.delays), default=0.0)
+
+    def probe(self, hwnd, timeout):
+        # 以清空积压所需的时间作为探测延迟 (真实窗口卡顿时消息泵同样停转)
+        # 探测本身是同步往返，虚拟时间同样要推进
+        now = self.clock.now() - self.t0
+        self._drain(now)
+        latency = self._serve_from(max(now, self._busy_until)) - now
+        self.clock.t += min(latency, timeout)
+        return latency if latency <= timeout else None
+
+    def key_down(self, hwnd, vk):
+        self._post(1)
+        super().key_down(hwnd, vk)
+
+    def key_up(self, hwnd, vk):
+        self._post(1)
+        super().key_up(hwnd, vk)
+
+    def post_chars(self, hwnd, units):
+        self._post(len(units))
+        super().post_chars(hwnd, units)
+
+    def mouse_move(self, hwnd, lparam):
+        self._post(1)
+        super().mouse_move(hwnd, lparam)
+
+    def mouse_click(self, hwnd, button, lparam, double=False):
+        self._post(4 if double else 2)
+        super().mouse_click(hwnd, button, lparam, double)
+
+
+class DryRunResult:
+    """模拟运行结果: 完整事件时间线、总时长、各按键次数"""
+
+    def __init__(self, events, duration, loops):
+        self.events = events
+        self.duration = duration
+        self.loops = loops
+
+    def key_counts(self):
+        """按键按下次数 (send 与 down 各计一次)"""
+        return Counter(detail for _, kind, _, detail in self.events if kind in ("send", "down"))
+
+    def click_count(self):
+        return sum(1 for e in self.events if e[1] == "click")
+
+    def summary(self, top=10):
+        counts = self.key_counts()
+        lines = [f"总时长: {self.duration:.3f} 秒 ({self.loops} 轮)",
+                 f"事件数: {len(self.events)}  按键: {sum(counts.values())}  点击: {self.click_count()}"]
+        for key, n in counts.most_common(top):
+            lines.append(f"  {key}: {n}")
+        if len(counts) > top:
+            lines.append(f"  … 共 {len(counts)} 种按键")
+        return "\n".join(lines)
+
+    def export_csv(self, filepath):
+        try:
+            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(["time_ms", "event", "hwnd", "detail"])
+                for t, kind, hwnd, detail in self.events:
+                    writer.writerow([f"{t * 1000:.3f}", kind, hwnd, detail])
+            return True, "导出成功"
+        except Exception as e:
+            return False, f"导出失败: {str(e)}"
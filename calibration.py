@@ -0,0 +1,174 @@
+import os
+import time
+import platform
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+from backend import RealClock
+from config import ConfigManager
+
+PROFILE_FILE = "machine_profile.json"
+# 睡眠测量的目标时长 (秒，交替测量) 与每档采样数
+SLEEP_TARGETS = (0.001, 0.004, 0.015)
+SLEEP_SAMPLES = 40
+WAKE_SAMPLES = 50
+CALL_SAMPLES = 200
+# 自旋补偿的上限 (秒): 计时粒度比这更粗的机器上只提前唤醒，不自旋
+MAX_SPIN = 0.002
+CALL_LABELS = {"is_window": "窗口检查", "probe": "消息往返"}
+
+
+def machine_id():
+    """本机标识: 主机名 + 系统 + 处理器 + CPU 数 + Python 版本，任一变化都需要重新校准"""
+    return "|".join((platform.node(), platform.platform(), platform.processor(),
+                     str(os.cpu_count()), platform.python_version()))
+
+
+def _distribution(samples):
+    """样本 -> {p50, p90, p99, max} (秒)"""
+    s = sorted(samples) or [0.0]
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": s[-1]}
+
+
+class MachineProfile:
+    """
+    本机计时校准结果 (秒): 条件变量超时等待的超调分布、notify 到等待线程醒来的延迟、输入后端单次调用耗时
+    lead 为调度时提前唤醒的时长 (超调 p90)，spin 为醒来后自旋等待的上限
+    """
+    VERSION = 1
+
+    def __init__(self, overshoot, wakeup, calls, machine=None, created=None):
+        self.overshoot = overshoot
+        self.wakeup = wakeup
+        self.calls = calls
+        self.machine = machine or machine_id()
+        self.created = created or time.time()
+
+    @property
+    def lead(self):
+        return self.overshoot["p90"]
+
+    @property
+    def spin(self):
+        return min(self.lead, MAX_SPIN)
+
+    def summary(self):
+        ms = lambda v: f"{v * 1000:.2f}ms"
+        calls = "".join(f", {CALL_LABELS.get(k, k)} {v * 1e6:.0f}µs" for k, v in self.calls.items())
+        return (f"🧭 本机计时: 睡眠超调 p50 {ms(self.overshoot['p50'])} / p99 {ms(self.overshoot['p99'])}, "
+                f"唤醒延迟 p50 {ms(self.wakeup['p50'])}{calls} "
+                f"(提前 {ms(self.lead)} 唤醒, 校准于 {time.strftime('%m-%d %H:%M', time.localtime(self.created))})")
+
+    def to_dict(self):
+        return {"version": self.VERSION, "machine": self.machine, "created": self.created,
+                "overshoot": self.overshoot, "wakeup": self.wakeup, "calls": self.calls}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["overshoot"], data["wakeup"], data.get("calls", {}), data["machine"], data["created"])
+
+    def save(self, filepath=PROFILE_FILE):
+        return ConfigManager.save_config(filepath, self.to_dict())
+
+    @classmethod
+    def load(cls, filepath=PROFILE_FILE):
+        """返回 (profile, msg)；文件不存在、版本不符或来自其他机器时 profile 为 None"""
+        data, msg = ConfigManager.load_config(filepath)
+        if data is None: return None, msg
+        if data.get("version") != cls.VERSION: return None, "校准文件版本不符"
+        if data.get("machine") != machine_id(): return None, "校准结果来自其他机器"
+        try:
+            return cls.from_dict(data), "加载成功"
+        except (KeyError, TypeError) as e:
+            return None, f"校准文件格式错误: {str(e)}"
+
+
+def measure_sleep(clock=RealClock, targets=SLEEP_TARGETS, samples=SLEEP_SAMPLES):
+    """条件变量超时等待 (与执行器相同的原语) 的超调: 实际时长 - 目标时长"""
+    cond = threading.Condition()
+    overshoot = []
+    with cond:
+        for _ in range(samples):
+            for target in targets:
+                t = clock.now()
+                clock.wait(cond, target)
+                overshoot.append(max(0.0, clock.now() - t - target))
+    return _distribution(overshoot)
+
+
+def measure_wakeup(clock=RealClock, samples=WAKE_SAMPLES):
+    """notify 到等待线程实际醒来的延迟 (停止 / 暂停 / 窗口事件的响应速度)"""
+    cond = threading.Condition()
+    state = {"t": None, "left": samples}
+    latency = []
+
+    def waiter():
+        with cond:
+            while state["left"]:
+                while state["t"] is None: cond.wait()
+                latency.append(clock.now() - state["t"])
+                state["t"] = None
+                state["left"] -= 1
+                cond.notify_all()
+
+    thread = threading.Thread(target=waiter, name="CalibrateWaiter", daemon=True)
+    thread.start()
+    for _ in range(samples):
+        # 留出时间让等待线程真正进入等待
+        time.sleep(0.001)
+        with cond:
+            state["t"] = clock.now()
+            cond.notify_all()
+            while state["t"] is not None: cond.wait()
+    thread.join()
+    return _distribution(latency)
+
+
+def measure_calls(calls, clock=RealClock, samples=CALL_SAMPLES):
+    """calls: {名称: (函数, 参数)}，只应包含无副作用的调用；返回 {名称: 单次平均耗时}"""
+    cost = {}
+    for name, (fn, args) in calls.items():
+        t = clock.now()
+        for _ in range(samples):
+            fn(*args)
+        cost[name] = (clock.now() - t) / samples
+    return cost
+
+
+def calibrate(backend, hwnd=0, clock=RealClock):
+    """
+    完整校准 (约 1~3 秒，取决于系统计时粒度)，在后台线程调用
+    backend 可替换 (NullBackend 可在任意平台运行); hwnd 为用于测量消息往返的本程序窗口，0 时跳过
+    """
+    calls = {"is_window": (backend.is_window, (hwnd,))}
+    if hwnd: calls["probe"] = (backend.probe, (hwnd, 0.1))
+    return MachineProfile(measure_sleep(clock), measure_wakeup(clock), measure_calls(calls, clock))
+
+
+class CalibrationRunner(QObject):
+    """在后台线程执行校准，结果在 GUI 线程交付"""
+    sig_done = pyqtSignal(object)  # MachineProfile
+    sig_failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, backend, hwnd=0):
+        """已在校准时返回 False"""
+        if self.running: return False
+        self._thread = threading.Thread(target=self._run, args=(backend, hwnd), name="Calibrate", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, backend, hwnd):
+        try:
+            profile = calibrate(backend, hwnd)
+        except Exception as e:
+            self.sig_failed.emit(str(e))
+            return
+        self.sig_done.emit(profile)
@@ -0,0 +1,116 @@
+import json
+from plan import is_mouse_action, is_repeat_action, is_trail_action
+
+# 识别的最大重复周期 (动作个数)
+MAX_PERIOD = 64
+
+
+def _token(action):
+    return json.dumps(action, sort_keys=True, ensure_ascii=False)
+
+
+def pin_mouse_origins(actions, last_pos=None):
+    """
+    为依赖上下文的鼠标轨迹写入显式起点 ("from")
+    压缩后同一份动作会在不同位置执行，起点不能再依赖前一个动作
+    起点的推算与 plan._compile 一致 (重复块内容只编译一次，沿用块前的位置)；不修改传入的动作
+    """
+    return _pin(actions, last_pos)[0]
+
+
+def _pin(actions, last_pos):
+    result = []
+    for action in actions:
+        if is_repeat_action(action):
+            body, last_pos = _pin(action.get("actions", []), last_pos)
+            action = dict(action, actions=body)
+        elif is_mouse_action(action):
+            target = [int(action.get("x", 0)), int(action.get("y", 0))]
+            if action.get("path", "none") != "none" and not action.get("from") and last_pos:
+                action = dict(action, **{"from": list(last_pos)})
+            last_pos = target
+        elif is_trail_action(action) and action.get("points"):
+            last_pos = action["points"][-1][:2]
+        result.append(action)
+    return result, last_pos
+
+
+def compress_actions(actions, max_period=MAX_PERIOD):
+    """
+    查找相邻重复的子序列并折叠为 (可嵌套的) 重复块:
+        {"type": "repeat", "count": N, "actions": [...]}
+    展开后与原序列完全一致
+    """
+    seq = pin_mouse_origins(actions)
+    while True:
+        out = _compress_pass(seq, max_period)
+        if len(out) >= len(seq):
+            return seq
+        seq = out
+
+
+def _make_repeat(count, body):
+    # 单元素重复块直接合并次数: repeat(3, [repeat(4, X)]) -> repeat(12, X)
+    if len(body) == 1 and is_repeat_action(body[0]):
+        return {"type": "repeat", "count": count * body[0]["count"], "actions": body[0]["actions"]}
+    return {"type": "repeat", "count": count, "actions": body}
+
+
+def _compress_pass(seq, max_period):
+    interned = {}
+    ids = [interned.setdefault(_token(a), len(interned)) for a in seq]
+    n = len(ids)
+    out = []
+    i = 0
+    while i < n:
+        best_p, best_c = 0, 1
+        remaining = n - i
+        for p in range(1, min(max_period, remaining // 2) + 1):
+            # 先比较首元素，绝大多数位置在这里就被排除
+            if ids[i] != ids[i + p] or ids[i:i + p] != ids[i + p:i + 2 * p]:
+                continue
+            c = 2
+            while i + (c + 1) * p <= n and ids[i + c * p:i + (c + 1) * p] == ids[i:i + p]:
+                c += 1
+            if p * c > best_p * best_c:
+                best_p, best_c = p, c
+                if p * c == remaining: break
+        if best_c >= 2:
+            body = compress_actions(seq[i:i + best_p], max_period)
+            block = _make_repeat(best_c, body)
+            prev = out[-1] if out else None
+            # 与前一个重复块内容相同则累加次数
+            if prev and is_repeat_action(prev) and prev["actions"] == block["actions"]:
+                # prev 可能是调用方传入的块，替换而不是原地修改
+                out[-1] = dict(prev, count=prev["count"] + block["count"])
+            else:
+                out.append(block)
+            i += best_p * best_c
+        else:
+            out.append(seq[i])
+            i += 1
+    return out
+
+
+def expand_actions(actions):
+    """将重复块完全展开为扁平列表 (仅用于导出/校验)"""
+    flat = []
+    for action in actions:
+        if is_repeat_action(action):
+            body = expand_actions(action.get("actions", []))
+            flat.extend(body * action.get("count", 1))
+        else:
+            flat.append(action)
+    return flat
+
+
+def count_actions(actions):
+    """展开后的动作数量，不实际展开"""
+    total = 0
+    for action in actions:
+        if is_repeat_action(action):
+            total += action.get("count", 1) * count_actions(action.get("actions", []))
+        else:
+            total += 1
+    return total
+
@@ -1,5 +1,7 @@
 import json
 import os
+import time
+import hashlib
 
 class ConfigManager:
     @staticmethod
@@ -20,4 +22,50 @@ class ConfigManager:
                 data = json.load(f)
             return data, "加载成功"
         except Exception as e:
-            return None, f"配置文件格式错误: {str(e)}"
\ No newline at end of file
+            return None, f"配置文件格式错误: {str(e)}"
+
+class CheckpointStore:
+    """运行进度检查点 (配置哈希, 轮次, 步骤)，用于崩溃/重启后续跑"""
+    DEFAULT_FILE = "run_checkpoint.json"
+
+    def __init__(self, filepath=DEFAULT_FILE, min_interval=1.0):
+        # filepath=None 表示不记录 (如模拟运行)
+        self.filepath = filepath
+        # 两次落盘的最小间隔 (秒)，避免每步都写磁盘
+        self.min_interval = min_interval
+        self._last_write = 0.0
+
+    @staticmethod
+    def config_hash(actions, loop):
+        raw = json.dumps({"actions": actions, "loop": loop}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def save(self, cfg_hash, loop, step, force=False):
+        if self.filepath is None: return
+        now = time.monotonic()
+        if not force and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        tmp = self.filepath + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"hash": cfg_hash, "loop": loop, "step": step, "time": time.time()}, f)
+            # 原子替换，崩溃时不会留下半截文件
+            os.replace(tmp, self.filepath)
+        except OSError:
+            pass
+
+    def load(self, cfg_hash):
+        """哈希匹配时返回 (loop, step)，否则 None"""
+        if self.filepath is None: return None
+        data, _ = ConfigManager.load_config(self.filepath)
+        if not data or data.get("hash") != cfg_hash:
+            return None
+        return data.get("loop", 1), data.get("step", 0)
+
+    def clear(self):
+        if self.filepath is None: return
+        try:
+            os.remove(self.filepath)
+        except OSError:
+            pass
@@ -0,0 +1,185 @@
+import os
+import hmac
+import json
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PyQt6.QtCore import QObject, pyqtSignal
+from metrics import render_prometheus
+
+# 宏配置目录 (每个 .json 文件即一个宏)
+MACRO_DIR = "macros"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # 长连接 + 关闭 Nagle，脚本轮询时每次请求只有一次往返
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, code, body, content_type="application/json; charset=utf-8"):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _rejected(self):
+        """
+        拒绝浏览器发起的请求: 网页可以向 127.0.0.1 发送 no-cors 请求 (CSRF)，也可以借 DNS 重绑定换成任意 Host；
+        脚本调用不带 Origin，Host 必须是本机地址。配置了 api_token 时还需携带 X-AutoKey-Token 头
+        返回拒绝原因，放行时返回 None
+        """
+        if self.headers.get("Origin") is not None:
+            return "不接受浏览器跨站请求"
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if host not in self.server.control.ALLOWED_HOSTS:
+            return "Host 必须为 127.0.0.1 或 localhost"
+        token = self.server.control.token
+        if token and not hmac.compare_digest(self.headers.get("X-AutoKey-Token", "").encode('utf-8'), token.encode('utf-8')):
+            return "令牌无效"
+        return None
+
+    def _dispatch(self, method):
+        reason = self._rejected()
+        if reason:
+            self._reply(403, json.dumps({"ok": False, "msg": reason}, ensure_ascii=False))
+            return
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        route = self.server.control.ROUTES.get((method, url.path.rstrip('/') or '/'))
+        if route is None:
+            self._reply(404, json.dumps({"ok": False, "msg": "未知接口"}, ensure_ascii=False))
+            return
+        try:
+            code, body, content_type = getattr(self.server.control, route)(params)
+        except Exception as e:
+            code, body, content_type = 500, {"ok": False, "msg": str(e)}, None
+        if content_type is None:
+            self._reply(code, json.dumps(body, ensure_ascii=False))
+        else:
+            self._reply(code, body, content_type)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        # 参数只走 query string，请求体直接丢弃
+        length = int(self.headers.get("Content-Length") or 0)
+        if length: self.rfile.read(length)
+        self._dispatch("POST")
+
+
+class ControlServer(QObject):
+    """
+    本地控制接口 (仅监听 127.0.0.1)，请求在独立线程处理:
+    读操作直接返回；需要操作界面的请求通过信号转交 GUI 线程，立即回复 202
+    带 Origin 头、Host 不是本机地址、或令牌不符 (设置了 token 时) 的请求一律 403
+    """
+    sig_start = pyqtSignal(str, bool)  # 宏名 (空字符串表示当前配置), 是否从检查点续跑
+    sig_bind = pyqtSignal(int, str)    # hwnd, 标题
+
+    ROUTES = {
+        ("GET", "/macros"): "api_macros",
+        ("GET", "/status"): "api_status",
+        ("GET", "/metrics"): "api_metrics",
+        ("POST", "/start"): "api_start",
+        ("POST", "/stop"): "api_stop",
+        ("POST", "/pause"): "api_pause",
+        ("POST", "/resume"): "api_resume",
+        ("POST", "/bind"): "api_bind",
+    }
+    ALLOWED_HOSTS = ("127.0.0.1", "localhost")
+
+    def __init__(self, executor, find_window, macro_dir=MACRO_DIR):
+        super().__init__()
+        self.executor = executor
+        # find_window(title) -> (hwnd, title) 或 None，由调用方注入 (Win32 实现在 utils)
+        self.find_window = find_window
+        self.macro_dir = macro_dir
+        self.token = ""
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1] if self.httpd else 0
+
+    def start(self, port, token=""):
+        """token 非空时每个请求都需携带 X-AutoKey-Token 头"""
+        if self.httpd: self.stop()
+        self.token = token or ""
+        try:
+            self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        except OSError as e:
+            return False, f"控制接口启动失败: {str(e)}"
+        # 每个连接一个线程: 长连接客户端不会阻塞其他请求，也不会让 shutdown 一直等待
+        self.httpd.daemon_threads = True
+        self.httpd.block_on_close = False
+        self.httpd.control = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="ControlServer", daemon=True)
+        self.thread.start()
+        return True, f"控制接口已启动: http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+            self.thread = None
+
+    def macro_path(self, name):
+        return os.path.join(self.macro_dir, f"{name}.json")
+
+    def list_macros(self):
+        if not os.path.isdir(self.macro_dir):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.macro_dir) if f.lower().endswith(".json"))
+
+    # --- 接口实现: 返回 (状态码, 内容, content_type 或 None 表示 JSON) ---
+    def api_macros(self, params):
+        return 200, {"ok": True, "macros": self.list_macros()}, None
+
+    def api_status(self, params):
+        m = self.executor.metrics
+        return 200, {"ok": True, "state": self.executor.state, "runs": m.runs_total,
+                     "sends": m.sends_total, "loops": m.loops_total}, None
+
+    def api_metrics(self, params):
+        body = render_prometheus(self.executor.metrics, self.executor.state, self.executor.STATES)
+        return 200, body, "text/plain; version=0.0.4; charset=utf-8"
+
+    def api_start(self, params):
+        name = params.get("macro", "")
+        if name and (os.path.basename(name) != name or not os.path.isfile(self.macro_path(name))):
+            return 404, {"ok": False, "msg": f"宏不存在: {name}"}, None
+        if self.executor.isRunning():
+            return 409, {"ok": False, "msg": "任务正在运行"}, None
+        self.sig_start.emit(name, params.get("resume", "0") == "1")
+        return 202, {"ok": True}, None
+
+    def api_stop(self, params):
+        self.executor.stop()
+        return 200, {"ok": True, "state": self.executor.state}, None
+
+    def api_pause(self, params):
+        self.executor.pause()
+        return 200, {"ok": True, "state": self.executor.state}, None
+
+    def api_resume(self, params):
+        self.executor.resume()
+        return 200, {"ok": True, "state": self.executor.state}, None
+
+    def api_bind(self, params):
+        title = params.get("title", "")
+        if not title:
+            return 400, {"ok": False, "msg": "缺少参数 title"}, None
+        found = self.find_window(title)
+        if not found:
+            return 404, {"ok": False, "msg": f"未找到窗口: {title}"}, None
+        hwnd, full_title = found
+        self.sig_bind.emit(hwnd, full_title)
+        return 202, {"ok": True, "hwnd": hwnd, "title": full_title}, None
@@ -0,0 +1,164 @@
+import json
+import time
+import threading
+from array import array
+
+# 日志级别
+DEBUG, INFO, WARN, ERROR = 0, 1, 2, 3
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+
+# 事件码 -> 显示模板 (仅在渲染/导出时格式化; {t0} 表示 a0 是字符串表中的 id, {s} 为记录自带的文本)
+EV_MESSAGE = 1
+EV_RUN_START = 2
+EV_RUN_END = 3
+EV_RESUME = 4
+EV_PAUSED = 5
+EV_KEY = 6
+EV_MOUSE = 7
+EV_WINDOW_LOST = 8
+EV_BAD_KEY = 9
+EV_EXEC_ERROR = 10
+EV_OUT_OF_CLIENT = 11
+EV_CLICKING = 12
+EV_NEED_POS = 13
+EV_TEXT = 14
+EV_WAIT = 15
+EV_WAIT_DONE = 16
+EV_WAIT_TIMEOUT = 17
+EV_FLOW_SLOW = 18
+EV_FLOW_OK = 19
+EV_POST_FAILED = 20
+EV_PLAN_SWAP = 21
+
+TEMPLATES = {
+    EV_MESSAGE: "{s}",
+    EV_RUN_START: "🚀 {t0} 任务开始...",
+    EV_RUN_END: "运行结束",
+    EV_RESUME: "⏩ 从第 {a0} 轮第 {a1} 步继续",
+    EV_PAUSED: "⏸ 已暂停 (第 {a0} 轮 第 {a1} 步)",
+    EV_KEY: "第 {a0} 轮 | 按键: {t2}",
+    EV_MOUSE: "第 {a0} 轮 | 鼠标: ({a2}, {a3})",
+    EV_WINDOW_LOST: "⚠️ 目标窗口已失效，切换至前台模式",
+    EV_BAD_KEY: "⚠️ 无法解析按键: {t2}",
+    EV_EXEC_ERROR: "❌ 执行错误: {s}",
+    EV_OUT_OF_CLIENT: "⚠️ 坐标超出窗口客户区 ({a0}x{a1})",
+    EV_CLICKING: "🖱️ 点击中... (速度: {a0} 次/秒)",
+    EV_NEED_POS: "⚠️ 后台连点需要指定坐标，切换至前台模式",
+    EV_TEXT: "第 {a0} 轮 | 输入文本: {a2} 字符",
+    EV_WAIT: "第 {a0} 轮 | 等待: {t2}",
+    EV_WAIT_DONE: "✅ 条件已满足: {t2} (等待 {a3} ms)",
+    EV_WAIT_TIMEOUT: "⚠️ 等待超时: {t2} ({a3} ms)",
+    EV_FLOW_SLOW: "🐢 目标窗口响应变慢 (探测 {a0} ms)，后台发送{t2} (间隔 {a1} ms)",
+    EV_FLOW_OK: "✅ 目标窗口已恢复响应 (探测 {a0} ms)",
+    EV_POST_FAILED: "❌ 后台投递失败: {s}",
+    EV_PLAN_SWAP: "🔁 第 {a0} 轮起使用新计划 ({a1} 步)",
+}
+
+# 每条记录携带的整数参数个数
+N_ARGS = 4
+
+
+class EventLog:
+    """
+    定长环形日志: 结构化记录 (时间戳, 级别, 事件码, 整数参数, 可选文本)
+    写入只做数组赋值，不做字符串格式化；容量固定，长时间运行内存不增长
+    字符串表只登记取值有限的文本 (按键名、等待条件等)，id 可被长期缓存；
+    异常信息、状态提示等自由文本存放在记录自己的槽位里，随记录一起被覆盖
+    """
+
+    def __init__(self, capacity=65536, max_texts=4096):
+        self.capacity = capacity
+        self._ts = array('d', bytes(8 * capacity))
+        self._level = array('b', bytes(capacity))
+        self._code = array('H', bytes(2 * capacity))
+        self._args = array('q', bytes(8 * N_ARGS * capacity))
+        # 已写入的总条数 (单调递增，GUI 用它判断是否有新记录)
+        self.seq = 0
+        self._slot_text = [None] * capacity
+        self._lock = threading.Lock()
+        # 字符串表: 热路径只记录 id；超过上限后不再登记新文本
+        self._texts = ["…"]
+        self._text_ids = {}
+        self.max_texts = max_texts
+
+    def intern(self, text):
+        """文本 -> id (用于按键名、等待条件等取值有限的文本)"""
+        text_id = self._text_ids.get(text)
+        if text_id is None:
+            if len(self._texts) >= self.max_texts:
+                return 0
+            with self._lock:
+                text_id = self._text_ids.get(text)
+                if text_id is None:
+                    text_id = len(self._texts)
+                    self._texts.append(text)
+                    self._text_ids[text] = text_id
+        return text_id
+
+    def append(self, level, code, a0=0, a1=0, a2=0, a3=0, text=None):
+        with self._lock:
+            i = self.seq % self.capacity
+            self._ts[i] = time.time()
+            self._level[i] = level
+            self._code[i] = code
+            j = i * N_ARGS
+            self._args[j] = a0
+            self._args[j + 1] = a1
+            self._args[j + 2] = a2
+            self._args[j + 3] = a3
+            self._slot_text[i] = text
+            self.seq += 1
+
+    def message(self, level, text):
+        """非热路径的自由文本 (如 GUI 状态提示)"""
+        self.append(level, EV_MESSAGE, text=text)
+
+    def clear(self):
+        with self._lock:
+            self.seq = 0
+
+    def __len__(self):
+        return min(self.seq, self.capacity)
+
+    def record(self, row):
+        """第 row 条 (0 为最旧的保留记录)，返回 (ts, level, code, args, text)"""
+        with self._lock:
+            first = max(0, self.seq - self.capacity)
+            i = (first + row) % self.capacity
+            j = i * N_ARGS
+            return (self._ts[i], self._level[i], self._code[i], tuple(self._args[j:j + N_ARGS]),
+                    self._slot_text[i])
+
+    def latest(self):
+        return self.record(len(self) - 1) if self.seq else None
+
+    def text(self, text_id):
+        return self._texts[text_id] if 0 <= text_id < len(self._texts) else "…"
+
+    def format(self, rec):
+        """渲染一条记录的消息文本"""
+        _, _, code, args, text = rec
+        template = TEMPLATES.get(code)
+        if template is None:
+            return f"#{code} {args}"
+        fields = {f"a{k}": v for k, v in enumerate(args)}
+        fields.update({f"t{k}": self.text(v) for k, v in enumerate(args)})
+        fields["s"] = text or ""
+        return template.format(**fields)
+
+    def export_jsonl(self, filepath):
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                for row in range(len(self)):
+                    rec = self.record(row)
+                    ts, level, code, args, _ = rec
+                    f.write(json.dumps({
+                        "ts": round(ts, 6),
+                        "level": LEVEL_NAMES.get(level, level),
+                        "code": code,
+                        "args": list(args),
+                        "msg": self.format(rec),
+                    }, ensure_ascii=False) + "\n")
+            return True, "导出成功"
+        except Exception as e:
+            return False, f"导出失败: {str(e)}"
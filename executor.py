@@ -1,132 +1,724 @@
 import time
-import keyboard
-import win32gui
+import heapq
+import threading
 from PyQt6.QtCore import QThread, pyqtSignal
-from utils import TextUtils, WindowMgr, BackgroundInput
+from utils import TextUtils, BackgroundInput
+from backend import RealClock, VirtualClock, NullBackend, DryRunResult
+from plan import compile_actions, iter_plan, iter_key_actions, iter_wait_steps, MouseStep, TextStep, WaitStep
+from config import CheckpointStore
+from metrics import RunMetrics
+from eventlog import (EventLog, INFO, WARN, ERROR, EV_RUN_START, EV_RESUME, EV_PAUSED,
+                      EV_KEY, EV_MOUSE, EV_WINDOW_LOST, EV_BAD_KEY, EV_EXEC_ERROR,
+                      EV_OUT_OF_CLIENT, EV_CLICKING, EV_NEED_POS, EV_TEXT, EV_WAIT, EV_WAIT_DONE,
+                      EV_WAIT_TIMEOUT, EV_FLOW_SLOW, EV_FLOW_OK, EV_POST_FAILED,
+                      EV_PLAN_SWAP)
+from textinput import encode_units
+from profiler import PhaseTimer, SamplingProfiler, PH_SEND, PH_WINDOW, PH_LOG, PH_SLEEP
+from flowctl import FlowController, is_queue_full, post_error_code, describe_post_error
+
+# 运行状态机: idle -> running <-> paused -> stopping -> idle
+STATE_IDLE = "idle"
+STATE_RUNNING = "running"
+STATE_PAUSED = "paused"
+STATE_STOPPING = "stopping"
+STATES = (STATE_IDLE, STATE_RUNNING, STATE_PAUSED, STATE_STOPPING)
+
+# 性能分析结果目录
+PROFILE_DIR = "profiles"
 
 class TaskExecutor(QThread):
-    sig_progress = pyqtSignal(str)
+    sig_state = pyqtSignal(str)
     sig_finished = pyqtSignal()
+    STATES = STATES
+    # 后台模式未指定按住时长时的默认值 (秒)
+    DEFAULT_BG_HOLD = 0.05
+    # 落后计划超过该值 (秒) 时重新对齐时间线
+    RESYNC_LAG = 1.0
 
-    def __init__(self):
+    def __init__(self, clock=None, backend=None, checkpoint=None):
         super().__init__()
-        self._is_running = False
+        # 时钟与输入后端可替换 (模拟运行使用 VirtualClock + NullBackend)
+        self.clock = clock or RealClock
+        if backend is None:
+            # 真实输入后端依赖 pywin32，按需导入 (模拟运行 / 计时校准在任意平台可用)
+            from winbackend import Win32Backend
+            backend = Win32Backend
+        self.backend = backend
+        self._state = STATE_IDLE
+        # 所有等待都挂在这个条件变量上，状态变化时立即唤醒 (停止延迟 = 一次唤醒)
+        self._cond = threading.Condition()
+        self._paused_total = 0.0
         self.mode = "keyboard"
+        self.checkpoint = checkpoint or CheckpointStore()
+        # 共享窗口监视器 (winwatch.WindowWatcher)，驱动 wait_for 步骤; None 时等待视为立即满足
+        self.watcher = None
+        # 执行反馈全部写入环形日志 (热路径不格式化字符串，由 GUI 按需渲染)
+        self.log = EventLog()
+        # 累计统计 (跨多次运行)，供控制接口 /metrics 读取
+        self.metrics = RunMetrics()
+        # 分阶段计时常驻开启; 采样分析仅在 profile=True 的那次运行启用
+        self.phases = PhaseTimer()
+        self.profile = False
+        # 后台发送拥塞策略 (随宏配置); 流控器每次运行重新创建
+        self.flow_policy = "slow"
+        self.flow = FlowController("off")
+        self._key_ids = {}
+        # 最近一次运行的摘要 (运行结束时生成，供运行历史记录); 停止原因由执行线程自身设置
+        self.last_run = None
+        self.stop_reason = None
         
         self.kb_actions = []
+        self.kb_steps = []
         self.kb_loop = 1
         self.kb_hwnd = 0
+        self.kb_hash = ""
+        self.kb_resume = None
+        # 热更新: 待换入的计划 (hotreload.HotPlan)，执行线程在下一个循环边界取走
+        self._pending_plan = None
+        # 播放速度: 倍率 > 0 时按比例缩放所有时间; 0 为极速 (步骤间隔统一为 min_gap 秒)
+        self.speed = 1.0
+        self.min_gap = 0.0
+        # 当前进度 (轮次, 下一个待执行步骤)
+        self._cursor = (1, 0)
+        # 待抬起的按键: 最小堆 (抬起时刻, (hwnd, key)) + 当前按住表
+        self._pending_ups = []
+        self._held = {}
         
         self.mouse_type = "left"
         self.mouse_click = "click"
         self.mouse_cps = 1
+        self.mouse_pos = None
+        self.mouse_hwnd = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def _is_running(self):
+        return self._state in (STATE_RUNNING, STATE_PAUSED)
 
-    def setup_keyboard(self, actions, loop, hwnd=0):
+    def setup_keyboard(self, actions, loop, hwnd=0, resume_from=None, speed=1.0, min_gap=0.0, flow="slow"):
+        """resume_from: (轮次, 步骤)，从检查点继续时传入"""
         self.mode = "keyboard"
+        self.flow_policy = flow
+        self.speed = speed
+        self.min_gap = min_gap
         self.kb_actions = actions
+        # 预编译: 鼠标轨迹在此一次性生成，重复块只编译一份
+        self.kb_steps = compile_actions(actions)
         self.kb_loop = loop
         self.kb_hwnd = hwnd
+        self.kb_hash = CheckpointStore.config_hash(actions, loop)
+        self.kb_resume = resume_from
+        self._pending_plan = None
+        # 预先登记按键名，执行时日志只记录 id
+        self._key_ids = {a.get("key"): self.log.intern(TextUtils.format_key_text(a.get("key")))
+                         for a in iter_key_actions(actions)}
+        self._intern_wait_texts(self.kb_steps)
+
+    def _intern_wait_texts(self, steps):
+        """等待步骤的文本在编译时已格式化，这里登记一次，执行时只记录 id"""
+        for step in iter_wait_steps(steps):
+            step.text_id = self.log.intern(step.text)
+
+    def swap_plan(self, plan):
+        """
+        登记一个已编译好的新计划 (任意线程调用)，当前一轮执行完后整体换入，运行不中断
+        再次调用会覆盖尚未换入的计划
+        """
+        with self._cond:
+            self._pending_plan = plan
+
+    @property
+    def plan_pending(self):
+        return self._pending_plan is not None
+
+    def _apply_pending_plan(self, next_loop):
+        with self._cond:
+            plan, self._pending_plan = self._pending_plan, None
+        if plan is None: return
+        self.kb_actions = plan.actions
+        self.kb_steps = plan.steps
+        self.kb_loop = plan.loop
+        self.kb_hash = plan.hash
+        self.speed = plan.speed
+        self.min_gap = plan.min_gap
+        self.flow.policy = plan.flow
+        self._key_ids = {key: self.log.intern(text) for key, text in plan.key_texts.items()}
+        self._intern_wait_texts(plan.steps)
+        self.metrics.reloads_total += 1
+        self.log.append(INFO, EV_PLAN_SWAP, next_loop, plan.size)
 
-    def setup_mouse(self, m_type, m_click, cps):
+    def setup_mouse(self, m_type, m_click, cps, pos=None, hwnd=0, flow="slow"):
         self.mode = "mouse"
+        self.flow_policy = flow
         self.mouse_type = m_type
         self.mouse_click = m_click
         self.mouse_cps = cps
+        self.mouse_pos = pos
+        self.mouse_hwnd = hwnd
+
+    def _set_state(self, state):
+        with self._cond:
+            self._state = state
+            self._cond.notify_all()
+        self.sig_state.emit(state)
+
+    def start(self, *args):
+        """线程启动前即进入运行状态: 紧随 start() 的 stop() / pause() 不会因线程尚未运行而丢失"""
+        if self._state == STATE_IDLE: self._set_state(STATE_RUNNING)
+        super().start(*args)
 
     def stop(self):
-        self._is_running = False
+        if self._is_running:
+            self._set_state(STATE_STOPPING)
 
-    def run(self):
-        self._is_running = True
-        self.sig_progress.emit(f"🚀 {self.mode.upper()} 任务开始...")
+    def pause(self):
+        if self._state == STATE_RUNNING:
+            self._set_state(STATE_PAUSED)
 
-        if self.mode == "keyboard":
-            self._run_keyboard()
+    def resume(self):
+        if self._state == STATE_PAUSED:
+            self._set_state(STATE_RUNNING)
+
+    def toggle_pause(self):
+        if self._state == STATE_PAUSED:
+            self.resume()
         else:
-            self._run_mouse()
-            
-        self._is_running = False
-        self.sig_finished.emit()
+            self.pause()
+
+    def run(self):
+        self._paused_total = 0.0
+        self.stop_reason = None
+        started, t0 = time.time(), time.monotonic()
+        before = self.metrics.run_counters()
+        self.metrics.runs_total += 1
+        # 经 start() 启动时已是运行 (或已被停止/暂停) 状态; 直接调用 run() (模拟运行) 时在此进入运行
+        if self._state == STATE_IDLE: self._set_state(STATE_RUNNING)
+        self.log.append(INFO, EV_RUN_START, self.log.intern(self.mode.upper()))
+        self.flow = FlowController(self.flow_policy, self.backend.probe, background=self.backend.probe_blocks)
+        profiler = SamplingProfiler() if self.profile else None
+        if profiler: profiler.start(threading.get_ident())
+        self.phases.begin()
+
+        try:
+            try:
+                if self.mode == "keyboard":
+                    self._run_keyboard()
+                else:
+                    self._run_mouse()
+            except Exception as e:
+                # 未预料的异常: 记录后照常收尾 (按键已在各自的 finally 中抬起)
+                self.metrics.errors_total += 1
+                self.log.append(ERROR, EV_EXEC_ERROR, *self._cursor, text=str(e))
+                self.stop_reason = "error"
+
+            self.phases.end()
+            self.metrics.add_phases(self.phases)
+            if profiler: self._dump_profile(profiler)
+            self.log.message(INFO, self.phases.summary())
+            # 本机计时校准结果与耗时分布一起给出，便于判断调度误差来自程序还是系统计时
+            if self.clock.profile: self.log.message(INFO, self.clock.profile.summary())
+            if self.stop_reason:
+                outcome = self.stop_reason
+            else:
+                outcome = "stopped" if self._state == STATE_STOPPING else "completed"
+            after = self.metrics.run_counters()
+            self.last_run = {"started": started, "duration": time.monotonic() - t0, "mode": self.mode,
+                             "outcome": outcome, **{k: after[k] - before[k] for k in after}}
+        finally:
+            # 无论如何都回到空闲状态，并结束本次运行的探测线程 / 采样分析
+            self.flow.close()
+            if profiler: profiler.stop()
+            self._set_state(STATE_IDLE)
+            self.sig_finished.emit()
+
+    def _dump_profile(self, profiler):
+        profiler.stop()
+        try:
+            path = profiler.dump(PROFILE_DIR, time.strftime("run-%Y%m%d-%H%M%S"), self.phases)
+            self.log.message(INFO, f"📊 性能分析已保存: {path} (采样开销 {profiler.overhead:.2%})")
+        except Exception as e:
+            self.log.message(ERROR, f"❌ 性能分析保存失败: {str(e)}")
 
     def _run_keyboard(self):
-        current_loop = 0
-        while self._is_running:
-            if self.kb_loop > 0 and current_loop >= self.kb_loop:
-                break
-            
-            current_loop += 1
-            for idx, action in enumerate(self.kb_actions):
-                if not self._is_running: break
-                
-                key_raw = action.get('key')
-                delay = action.get('delay', 100)
-                
-                # 格式化日志
-                fmt_key = TextUtils.format_key_text(key_raw)
+        current_loop, start_step = 0, 0
+        if self.kb_resume:
+            current_loop, start_step = self.kb_resume
+            current_loop -= 1
+            self.log.append(INFO, EV_RESUME, current_loop + 1, start_step + 1)
+
+        log = self.log
+        metrics = self.metrics
+        phases = self.phases
+        perf = time.perf_counter
+        window_lost = False
+        # 绝对时间线: 每步的计划时刻 = 上一步计划时刻 + delay，调度误差不累积
+        clock = self.clock
+        backend = self.backend
+        t_next = clock.now()
+        try:
+            while self._is_running:
+                # 循环边界: 换入热更新的计划 (续跑的首轮从中途开始，不在此换入)
+                if start_step == 0 and self._pending_plan is not None:
+                    self._apply_pending_plan(current_loop + 1)
+                if self.kb_loop > 0 and current_loop >= self.kb_loop:
+                    break
                 
-                # 检查窗口句柄有效性
-                target_hwnd = self.kb_hwnd
-                if target_hwnd != 0 and not win32gui.IsWindow(target_hwnd):
-                    self.sig_progress.emit(f"⚠️ 目标窗口已失效，切换至前台模式")
-                    target_hwnd = 0
-
-                self.sig_progress.emit(f"第 {current_loop} 轮 | 按键: {fmt_key}")
-
-                try:
-                    if target_hwnd == 0:
-                        # --- 前台模式 ---
-                        keyboard.send(key_raw)
+                current_loop += 1
+                # 重复块在遍历时按次数循环，不展开; idx 为展开后的序号
+                for idx, step in iter_plan(self.kb_steps, start_step):
+                    self._cursor = (current_loop, idx)
+                    # 步骤边界: 暂停时会先抬起所有仍按住的按键
+                    if self._state == STATE_PAUSED: t_next += self._wait_while_paused()
+                    if not self._is_running: break
+                    
+                    # 检查窗口句柄有效性
+                    target_hwnd = self.kb_hwnd
+                    t = perf()
+                    alive = target_hwnd == 0 or backend.is_window(target_hwnd)
+                    phases.add(PH_WINDOW, perf() - t)
+                    if not alive:
+                        if not window_lost:
+                            log.append(WARN, EV_WINDOW_LOST, target_hwnd)
+                            metrics.window_lost_total += 1
+                        window_lost = True
+                        target_hwnd = 0
+
+                    now = clock.now()
+                    if now - t_next > self.RESYNC_LAG:
+                        # 严重落后 (如系统卡顿) 时重新对齐，避免补发一串积压按键
+                        t_next = now
+
+                    # 各步骤返回是否完整执行; 中途被停止的步骤不推进进度，续跑时从该步骤重新开始
+                    if isinstance(step, MouseStep):
+                        done = self._run_mouse_step(step, target_hwnd, current_loop, idx)
+                        # 轨迹耗时不计入 delay，delay 从点击完成后开始计算
+                        t_next = clock.now()
+                    elif isinstance(step, TextStep):
+                        done = self._run_text_step(step, target_hwnd, current_loop, idx)
+                        t_next = clock.now()
+                    elif isinstance(step, WaitStep):
+                        done = self._run_wait_step(step, target_hwnd, current_loop, idx)
+                        if not done and self._is_running:
+                            # 超时即停止: 续跑时重新等待
+                            self.stop_reason = "wait_timeout"
+                            self.stop()
+                        t_next = clock.now()
                     else:
-                        # --- 后台模式 (优化版) ---
-                        # 1. 获取键码
-                        vk = BackgroundInput.get_vk_code(key_raw)
-                        if vk:
-                            # 2. 模拟按下
-                            BackgroundInput.key_down(target_hwnd, vk)
-                            # 3. 稍微等待一小会儿 (模拟真实按键停留，提高成功率)
-                            time.sleep(0.05) 
-                            # 4. 模拟抬起
-                            BackgroundInput.key_up(target_hwnd, vk)
-                        else:
-                            self.sig_progress.emit(f"⚠️ 无法解析按键: {key_raw}")
-
-                except Exception as e:
-                    self.sig_progress.emit(f"❌ 执行错误: {e}")
-
-                # 执行用户设定的等待时长
-                # 减去上面占用的 0.05s，保持节奏准确
-                wait_time = max(0, (delay / 1000.0) - 0.05)
-                self._smart_sleep(wait_time)
-            
-            if self._is_running: time.sleep(0.05)
+                        done = self._press_key(step, target_hwnd, current_loop, idx)
+                    if not done: break
+                    self._advance(current_loop, idx)
 
-    def _run_mouse(self):
-        import ctypes
-        MOUSEEVENTF_LEFTDOWN = 0x0002
-        MOUSEEVENTF_LEFTUP = 0x0004
-        MOUSEEVENTF_RIGHTDOWN = 0x0008
-        MOUSEEVENTF_RIGHTUP = 0x0010
+                    # 等待期间按时抬起已到期的按键，下一个按键无需等待上一个抬起
+                    t_next = self._wait_until(t_next + self._gap(step.delay))
+                    if t_next is None: break
+
+                start_step = 0
+                if self._is_running: metrics.loops_total += 1
+            # 正常结束: 最后几个按键按满各自的按住时长再抬起 (停止/异常时由下面立即抬起)
+            if self._is_running and self._pending_ups:
+                if self._wait_until(max(deadline for deadline, _ in self._pending_ups)) is not None:
+                    self._release_due(clock.now())
+        finally:
+            # 停止/异常时保证不会卡键
+            self._release_all()
+
+        if self._state == STATE_STOPPING:
+            # 用户中止: 保留检查点，下次可选择续跑
+            self.checkpoint.save(self.kb_hash, *self._cursor, force=True)
+        else:
+            self.checkpoint.clear()
+
+    def _press_key(self, step, hwnd, current_loop, idx):
+        """
+        按下按键；有按住时长的按键只发送按下，抬起作为独立的定时事件排队
+        返回 False 表示在流控等待期间被停止 (按键未发出)
+        """
+        log = self.log
+        perf = time.perf_counter
+        key_raw = step.key
+        key_id = self._key_ids.get(key_raw, 0)
+        t = perf()
+        log.append(INFO, EV_KEY, current_loop, idx, key_id)
+        self.phases.add(PH_LOG, perf() - t)
+        hold = step.hold
+        if hold is None:
+            hold = self.DEFAULT_BG_HOLD if hwnd else 0.0
+        hold = hold / self.speed if self.speed > 0 else min(hold, self.min_gap)
+        backend = self.backend
+        # 拥塞时按 drop 策略丢弃的按键视为已执行
+        if hwnd and not self._admit(hwnd, True): return self._state != STATE_STOPPING
 
+        t = perf()
+        try:
+            if hwnd == 0:
+                # --- 前台模式 ---
+                if hold > 0:
+                    self._key_down(0, key_raw, hold)
+                else:
+                    backend.send_key(key_raw)
+            else:
+                # --- 后台模式 ---
+                vk = BackgroundInput.get_vk_code(key_raw)
+                if not vk and len(key_raw) == 1:
+                    # 没有虚拟键码的单个字符 (如中文) 直接投递 WM_CHAR
+                    backend.post_chars(hwnd, encode_units(key_raw))
+                    self._posted(hwnd)
+                    self.metrics.sends_total += 1
+                    return True
+                if not vk:
+                    log.append(WARN, EV_BAD_KEY, current_loop, idx, key_id)
+                    return True
+                if hold > 0:
+                    self._key_down(hwnd, vk, hold)
+                else:
+                    backend.key_down(hwnd, vk)
+                    backend.key_up(hwnd, vk)
+                self._posted(hwnd)
+            self.metrics.sends_total += 1
+        except Exception as e:
+            self._send_error(e, hwnd, current_loop, idx)
+        finally:
+            self.phases.add(PH_SEND, perf() - t)
+        return True
+
+    def _key_down(self, hwnd, key, hold):
+        """按下并登记抬起时刻; key 在前台模式为按键字符串，后台模式为虚拟键码"""
+        token = (hwnd, key)
+        if token in self._held:
+            # 同一按键仍处于按下状态: 先抬起，避免被目标当作长按连发
+            self._key_up(token)
+        if hwnd:
+            self.backend.key_down(hwnd, key)
+        else:
+            self.backend.press_key(key)
+        deadline = self.clock.now() + hold
+        self._held[token] = deadline
+        heapq.heappush(self._pending_ups, (deadline, token))
+
+    def _key_up(self, token, retry=True):
+        hwnd, key = token
+        self._held.pop(token, None)
+        t = time.perf_counter()
+        try:
+            if hwnd:
+                self.backend.key_up(hwnd, key)
+            else:
+                self.backend.release_key(key)
+        except Exception as e:
+            self._send_error(e, hwnd, *self._cursor)
+            if retry and hwnd and is_queue_full(e):
+                # 抬起不能丢: 按当前节奏稍后重试，避免卡键
+                deadline = self.clock.now() + max(self.flow.pace, FlowController.MIN_PACE)
+                self._held[token] = deadline
+                heapq.heappush(self._pending_ups, (deadline, token))
+        finally:
+            self.phases.add(PH_SEND, time.perf_counter() - t)
+
+    def _release_due(self, now):
+        pending = self._pending_ups
+        while pending and pending[0][0] <= now:
+            deadline, token = heapq.heappop(pending)
+            # 已被提前抬起 (重复按下/暂停) 的条目直接丢弃
+            if self._held.get(token) == deadline:
+                self._key_up(token)
+
+    def _release_all(self):
+        for token in list(self._held):
+            self._key_up(token, retry=False)
+        self._pending_ups.clear()
+
+    def _wait_until(self, deadline):
+        """
+        等待到计划时刻，期间按时处理到期的抬起事件
+        返回顺延暂停时长后的实际时刻；被停止时返回 None
+        """
+        paused0 = self._paused_total
+        pending = self._pending_ups
+        # 按住期间同样立即响应暂停: 暂停时抬起所有按键 (清空 pending)，截止时间顺延暂停时长
+        while pending and pending[0][0] < deadline + self._paused_total - paused0:
+            if not self._sleep_until(pending[0][0]): return None
+            self._release_due(self.clock.now())
+        if not self._sleep_until(deadline + self._paused_total - paused0): return None
+        return deadline + self._paused_total - paused0
+
+    def _admit(self, hwnd, droppable):
+        """
+        后台发送前的流控: 未到放行时刻时按策略等待或丢弃
+        返回 False 表示本次不发送 (被丢弃或等待期间被停止)
+        """
+        flow = self.flow
+        now = self.clock.now()
+        wait = flow.delay(now)
+        if wait <= 0: return True
+        if droppable and flow.policy == "drop":
+            self.metrics.flow_dropped_total += 1
+            return False
+        self.metrics.flow_delayed_seconds += wait
+        return self._sleep_until(now + wait)
+
+    def _posted(self, hwnd):
+        """后台发送完成: 记录放行时刻，到期时探测一次目标窗口响应"""
+        flow = self.flow
+        now = self.clock.now()
+        flow.sent(now)
+        if flow.probe_due(now):
+            t = time.perf_counter()
+            changed = flow.run_probe(hwnd, now)
+            self.phases.add(PH_WINDOW, time.perf_counter() - t)
+            if changed is None: return
+            self.metrics.observe_flow(flow)
+            if changed: self._log_flow()
+
+    def _log_flow(self):
+        flow = self.flow
+        latency_ms = int((flow.probe_timeout if flow.latency is None else flow.latency) * 1000)
+        if flow.congested:
+            self.metrics.flow_congested_total += 1
+            action = "降速" if flow.policy == "slow" else "丢弃多余事件"
+            self.log.append(WARN, EV_FLOW_SLOW, latency_ms, int(flow.pace * 1000), self.log.intern(action))
+        else:
+            self.log.append(INFO, EV_FLOW_OK, latency_ms)
+
+    def _send_error(self, e, hwnd, current_loop, idx):
+        """发送异常: 后台投递失败按系统错误码给出原因，队列已满同时作为拥塞信号"""
+        self.metrics.errors_total += 1
+        log = self.log
+        if hwnd and post_error_code(e) is not None:
+            self.metrics.post_failures_total += 1
+            log.append(ERROR, EV_POST_FAILED, current_loop, idx, text=describe_post_error(e))
+            if is_queue_full(e) and self.flow.enabled:
+                self.metrics.observe_flow(self.flow)
+                if self.flow.queue_full(self.clock.now()): self._log_flow()
+        else:
+            log.append(ERROR, EV_EXEC_ERROR, current_loop, idx, text=str(e))
+
+    def _gap(self, seconds):
+        """步骤间延时: 按速度缩放，极速模式下为最小间隔"""
+        return seconds / self.speed if self.speed > 0 else self.min_gap
+
+    def _advance(self, current_loop, idx):
+        """步骤已发出，推进进度并 (节流) 落盘；之后的等待中断也不会重发"""
+        self._cursor = (current_loop, idx + 1)
+        self.checkpoint.save(self.kb_hash, current_loop, idx + 1)
+
+    def _run_mouse_step(self, step, hwnd, current_loop, idx):
+        """按预生成的时间偏移逐点推送轨迹，最后在终点点击; 中途被停止时返回 False"""
+        self.log.append(INFO, EV_MOUSE, current_loop, idx, step.x, step.y)
+        backend = self.backend
+        try:
+            if hwnd:
+                width, height = backend.client_size(hwnd)
+                if step.max_x >= width or step.max_y >= height:
+                    self.log.append(WARN, EV_OUT_OF_CLIENT, width, height)
+            perf = time.perf_counter
+            phases = self.phases
+            # 轨迹内的时间偏移按速度缩放，极速模式下连续发出
+            scale = 1.0 / self.speed if self.speed > 0 else 0.0
+            t0 = self.clock.now()
+            paused0 = self._paused_total
+            for i, offset in enumerate(step.offsets):
+                # 暂停的时长顺延到后续每个点上，保持轨迹形状
+                if not self._sleep_until(t0 + offset * scale + self._paused_total - paused0): return False
+                t = perf()
+                if hwnd:
+                    # 拥塞时中间点可丢弃，轨迹终点与点击只会被延后
+                    if not self._admit(hwnd, i < len(step.offsets) - 1):
+                        if self._state == STATE_STOPPING: return False
+                        continue
+                    backend.mouse_move(hwnd, step.lparams[i])
+                    self._posted(hwnd)
+                else:
+                    backend.cursor_move(*step.points[i])
+                phases.add(PH_SEND, perf() - t)
+                self.metrics.moves_total += 1
+            if step.click == "move": return True
+            double = step.click == "double"
+            if hwnd and not self._admit(hwnd, False): return False
+            t = perf()
+            if hwnd:
+                backend.mouse_click(hwnd, step.button, step.lparams[-1], double)
+                self._posted(hwnd)
+            else:
+                backend.cursor_click(step.button, double)
+            phases.add(PH_SEND, perf() - t)
+            self.metrics.sends_total += 1
+        except Exception as e:
+            self._send_error(e, hwnd, current_loop, idx)
+        return True
+
+    def _run_text_step(self, step, hwnd, current_loop, idx):
+        """按块发送预编码的文本: 后台为一串 WM_CHAR，前台为一次 SendInput; 中途被停止时返回 False"""
+        self.log.append(INFO, EV_TEXT, current_loop, idx, step.length)
+        backend = self.backend
+        try:
+            scale = 1.0 / self.speed if self.speed > 0 else 0.0
+            t0 = self.clock.now()
+            paused0 = self._paused_total
+            for i, offset in enumerate(step.offsets):
+                if not self._sleep_until(t0 + offset * scale + self._paused_total - paused0): return False
+                # 文本不能丢字: 拥塞时只会延后
+                if hwnd and not self._admit(hwnd, False): return False
+                t = time.perf_counter()
+                if hwnd:
+                    backend.post_chars(hwnd, step.chunks[i])
+                    self._posted(hwnd)
+                else:
+                    backend.send_input(step.batches[i])
+                self.phases.add(PH_SEND, time.perf_counter() - t)
+                self.metrics.sends_total += len(step.chunks[i])
+        except Exception as e:
+            self._send_error(e, hwnd, current_loop, idx)
+        return True
+
+    def _run_wait_step(self, step, hwnd, current_loop, idx):
+        """
+        阻塞直到窗口条件成立或超时，期间响应暂停/停止
+        返回 False 表示被停止，或超时且 on_timeout 为 stop
+        """
+        log = self.log
+        text_id = step.text_id
+        log.append(INFO, EV_WAIT, current_loop, idx, text_id)
+        watcher = self.watcher
+        if watcher is None: return True
+        clock = self.clock
+        start = clock.now()
+        deadline = start + step.timeout if step.timeout > 0 else None
+        poll = watcher.needs_poll(step.cond)
+        watcher.subscribe(self._wake, poll)
+        try:
+            while True:
+                if self._state == STATE_STOPPING: return False
+                if self._state == STATE_PAUSED:
+                    paused = self._wait_while_paused()
+                    if deadline is not None: deadline += paused
+                    continue
+                seen = watcher.version
+                # 在锁外求值: 读取其他窗口标题时可能要等 GUI 线程响应，持锁会与钩子回调互锁
+                met = watcher.check(step.cond, step.pattern, hwnd)
+                waited_ms = int((clock.now() - start) * 1000)
+                if met:
+                    log.append(INFO, EV_WAIT_DONE, current_loop, idx, text_id, waited_ms)
+                    return True
+                if deadline is not None and clock.now() >= deadline:
+                    log.append(WARN, EV_WAIT_TIMEOUT, current_loop, idx, text_id, waited_ms)
+                    return step.on_timeout != "stop"
+                with self._cond:
+                    # 求值期间已有新事件或状态变化: 直接重新求值
+                    if watcher.version != seen or self._state != STATE_RUNNING: continue
+                    clock.wait(self._cond, None if deadline is None else deadline - clock.now())
+        except Exception as e:
+            self.metrics.errors_total += 1
+            log.append(ERROR, EV_EXEC_ERROR, current_loop, idx, text=str(e))
+            return True
+        finally:
+            watcher.unsubscribe(self._wake, poll)
+
+    def _wake(self):
+        """窗口事件回调 (钩子所在线程): 唤醒正在等待条件的执行线程"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run_mouse(self):
         interval = 1.0 / self.mouse_cps
+        double = self.mouse_click == 'double'
+        hwnd = self.mouse_hwnd
+        backend = self.backend
+        lparam = BackgroundInput.make_lparam(*self.mouse_pos) if self.mouse_pos else 0
+        if hwnd and not self.mouse_pos:
+            self.log.append(WARN, EV_NEED_POS)
+            hwnd = 0
 
+        self.log.append(INFO, EV_CLICKING, self.mouse_cps)
+        phases = self.phases
+        perf = time.perf_counter
+        clock = self.clock
+        # 绝对时间线: 点击间隔不受发送耗时与睡眠超调影响
+        t_next = clock.now()
         while self._is_running:
-            self.sig_progress.emit(f"🖱️ 点击中... (速度: {self.mouse_cps} 次/秒)")
-            
-            if self.mouse_type == 'left':
-                ctypes.windll.user32.mouse_event(MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                ctypes.windll.user32.mouse_event(MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
-                if self.mouse_click == 'double':
-                    time.sleep(0.05)
-                    ctypes.windll.user32.mouse_event(MOUSEEVENTF_LEFTDOWN, 0, 0, 0, 0)
-                    ctypes.windll.user32.mouse_event(MOUSEEVENTF_LEFTUP, 0, 0, 0, 0)
+            t = perf()
+            alive = not hwnd or backend.is_window(hwnd)
+            phases.add(PH_WINDOW, perf() - t)
+            if not alive:
+                self.log.append(WARN, EV_WINDOW_LOST, hwnd)
+                self.metrics.window_lost_total += 1
+                hwnd = 0
+
+            t = perf()
+            if hwnd:
+                # 连点: 拥塞时按策略丢弃或延后多余的点击
+                if self._admit(hwnd, True):
+                    try:
+                        backend.mouse_click(hwnd, self.mouse_type, lparam, double)
+                        self._posted(hwnd)
+                        self.metrics.sends_total += 1
+                    except Exception as e:
+                        self._send_error(e, hwnd, 0, 0)
             else:
-                ctypes.windll.user32.mouse_event(MOUSEEVENTF_RIGHTDOWN, 0, 0, 0, 0)
-                ctypes.windll.user32.mouse_event(MOUSEEVENTF_RIGHTUP, 0, 0, 0, 0)
+                if self.mouse_pos:
+                    backend.cursor_move(*self.mouse_pos)
+                backend.cursor_click(self.mouse_type, double)
+                self.metrics.sends_total += 1
+            phases.add(PH_SEND, perf() - t)
+
+            t_next += interval
+            now = clock.now()
+            if now - t_next > self.RESYNC_LAG: t_next = now
+            t_next = self._wait_until(t_next)
+            if t_next is None: break
+
+    def _wait_while_paused(self):
+        """阻塞直到恢复或停止，返回暂停时长；暂停期间不保留任何按下的按键"""
+        self._release_all()
+        if self.mode == "keyboard":
+            loop, step = self._cursor
+            self.checkpoint.save(self.kb_hash, loop, step, force=True)
+            self.log.append(INFO, EV_PAUSED, loop, step + 1)
+        else:
+            self.log.message(INFO, "⏸ 已暂停")
+        start = self.clock.now()
+        with self._cond:
+            while self._state == STATE_PAUSED:
+                self._cond.wait()
+        paused = self.clock.now() - start
+        self._paused_total += paused
+        return paused
+
+    def _sleep_until(self, deadline, pausable=True):
+        """
+        睡眠到指定的时钟时刻，被停止时立即返回 False
+        pausable=True 时暂停期间挂起，并把暂停时长顺延到截止时间上
+        """
+        with self._cond:
+            while True:
+                if self._state == STATE_STOPPING: return False
+                if pausable and self._state == STATE_PAUSED:
+                    self._cond.release()
+                    try:
+                        deadline += self._wait_while_paused()
+                    finally:
+                        self._cond.acquire()
+                    continue
+                remaining = deadline - self.clock.now()
+                if remaining <= 0:
+                    self.metrics.observe_lateness(-remaining)
+                    return True
+                t = time.perf_counter()
+                self.clock.wait(self._cond, remaining)
+                self.phases.add(PH_SLEEP, time.perf_counter() - t)
 
-            self._smart_sleep(interval)
 
-    def _smart_sleep(self, seconds):
-        end = time.time() + seconds
-        while time.time() < end:
-            if not self._is_running: return
-            time.sleep(0.01)
\ No newline at end of file
+def dry_run(actions, loop, hwnd=0, speed=1.0, min_gap=0.0):
+    """
+    在虚拟时钟 + 空后端上同步执行一遍宏，不发送任何输入、不写检查点
+    loop=0 (无限循环) 时只模拟一轮
+    """
+    clock = VirtualClock()
+    backend = NullBackend(clock)
+    executor = TaskExecutor(clock, backend, CheckpointStore(None))
+    loops = loop if loop > 0 else 1
+    executor.setup_keyboard(actions, loops, hwnd, speed=speed, min_gap=min_gap)
+    executor.run()
+    return DryRunResult(backend.events, clock.now() - backend.t0, loops)
\ No newline at end of file
@@ -0,0 +1,178 @@
+import threading
+
+# 后台发送拥塞策略: slow 等待放行 (整体降速)，drop 丢弃可丢弃的事件 (按键/轨迹点/连点)，off 不做流控
+FLOW_POLICIES = ("slow", "drop", "off")
+FLOW_LABELS = ("🐢 降速", "✂️ 丢弃", "关闭")
+
+# PostMessage 失败时的系统错误码
+ERROR_ACCESS_DENIED = 5           # UIPI: 目标窗口权限更高
+ERROR_INVALID_WINDOW_HANDLE = 1400
+ERROR_NOT_ENOUGH_QUOTA = 1816     # 目标线程消息队列已满 (默认上限 10000 条)
+POST_ERRORS = {
+    ERROR_ACCESS_DENIED: "目标窗口权限更高 (需以管理员身份运行)",
+    ERROR_INVALID_WINDOW_HANDLE: "窗口句柄无效",
+    ERROR_NOT_ENOUGH_QUOTA: "目标消息队列已满",
+}
+
+
+class QueueFull(Exception):
+    """模拟的消息队列已满 (与 pywintypes.error 一样携带 winerror)"""
+    winerror = ERROR_NOT_ENOUGH_QUOTA
+
+
+def post_error_code(exc):
+    return getattr(exc, "winerror", None)
+
+
+def is_queue_full(exc):
+    return post_error_code(exc) == ERROR_NOT_ENOUGH_QUOTA
+
+
+def describe_post_error(exc):
+    """PostMessage 异常 -> 可读原因"""
+    return POST_ERRORS.get(post_error_code(exc), str(exc))
+
+
+# 后台探测尚无新结果
+_PENDING = object()
+
+
+class _ProbeWorker:
+    """
+    在独立线程执行探测 (真实探测为同步往返，最长阻塞 probe_timeout)
+    执行线程只发起请求、读取最近一次完成的结果，从不等待
+    """
+
+    def __init__(self, probe, timeout):
+        self._probe = probe
+        self._timeout = timeout
+        self._cond = threading.Condition()
+        self._hwnd = None
+        self._busy = False
+        self._closed = False
+        self._result = _PENDING
+        self._thread = threading.Thread(target=self._run, name="FlowProbe", daemon=True)
+        self._thread.start()
+
+    def request(self, hwnd):
+        """空闲时发起一次探测；上一次尚未完成时忽略"""
+        with self._cond:
+            if self._busy or self._closed: return
+            self._hwnd = hwnd
+            self._busy = True
+            self._cond.notify()
+
+    def take(self):
+        """取走最近完成的结果 (秒或 None)，没有新结果时返回 _PENDING"""
+        with self._cond:
+            result, self._result = self._result, _PENDING
+            return result
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._busy and not self._closed: self._cond.wait()
+                if self._closed: return
+                hwnd = self._hwnd
+            try:
+                latency = self._probe(hwnd, self._timeout)
+            except Exception:
+                latency = None
+            with self._cond:
+                self._result = latency
+                self._busy = False
+
+
+class FlowController:
+    """
+    后台发送的自适应节流 (每次运行一个实例，只由执行线程调用)
+    发送后按固定间隔探测一次目标窗口的响应延迟:
+    延迟超过阈值 / 探测超时 / 投递失败时最小发送间隔加倍 (且不小于探测延迟)，恢复后逐步缩短至 0
+    background=True 时探测在独立线程进行，结果在下一次到期时生效 (晚一个探测间隔)
+    """
+    # 间隔的下限 (首次拥塞时的起步值) 与上限 (秒)
+    MIN_PACE = 0.005
+    MAX_PACE = 0.5
+    # 恢复时每次探测的缩短比例
+    RECOVER = 0.75
+
+    def __init__(self, policy="slow", probe=None, probe_interval=0.2, probe_timeout=0.1, target_latency=0.03,
+                 background=False):
+        if policy not in FLOW_POLICIES:
+            raise ValueError(f"未知拥塞策略: {policy}")
+        self.policy = policy
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.target_latency = target_latency
+        self.background = background
+        self._worker = None
+        # 当前最小发送间隔 (秒)，0 表示不限速
+        self.pace = 0.0
+        # 最近一次探测的延迟 (秒)，None 表示超时
+        self.latency = 0.0
+        self.congested = False
+        self._next_send = 0.0
+        self._next_probe = 0.0
+
+    @property
+    def enabled(self):
+        return self.policy != "off"
+
+    def delay(self, now):
+        """距离下一次允许发送还需等待的时间 (秒)"""
+        return self._next_send - now if self.enabled else 0.0
+
+    def sent(self, now):
+        self._next_send = now + self.pace
+
+    def probe_due(self, now):
+        return self.enabled and self.probe is not None and now >= self._next_probe
+
+    def run_probe(self, hwnd, now):
+        """
+        探测一次并更新节奏; 返回拥塞状态是否发生变化
+        后台探测时发起下一次探测并应用上一次的结果，上一次尚未完成时返回 None
+        """
+        self._next_probe = now + self.probe_interval
+        if not self.background:
+            return self.observe(self.probe(hwnd, self.probe_timeout))
+        if self._worker is None:
+            self._worker = _ProbeWorker(self.probe, self.probe_timeout)
+        latency = self._worker.take()
+        self._worker.request(hwnd)
+        return None if latency is _PENDING else self.observe(latency)
+
+    def close(self):
+        """结束后台探测线程 (运行结束时调用)"""
+        if self._worker:
+            self._worker.close()
+            self._worker = None
+
+    def observe(self, latency):
+        """
+        latency: 探测往返耗时 (秒)，None 表示超时 / 窗口挂起
+        返回拥塞状态是否发生变化
+        """
+        self.latency = latency
+        slow = latency is None or latency > self.target_latency
+        if slow:
+            # 不快于目标窗口的响应速度: 间隔至少为本次探测延迟 (超时按探测超时计)
+            floor = self.probe_timeout if latency is None else latency
+            self.pace = min(self.MAX_PACE, max(self.pace * 2, floor, self.MIN_PACE))
+        elif self.pace:
+            self.pace = self.pace * self.RECOVER if self.pace * self.RECOVER >= self.MIN_PACE else 0.0
+        # 拥塞在间隔完全恢复后才算解除，避免在阈值附近反复切换
+        changed = slow != self.congested and (slow or not self.pace)
+        if changed: self.congested = slow
+        return changed
+
+    def queue_full(self, now):
+        """投递失败 (队列已满) 按超时处理，并推迟下一次探测"""
+        self._next_probe = now + self.probe_interval
+        return self.observe(None)
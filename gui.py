@@ -2,12 +2,20 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, 
     QTableWidgetItem, QLabel, QHeaderView, QAbstractItemView, 
     QSpinBox, QFrame, QRadioButton, QButtonGroup, QComboBox, QStackedWidget,
-    QDialog, QMessageBox, QCheckBox
+    QDialog, QMessageBox, QCheckBox, QTableView, QFileDialog, QPlainTextEdit, QLineEdit
 )
-from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot, QAbstractTableModel, QModelIndex, QTimer
 from PyQt6.QtGui import QFont, QColor
+import re
+import json
+import time
+import datetime
 import keyboard
 from utils import TextUtils
+from eventlog import LEVEL_NAMES, WARN, ERROR
+from scheduler import Trigger
+from flowctl import FLOW_POLICIES, FLOW_LABELS
+from history import OUTCOME_TEXT
 
 # --- 按键录制窗口 ---
 class KeyRecorderDialog(QDialog):
@@ -81,11 +89,11 @@ class KeyRecorderDialog(QDialog):
 
 # --- 热键设置窗口 ---
 class HotkeySettingDialog(QDialog):
-    def __init__(self, current_start, current_stop, current_bind, parent=None):
+    def __init__(self, current_start, current_stop, current_bind, current_pause="f8", parent=None):
         super().__init__(parent)
         self.setWindowTitle("修改全局热键")
-        self.resize(400, 250)
-        self.results = {"start": current_start, "stop": current_stop, "bind": current_bind}
+        self.resize(400, 290)
+        self.results = {"start": current_start, "stop": current_stop, "bind": current_bind, "pause": current_pause}
         
         layout = QVBoxLayout()
         def create_row(label_text, key_key):
@@ -105,6 +113,7 @@ class HotkeySettingDialog(QDialog):
         layout.addLayout(create_row("🚀 启动热键:", "start"))
         layout.addLayout(create_row("⛔ 停止热键:", "stop"))
         layout.addLayout(create_row("📌 绑定热键:", "bind"))
+        layout.addLayout(create_row("⏸ 暂停热键:", "pause"))
         
         btn_box = QHBoxLayout()
         btn_ok = QPushButton("保存并关闭")
@@ -123,6 +132,473 @@ class HotkeySettingDialog(QDialog):
                 self.results[key_key] = new_key
                 label_widget.setText(TextUtils.format_key_text(new_key))
 
+# --- 鼠标动作编辑窗口 ---
+class MouseActionDialog(QDialog):
+    BUTTONS = ["left", "right"]
+    CLICKS = ["click", "double", "move"]
+    PATHS = ["none", "linear", "bezier", "jitter"]
+
+    def __init__(self, action=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("鼠标动作")
+        self.resize(360, 280)
+        action = action or {}
+
+        layout = QVBoxLayout()
+        def add_row(label_text, widget):
+            row = QHBoxLayout()
+            lbl = QLabel(label_text)
+            lbl.setFixedWidth(110)
+            row.addWidget(lbl)
+            row.addWidget(widget, 1)
+            layout.addLayout(row)
+
+        self.combo_button = QComboBox()
+        self.combo_button.addItems(["左键 (Left)", "右键 (Right)"])
+        self.combo_button.setCurrentIndex(self.BUTTONS.index(action.get("button", "left")))
+        add_row("🖱️ 按键类型:", self.combo_button)
+
+        self.combo_click = QComboBox()
+        self.combo_click.addItems(["单击 (Single)", "双击 (Double)", "仅移动 (Move)"])
+        self.combo_click.setCurrentIndex(self.CLICKS.index(action.get("click", "click")))
+        add_row("⚡ 点击方式:", self.combo_click)
+
+        self.spin_x = QSpinBox()
+        self.spin_x.setRange(0, 32767)
+        self.spin_x.setValue(action.get("x", 0))
+        add_row("📍 X (客户区):", self.spin_x)
+
+        self.spin_y = QSpinBox()
+        self.spin_y.setRange(0, 32767)
+        self.spin_y.setValue(action.get("y", 0))
+        add_row("📍 Y (客户区):", self.spin_y)
+
+        self.combo_path = QComboBox()
+        self.combo_path.addItems(["瞬移 (None)", "直线 (Linear)", "曲线 (Bezier)", "抖动 (Jitter)"])
+        self.combo_path.setCurrentIndex(self.PATHS.index(action.get("path", "none")))
+        add_row("〰️ 移动轨迹:", self.combo_path)
+
+        self.spin_duration = QSpinBox()
+        self.spin_duration.setRange(0, 10000)
+        self.spin_duration.setSingleStep(50)
+        self.spin_duration.setValue(action.get("duration", 200))
+        add_row("⏱️ 移动耗时 (ms):", self.spin_duration)
+
+        btn_box = QHBoxLayout()
+        btn_ok = QPushButton("确定")
+        btn_ok.clicked.connect(self.accept)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_ok)
+        layout.addStretch()
+        layout.addLayout(btn_box)
+        self.setLayout(layout)
+
+    def get_action(self, delay):
+        return {
+            "type": "mouse",
+            "button": self.BUTTONS[self.combo_button.currentIndex()],
+            "click": self.CLICKS[self.combo_click.currentIndex()],
+            "x": self.spin_x.value(),
+            "y": self.spin_y.value(),
+            "path": self.PATHS[self.combo_path.currentIndex()],
+            "duration": self.spin_duration.value(),
+            "delay": delay,
+        }
+
+# --- 文本输入动作编辑窗口 ---
+class TextActionDialog(QDialog):
+    def __init__(self, action=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("文本输入")
+        self.resize(420, 320)
+        action = action or {}
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("要输入的文本 (支持中文与换行):"))
+        self.edit_text = QPlainTextEdit()
+        self.edit_text.setPlainText(action.get("text", ""))
+        layout.addWidget(self.edit_text)
+
+        row = QHBoxLayout()
+        row.addWidget(QLabel("⚡ 速度 (字/秒, 0=不限):"))
+        self.spin_cps = QSpinBox()
+        self.spin_cps.setRange(0, 10000)
+        self.spin_cps.setValue(action.get("cps", 30))
+        row.addWidget(self.spin_cps)
+        row.addWidget(QLabel("📦 每批字数:"))
+        self.spin_chunk = QSpinBox()
+        self.spin_chunk.setRange(1, 1024)
+        self.spin_chunk.setValue(action.get("chunk", 16))
+        row.addWidget(self.spin_chunk)
+        layout.addLayout(row)
+
+        btn_box = QHBoxLayout()
+        btn_ok = QPushButton("确定")
+        btn_ok.clicked.connect(self.accept)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_ok)
+        layout.addLayout(btn_box)
+        self.setLayout(layout)
+
+    def get_action(self, delay):
+        return {
+            "type": "text",
+            "text": self.edit_text.toPlainText(),
+            "cps": self.spin_cps.value(),
+            "chunk": self.spin_chunk.value(),
+            "delay": delay,
+        }
+
+class WaitActionDialog(QDialog):
+    CONDS = ["exists", "foreground", "title", "responding"]
+    ON_TIMEOUT = ["continue", "stop"]
+
+    def __init__(self, action=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("等待条件")
+        self.resize(380, 240)
+        action = action or {}
+
+        layout = QVBoxLayout()
+        def add_row(label_text, widget):
+            row = QHBoxLayout()
+            lbl = QLabel(label_text)
+            lbl.setFixedWidth(110)
+            row.addWidget(lbl)
+            row.addWidget(widget, 1)
+            layout.addLayout(row)
+
+        self.combo_cond = QComboBox()
+        self.combo_cond.addItems(["窗口存在", "成为前台窗口", "标题匹配 (正则)", "恢复响应 (非“未响应”)"])
+        self.combo_cond.setCurrentIndex(self.CONDS.index(action.get("cond", "exists")))
+        add_row("⏳ 条件:", self.combo_cond)
+
+        self.edit_pattern = QLineEdit(action.get("pattern", ""))
+        self.edit_pattern.setPlaceholderText("窗口标题 (留空 = 绑定窗口)")
+        add_row("🔍 标题:", self.edit_pattern)
+
+        self.spin_timeout = QSpinBox()
+        self.spin_timeout.setRange(0, 3600000)
+        self.spin_timeout.setSingleStep(1000)
+        self.spin_timeout.setSuffix(" ms")
+        self.spin_timeout.setSpecialValueText("不限时")
+        self.spin_timeout.setValue(action.get("timeout", 10000))
+        add_row("⏱️ 超时:", self.spin_timeout)
+
+        self.combo_on_timeout = QComboBox()
+        self.combo_on_timeout.addItems(["继续执行", "停止任务"])
+        self.combo_on_timeout.setCurrentIndex(self.ON_TIMEOUT.index(action.get("on_timeout", "continue")))
+        add_row("↪️ 超时后:", self.combo_on_timeout)
+
+        btn_box = QHBoxLayout()
+        btn_ok = QPushButton("确定")
+        btn_ok.clicked.connect(self.check_accept)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_ok)
+        layout.addLayout(btn_box)
+        self.setLayout(layout)
+
+    def check_accept(self):
+        cond = self.CONDS[self.combo_cond.currentIndex()]
+        pattern = self.edit_pattern.text()
+        if cond == "title":
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                QMessageBox.warning(self, "提示", f"正则表达式无效: {e}")
+                return
+        self.accept()
+
+    def get_action(self, delay):
+        return {
+            "type": "wait",
+            "cond": self.CONDS[self.combo_cond.currentIndex()],
+            "pattern": self.edit_pattern.text(),
+            "timeout": self.spin_timeout.value(),
+            "on_timeout": self.ON_TIMEOUT[self.combo_on_timeout.currentIndex()],
+            "delay": delay,
+        }
+
+class TriggerDialog(QDialog):
+    """定时任务编辑 (JSON 列表)，确定前校验并预览每个任务的下次触发时间"""
+    EXAMPLE = ('[{"name": "日常", "macro": "daily", "at": "03:00"},\n'
+               ' {"macro": "", "interval": 1800, "jitter": 60, "missed": "once", "overlap": "queue"},\n'
+               ' {"macro": "weekly", "cron": "30 8 * * 1-5"}]')
+
+    def __init__(self, specs, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("⏰ 定时任务")
+        self.resize(560, 460)
+        self.specs = specs
+
+        layout = QVBoxLayout()
+        lbl_help = QLabel(
+            "每项: macro (macros 目录下的宏名，空为当前配置) + cron / at (HH:MM) / interval (秒) 之一\n"
+            "可选: jitter (随机延后秒数), missed (skip / once), overlap (skip / queue / restart), enabled")
+        lbl_help.setStyleSheet("color: #616161; font-size: 12px;")
+        layout.addWidget(lbl_help)
+        self.edit = QPlainTextEdit(json.dumps(specs, ensure_ascii=False, indent=2) if specs else self.EXAMPLE)
+        self.edit.setFont(QFont("Consolas", 10))
+        layout.addWidget(self.edit, 1)
+        self.lbl_preview = QLabel()
+        self.lbl_preview.setWordWrap(True)
+        layout.addWidget(self.lbl_preview)
+
+        btn_box = QHBoxLayout()
+        btn_check = QPushButton("🔍 校验")
+        btn_check.clicked.connect(self.preview)
+        btn_ok = QPushButton("确定")
+        btn_ok.clicked.connect(self.check_accept)
+        btn_box.addWidget(btn_check)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_ok)
+        layout.addLayout(btn_box)
+        self.setLayout(layout)
+
+    def _parse(self):
+        """返回 (specs, 触发器列表)，出错时抛出 ValueError"""
+        try:
+            specs = json.loads(self.edit.toPlainText() or "[]")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON 格式错误: {e}")
+        if not isinstance(specs, list) or not all(isinstance(s, dict) for s in specs):
+            raise ValueError("需要一个由对象组成的列表")
+        return specs, [Trigger(s) for s in specs]
+
+    def preview(self):
+        try:
+            _, triggers = self._parse()
+            now = time.time()
+            lines = [f"{t.name}: 下次 {datetime.datetime.fromtimestamp(t.next_base(now)).strftime('%m-%d %H:%M:%S')}"
+                     + ("" if t.enabled else " (已停用)") for t in triggers]
+        except (ValueError, TypeError, OverflowError, OSError) as e:
+            self.lbl_preview.setText(f"❌ {e}")
+            return False
+        self.lbl_preview.setText("✅ " + ("\n".join(lines) if lines else "无定时任务"))
+        return True
+
+    def check_accept(self):
+        if not self.preview(): return
+        self.specs = self._parse()[0]
+        self.accept()
+
+# --- 运行日志窗口 ---
+class EventLogModel(QAbstractTableModel):
+    """直接读取环形日志的表格模型: 只渲染可见行，不复制记录"""
+    HEADERS = ["时间", "级别", "消息"]
+    LEVEL_COLORS = {WARN: QColor("#EF6C00"), ERROR: QColor("#C62828")}
+
+    def __init__(self, log, parent=None):
+        super().__init__(parent)
+        self.log = log
+        self._rows = 0
+        self._seq = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.log):
+            return None
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole):
+            return None
+        rec = self.log.record(index.row())
+        ts, level = rec[0], rec[1]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.LEVEL_COLORS.get(level)
+        col = index.column()
+        if col == 0:
+            return datetime.datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3]
+        if col == 1:
+            return LEVEL_NAMES.get(level, str(level))
+        return self.log.format(rec)
+
+    def refresh(self):
+        """同步新记录，返回是否有变化"""
+        seq = self.log.seq
+        if seq == self._seq: return False
+        rows = len(self.log)
+        if seq < self._seq or rows < self._rows:
+            # 日志被清空
+            self.beginResetModel()
+            self._rows = rows
+            self.endResetModel()
+        else:
+            if rows > self._rows:
+                self.beginInsertRows(QModelIndex(), self._rows, rows - 1)
+                self._rows = rows
+                self.endInsertRows()
+            if seq > self.log.capacity:
+                # 环形缓冲已回绕，旧行整体前移
+                self.dataChanged.emit(self.index(0, 0), self.index(rows - 1, len(self.HEADERS) - 1))
+        self._seq = seq
+        return True
+
+
+class LogViewerDialog(QDialog):
+    sig_calibrate = pyqtSignal()
+
+    def __init__(self, log, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("运行日志")
+        self.resize(640, 420)
+        self.log = log
+
+        layout = QVBoxLayout()
+        self.model = EventLogModel(log, self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.verticalHeader().setVisible(False)
+        # 固定行高，滚动时只计算可见区域
+        self.view.verticalHeader().setDefaultSectionSize(20)
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.view.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.view.setColumnWidth(0, 100)
+        self.view.setColumnWidth(1, 60)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        layout.addWidget(self.view)
+
+        btn_box = QHBoxLayout()
+        self.chk_follow = QCheckBox("跟随最新")
+        self.chk_follow.setChecked(True)
+        self.lbl_count = QLabel("")
+        self.lbl_count.setStyleSheet("color: #757575;")
+        btn_export = QPushButton("📤 导出 JSONL")
+        btn_export.clicked.connect(self.export_log)
+        btn_clear = QPushButton("🧹 清空")
+        btn_clear.clicked.connect(self.clear_log)
+        btn_calibrate = QPushButton("🧭 校准计时")
+        btn_calibrate.setToolTip("重新测量本机的睡眠超调、唤醒延迟与输入调用耗时")
+        btn_calibrate.clicked.connect(self.sig_calibrate)
+        btn_box.addWidget(self.chk_follow)
+        btn_box.addWidget(self.lbl_count)
+        btn_box.addStretch()
+        btn_box.addWidget(btn_calibrate)
+        btn_box.addWidget(btn_export)
+        btn_box.addWidget(btn_clear)
+        layout.addLayout(btn_box)
+        self.setLayout(layout)
+
+        # 仅在窗口可见时刷新
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start(200)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        if self.model.refresh():
+            self.lbl_count.setText(f"{len(self.log)} / {self.log.capacity} 条")
+            if self.chk_follow.isChecked():
+                self.view.scrollToBottom()
+
+    def clear_log(self):
+        self.log.clear()
+        self.refresh()
+
+    def export_log(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出日志", "autokey_log.jsonl", "JSON Lines (*.jsonl)")
+        if path:
+            ok, msg = self.log.export_jsonl(path)
+            if not ok:
+                QMessageBox.critical(self, "导出失败", msg)
+
+# --- 运行历史窗口 ---
+class HistoryDialog(QDialog):
+    """运行历史 (按时间范围 / 宏筛选)，底部为汇总: 平均 CPS、窗口失效次数等"""
+    HEADERS = ["开始", "时长", "宏", "目标窗口", "模式", "结果", "轮数", "发送", "CPS", "窗口失效"]
+    RANGES = (("今天", 0), ("最近 7 天", 7), ("最近 30 天", 30), ("全部", None))
+    RUN_LIMIT = 500
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("📈 运行历史")
+        self.resize(820, 460)
+        self.store = store
+
+        layout = QVBoxLayout()
+        filter_box = QHBoxLayout()
+        self.combo_range = QComboBox()
+        for text, days in self.RANGES:
+            self.combo_range.addItem(text, days)
+        self.combo_range.setCurrentIndex(1)
+        self.combo_macro = QComboBox()
+        self.chk_lost = QCheckBox("仅窗口失效")
+        filter_box.addWidget(QLabel("范围:"))
+        filter_box.addWidget(self.combo_range)
+        filter_box.addWidget(QLabel("宏:"))
+        filter_box.addWidget(self.combo_macro, 1)
+        filter_box.addWidget(self.chk_lost)
+        layout.addLayout(filter_box)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.setColumnWidth(0, 110)
+        layout.addWidget(self.table)
+        self.lbl_summary = QLabel()
+        self.lbl_summary.setWordWrap(True)
+        self.lbl_summary.setStyleSheet("color: #37474F;")
+        layout.addWidget(self.lbl_summary)
+        self.setLayout(layout)
+
+        # 先提交尚在写入队列中的记录 (刚结束的运行也能看到)
+        store.flush(1.0)
+        self.combo_macro.addItem("全部", None)
+        for name in store.macros():
+            self.combo_macro.addItem(name, name)
+        self.combo_range.currentIndexChanged.connect(self.refresh)
+        self.combo_macro.currentIndexChanged.connect(self.refresh)
+        self.chk_lost.toggled.connect(self.refresh)
+        self.refresh()
+
+    def _since(self):
+        days = self.combo_range.currentData()
+        if days is None: return None
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        return (today - datetime.timedelta(days=max(days - 1, 0))).timestamp()
+
+    def refresh(self):
+        since, macro = self._since(), self.combo_macro.currentData()
+        if self.chk_lost.isChecked():
+            runs = self.store.window_loss_runs(since, macro, limit=self.RUN_LIMIT)
+        else:
+            runs = self.store.recent(self.RUN_LIMIT, since, macro)
+        self.table.setRowCount(len(runs))
+        for r, run in enumerate(runs):
+            duration = run["duration"]
+            cells = [datetime.datetime.fromtimestamp(run["started"]).strftime("%m-%d %H:%M:%S"),
+                     f"{duration:.1f}s", run["macro"], run["target"],
+                     "鼠标" if run["mode"] == "mouse" else "键盘",
+                     OUTCOME_TEXT.get(run["outcome"], run["outcome"]),
+                     str(run["loops"]), str(run["sends"]),
+                     f"{run['sends'] / duration:.1f}" if duration else "-", str(run["window_lost"])]
+            for c, text in enumerate(cells):
+                self.table.setItem(r, c, QTableWidgetItem(text))
+        s = self.store.summary(since, macro)
+        # 汇总包含已归档为按天统计的旧记录，明细列表只显示未归档的部分
+        self.lbl_summary.setText(
+            f"共 {s['runs']} 次运行, 累计 {s['duration'] / 60:.1f} 分钟, 发送 {s['sends']} 次, "
+            f"平均 CPS {s['avg_cps']:.2f}, 窗口失效 {s['window_lost_runs']} 次, "
+            f"提前停止 {s['stopped_runs']} 次, 错误 {s['errors']} 次")
+
 # --- 主界面 UI ---
 class MainWindowUI(QWidget):
     def __init__(self):
@@ -190,11 +666,13 @@ class MainWindowUI(QWidget):
         self.lbl_start_hk = QLabel("启动: F9")
         self.lbl_stop_hk = QLabel("停止: F10")
         self.lbl_bind_hk = QLabel("绑定: F11")
-        for lbl in [self.lbl_start_hk, self.lbl_stop_hk, self.lbl_bind_hk]:
+        self.lbl_pause_hk = QLabel("暂停: F8")
+        for lbl in [self.lbl_start_hk, self.lbl_stop_hk, self.lbl_bind_hk, self.lbl_pause_hk]:
             lbl.setStyleSheet("font-weight: bold; color: #424242; padding: 4px; margin-right: 10px;")
         hk_layout.addWidget(self.lbl_start_hk)
         hk_layout.addWidget(self.lbl_stop_hk)
         hk_layout.addWidget(self.lbl_bind_hk)
+        hk_layout.addWidget(self.lbl_pause_hk)
         hk_layout.addStretch()
         self.btn_mod_hotkey = QPushButton("🛠️ 修改热键")
         self.btn_mod_hotkey.setStyleSheet("""
@@ -202,6 +680,24 @@ class MainWindowUI(QWidget):
             QPushButton:hover { background-color: #BBDEFB; }
         """)
         hk_layout.addWidget(self.btn_mod_hotkey)
+        self.btn_log = QPushButton("📜 日志")
+        self.btn_log.setStyleSheet("""
+            QPushButton { background-color: #ECEFF1; color: #37474F; border: 1px solid #B0BEC5; font-weight: bold; }
+            QPushButton:hover { background-color: #CFD8DC; }
+        """)
+        hk_layout.addWidget(self.btn_log)
+        self.btn_triggers = QPushButton("⏰ 定时")
+        self.btn_triggers.setStyleSheet("""
+            QPushButton { background-color: #FFF8E1; color: #E65100; border: 1px solid #FFCC80; font-weight: bold; }
+            QPushButton:hover { background-color: #FFECB3; }
+        """)
+        hk_layout.addWidget(self.btn_triggers)
+        self.btn_history = QPushButton("📈 历史")
+        self.btn_history.setStyleSheet("""
+            QPushButton { background-color: #E8F5E9; color: #2E7D32; border: 1px solid #A5D6A7; font-weight: bold; }
+            QPushButton:hover { background-color: #C8E6C9; }
+        """)
+        hk_layout.addWidget(self.btn_history)
         main_layout.addWidget(hk_frame)
 
         # 2. 模式选择 (新增：操作录制)
@@ -230,6 +726,10 @@ class MainWindowUI(QWidget):
         mode_layout.addWidget(self.rb_record)
         
         mode_layout.addStretch()
+        self.chk_profile = QCheckBox("📊 性能分析")
+        self.chk_profile.setToolTip("对下一次运行采样分析，结束后在 profiles 目录生成报告与火焰图数据")
+        mode_layout.addWidget(self.chk_profile)
+        mode_layout.addSpacing(10)
         self.chk_tray = QCheckBox("关闭时最小化到托盘")
         mode_layout.addWidget(self.chk_tray)
         main_layout.addLayout(mode_layout)
@@ -251,6 +751,13 @@ class MainWindowUI(QWidget):
         self.btn_refresh_win = QPushButton("🔄")
         self.btn_refresh_win.setFixedWidth(40)
         win_layout.addWidget(self.btn_refresh_win)
+        # 后台模式拥塞策略 (目标窗口卡顿时降速或丢弃多余事件)
+        win_layout.addWidget(QLabel("拥塞:"))
+        self.combo_flow = QComboBox()
+        for text, policy in zip(FLOW_LABELS, FLOW_POLICIES):
+            self.combo_flow.addItem(text, policy)
+        self.combo_flow.setToolTip("后台模式下目标窗口响应变慢时: 降速等待 / 丢弃多余的按键、轨迹点与连点 / 不处理")
+        win_layout.addWidget(self.combo_flow)
         layout_kb.addLayout(win_layout)
         
         # 循环设置
@@ -261,6 +768,23 @@ class MainWindowUI(QWidget):
         self.spin_loop.setValue(1)
         self.spin_loop.setFixedWidth(100)
         loop_layout.addWidget(self.spin_loop)
+
+        # 播放速度 (0 = 极速，步骤间隔取最小间隔)
+        loop_layout.addWidget(QLabel("速度:"))
+        self.combo_speed = QComboBox()
+        for text, speed in [("0.5x", 0.5), ("1x", 1.0), ("2x", 2.0), ("10x", 10.0), ("⚡ 极速", 0.0)]:
+            self.combo_speed.addItem(text, speed)
+        self.combo_speed.setCurrentIndex(1)
+        loop_layout.addWidget(self.combo_speed)
+        self.spin_min_gap = QSpinBox()
+        self.spin_min_gap.setRange(0, 1000)
+        self.spin_min_gap.setValue(10)
+        self.spin_min_gap.setSuffix(" ms")
+        self.spin_min_gap.setToolTip("极速模式下相邻步骤的最小间隔")
+        self.spin_min_gap.setEnabled(False)
+        self.combo_speed.currentIndexChanged.connect(
+            lambda: self.spin_min_gap.setEnabled(self.combo_speed.currentData() == 0))
+        loop_layout.addWidget(self.spin_min_gap)
         
         lbl_hint = QLabel("💡 点击选中对应行 / 双击修改单元格内容 💡")
         lbl_hint.setStyleSheet("color: #757575; font-size: 12px; margin-left: 10px;")
@@ -269,8 +793,8 @@ class MainWindowUI(QWidget):
         layout_kb.addLayout(loop_layout)
 
         # 表格
-        self.table = QTableWidget(0, 3) 
-        self.table.setHorizontalHeaderLabels(["序号", "按键内容", "等待时长 (ms)"])
+        self.table = QTableWidget(0, 4) 
+        self.table.setHorizontalHeaderLabels(["序号", "按键内容", "等待时长 (ms)", "按住 (ms)"])
         self.table.verticalHeader().setVisible(False)
         self.table.setAlternatingRowColors(True)
         
@@ -278,8 +802,10 @@ class MainWindowUI(QWidget):
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)   
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch) 
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)   
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)   
         self.table.setColumnWidth(0, 50)
         self.table.setColumnWidth(2, 110)
+        self.table.setColumnWidth(3, 80)
         
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -289,13 +815,30 @@ class MainWindowUI(QWidget):
         # 编辑按钮
         tb_btns = QHBoxLayout()
         self.btn_add = QPushButton("➕ 添加")
+        self.btn_add_mouse = QPushButton("🖱️ 鼠标")
+        self.btn_add_text = QPushButton("⌨️ 文本")
+        self.btn_add_wait = QPushButton("⏳ 等待")
+        self.btn_add_wait.setToolTip("等待窗口出现 / 成为前台 / 标题匹配 / 恢复响应后再继续")
         self.btn_del = QPushButton("➖ 删除")
         self.btn_up = QPushButton("⬆️ 上移")
         self.btn_down = QPushButton("⬇️ 下移")
+        self.btn_compress = QPushButton("🗜️ 压缩")
+        self.btn_compress.setToolTip("将相邻重复的动作折叠为重复块")
+        self.btn_dry_run = QPushButton("🧪 模拟")
+        self.btn_dry_run.setToolTip("按当前速度在虚拟时钟上模拟运行，不发送任何输入")
+        self.btn_apply = QPushButton("🔁 应用修改")
+        self.btn_apply.setToolTip("运行中编辑后点击: 校验并编译新计划，在当前一轮结束时换入，不中断运行")
+        self.btn_apply.setEnabled(False)
         tb_btns.addWidget(self.btn_add)
+        tb_btns.addWidget(self.btn_add_mouse)
+        tb_btns.addWidget(self.btn_add_text)
+        tb_btns.addWidget(self.btn_add_wait)
         tb_btns.addWidget(self.btn_del)
         tb_btns.addWidget(self.btn_up)
         tb_btns.addWidget(self.btn_down)
+        tb_btns.addWidget(self.btn_compress)
+        tb_btns.addWidget(self.btn_dry_run)
+        tb_btns.addWidget(self.btn_apply)
         layout_kb.addLayout(tb_btns)
         self.stack.addWidget(page_kb)
 
@@ -344,6 +887,20 @@ class MainWindowUI(QWidget):
         
         row_m3.addWidget(self.spin_m_cps)
         m_layout.addLayout(row_m3)
+
+        # 指定坐标 (绑定窗口时为客户区坐标，可后台点击)
+        row_m4 = QHBoxLayout()
+        self.chk_m_pos = QCheckBox("📍 指定坐标:")
+        row_m4.addWidget(self.chk_m_pos)
+        self.spin_m_x = QSpinBox()
+        self.spin_m_x.setRange(0, 32767)
+        self.spin_m_x.setMinimumHeight(35)
+        self.spin_m_y = QSpinBox()
+        self.spin_m_y.setRange(0, 32767)
+        self.spin_m_y.setMinimumHeight(35)
+        row_m4.addWidget(self.spin_m_x)
+        row_m4.addWidget(self.spin_m_y)
+        m_layout.addLayout(row_m4)
         
         m_layout.addStretch()
         layout_mouse.addWidget(m_frame)
@@ -395,9 +952,20 @@ class MainWindowUI(QWidget):
             QPushButton:disabled { background-color: #E0E0E0; color: #9E9E9E; }
         """)
         self.btn_stop.setEnabled(False)
+
+        self.btn_pause = QPushButton("⏸ 暂停")
+        self.btn_pause.setFixedHeight(50)
+        self.btn_pause.setStyleSheet("""
+            QPushButton { background-color: #FFC107; color: white; font-weight: bold; font-size: 16px; border: none; border-radius: 6px; }
+            QPushButton:hover { background-color: #FFB300; }
+            QPushButton:disabled { background-color: #E0E0E0; color: #9E9E9E; }
+        """)
+        self.btn_pause.setEnabled(False)
         
         ctrl_layout.addWidget(self.btn_start)
         ctrl_layout.addSpacing(15)
+        ctrl_layout.addWidget(self.btn_pause)
+        ctrl_layout.addSpacing(15)
         ctrl_layout.addWidget(self.btn_stop)
         main_layout.addLayout(ctrl_layout)
 
@@ -423,6 +991,16 @@ class MainWindowUI(QWidget):
         self.rb_mouse.toggled.connect(lambda: self._switch_page(1))
         self.rb_record.toggled.connect(lambda: self._switch_page(2))
 
+    def teardown_ui(self):
+        """释放 setup_ui 创建的全部控件 (窗口对象本身保留，可再次调用 setup_ui 重建)"""
+        layout = self.layout()
+        if layout is not None:
+            # 布局转移到临时控件上，随其同步销毁 (连同布局中的所有子控件)
+            QWidget().setLayout(layout)
+        # 剩余的直接子控件 (如日志窗口等对话框)
+        for child in self.findChildren(QWidget, options=Qt.FindChildOption.FindDirectChildrenOnly):
+            child.deleteLater()
+
     def _switch_page(self, index):
         """切换页面并处理按钮状态"""
         self.stack.setCurrentIndex(index)
@@ -0,0 +1,269 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+# 单次运行记录的字段 (与 runs 表的列一一对应)
+RUN_FIELDS = ("started", "duration", "macro", "target", "mode", "outcome",
+              "loops", "sends", "moves", "errors", "window_lost", "dropped")
+# 运行结束原因: 跑完全部循环 / 用户停止 / 等待超时停止 / 执行异常
+OUTCOMES = ("completed", "stopped", "wait_timeout", "error")
+OUTCOME_TEXT = {"completed": "完成", "stopped": "停止", "wait_timeout": "等待超时", "error": "出错"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    macro TEXT NOT NULL,
+    target TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    loops INTEGER NOT NULL DEFAULT 0,
+    sends INTEGER NOT NULL DEFAULT 0,
+    moves INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    window_lost INTEGER NOT NULL DEFAULT 0,
+    dropped INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started);
+CREATE INDEX IF NOT EXISTS idx_runs_macro ON runs(macro, started);
+CREATE INDEX IF NOT EXISTS idx_runs_target ON runs(target, started);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    macro TEXT NOT NULL,
+    target TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    loops INTEGER NOT NULL,
+    sends INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    window_lost INTEGER NOT NULL,
+    window_lost_runs INTEGER NOT NULL,
+    stopped_runs INTEGER NOT NULL,
+    PRIMARY KEY (day, macro, target, mode)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_macro ON daily(macro, day);
+"""
+
+# 超期明细按 (本地日期, 宏, 目标, 模式) 汇总进 daily 后删除
+_ROLLUP = """
+INSERT INTO daily
+SELECT date(started, 'unixepoch', 'localtime'), macro, target, mode,
+       count(*), sum(duration), sum(loops), sum(sends), sum(moves), sum(errors),
+       sum(window_lost), sum(window_lost > 0), sum(outcome != 'completed')
+FROM runs WHERE started < ?
+GROUP BY 1, macro, target, mode
+ON CONFLICT (day, macro, target, mode) DO UPDATE SET
+    runs = runs + excluded.runs, duration = duration + excluded.duration,
+    loops = loops + excluded.loops, sends = sends + excluded.sends,
+    moves = moves + excluded.moves, errors = errors + excluded.errors,
+    window_lost = window_lost + excluded.window_lost,
+    window_lost_runs = window_lost_runs + excluded.window_lost_runs,
+    stopped_runs = stopped_runs + excluded.stopped_runs
+"""
+
+
+# 写线程的控制标记: 立即提交当前批次
+_FLUSH = object()
+
+
+def _day(ts):
+    return time.strftime("%Y-%m-%d", time.localtime(ts))
+
+
+class HistoryStore:
+    """
+    运行历史 (本地 SQLite)
+    append() 只把记录放进内存队列，由后台写线程按批提交，执行线程与 GUI 线程都不会等待磁盘
+    超过 retain_days 的明细汇总为按天统计后删除，数据库大小只随天数 × 宏数增长
+    查询各自打开独立连接 (WAL 模式下读写互不阻塞)
+    """
+    DEFAULT_FILE = "run_history.db"
+    # 写线程攒批的最长时间 (秒) 与单批上限
+    BATCH_INTERVAL = 2.0
+    BATCH_SIZE = 500
+    # 汇总检查间隔 (秒)
+    ROLLUP_INTERVAL = 3600
+
+    def __init__(self, filepath=DEFAULT_FILE, retain_days=30):
+        self.filepath = filepath
+        self.retain_days = retain_days
+        self.written = 0
+        self.last_error = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._flushed = threading.Condition()
+        self._pending = 0
+
+    # --- 写入 ---
+    def start(self):
+        if self._thread: return
+        self._thread = threading.Thread(target=self._writer, name="HistoryWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """提交剩余记录后结束写线程"""
+        if not self._thread: return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def append(self, record):
+        """record: 含 RUN_FIELDS 各字段的 dict; 不做任何 I/O，立即返回"""
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(record)
+
+    def flush(self, timeout=5.0):
+        """立即提交已入队的记录并等待落盘 (供查询前调用)，返回是否在超时内完成"""
+        if not self._thread: return False
+        self._queue.put(_FLUSH)
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _writer(self):
+        try:
+            conn = self._connect()
+            conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+            conn = None
+        next_rollup = 0.0
+        running = conn is not None
+        while running:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.BATCH_INTERVAL)
+                deadline = time.monotonic() + self.BATCH_INTERVAL
+                while item is not None and item is not _FLUSH:
+                    batch.append(item)
+                    if len(batch) >= self.BATCH_SIZE: break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: break
+                    item = self._queue.get(timeout=remaining)
+                if item is None: running = False
+            except queue.Empty:
+                pass
+            if batch: self._write(conn, batch)
+            if time.monotonic() >= next_rollup:
+                self._rollup(conn)
+                next_rollup = time.monotonic() + self.ROLLUP_INTERVAL
+        if conn is not None: conn.close()
+        with self._flushed:
+            # 写线程退出后未写入的记录不再等待
+            self._pending = 0
+            self._flushed.notify_all()
+
+    def _write(self, conn, batch):
+        rows = [tuple(r.get(f, 0) for f in RUN_FIELDS) for r in batch]
+        try:
+            with conn:
+                conn.executemany(f"INSERT INTO runs ({', '.join(RUN_FIELDS)}) VALUES ({', '.join('?' * len(RUN_FIELDS))})", rows)
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+        with self._flushed:
+            self._pending -= len(batch)
+            self._flushed.notify_all()
+
+    def _rollup(self, conn, now=None):
+        if not self.retain_days: return
+        cutoff = (now or time.time()) - self.retain_days * 86400
+        try:
+            with conn:
+                conn.execute(_ROLLUP, (cutoff,))
+                conn.execute("DELETE FROM runs WHERE started < ?", (cutoff,))
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+
+    # --- 查询 ---
+    def _query(self, sql, params=()):
+        if not os.path.exists(self.filepath): return []
+        try:
+            conn = sqlite3.connect(self.filepath, timeout=10)
+        except sqlite3.Error:
+            return []
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _filters(since=None, macro=None, target=None, day_column=False):
+        """since 为时间戳; daily 表按本地日期过滤"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("day >= ?" if day_column else "started >= ?")
+            params.append(_day(since) if day_column else since)
+        if macro is not None:
+            clauses.append("macro = ?")
+            params.append(macro)
+        if target is not None:
+            clauses.append("target = ?")
+            params.append(target)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def recent(self, limit=200, since=None, macro=None, target=None):
+        """最近的运行明细 (新的在前)，每行为 dict"""
+        where, params = self._filters(since, macro, target)
+        rows = self._query(f"SELECT {', '.join(RUN_FIELDS)} FROM runs{where} ORDER BY started DESC LIMIT ?",
+                           params + [limit])
+        return [dict(zip(RUN_FIELDS, r)) for r in rows]
+
+    def window_loss_runs(self, since=None, macro=None, limit=200):
+        """运行期间目标窗口失效过的运行"""
+        where, params = self._filters(since, macro)
+        where += (" AND" if where else " WHERE") + " window_lost > 0"
+        rows = self._query(f"SELECT {', '.join(RUN_FIELDS)} FROM runs{where} ORDER BY started DESC LIMIT ?",
+                           params + [limit])
+        return [dict(zip(RUN_FIELDS, r)) for r in rows]
+
+    def summary(self, since=None, macro=None, target=None, group_by=None):
+        """
+        汇总 (明细 + 已归档的按天统计): runs / duration / sends / avg_cps / errors / window_lost_runs / stopped_runs
+        group_by 为 "macro" 或 "target" 时返回 {分组: 汇总}，否则返回单个汇总
+        平均 CPS = 总发送数 / 总运行时长 (按时长加权)
+        """
+        if group_by not in (None, "macro", "target"):
+            raise ValueError(f"不支持的分组: {group_by}")
+        key = group_by or "''"
+        where, params = self._filters(since, macro, target)
+        d_where, d_params = self._filters(since, macro, target, day_column=True)
+        rows = self._query(f"""
+            SELECT k, sum(runs), sum(duration), sum(sends), sum(errors), sum(wl), sum(stopped) FROM (
+                SELECT {key} AS k, count(*) AS runs, sum(duration) AS duration, sum(sends) AS sends,
+                       sum(errors) AS errors, sum(window_lost > 0) AS wl, sum(outcome != 'completed') AS stopped
+                FROM runs{where} GROUP BY k
+                UNION ALL
+                SELECT {key}, sum(runs), sum(duration), sum(sends), sum(errors), sum(window_lost_runs), sum(stopped_runs)
+                FROM daily{d_where} GROUP BY 1
+            ) GROUP BY k ORDER BY sum(duration) DESC""", params + d_params)
+        result = {}
+        for k, runs, duration, sends, errors, wl, stopped in rows:
+            duration = duration or 0.0
+            result[k] = {"runs": runs or 0, "duration": duration, "sends": sends or 0,
+                         "avg_cps": (sends or 0) / duration if duration else 0.0,
+                         "errors": errors or 0, "window_lost_runs": wl or 0, "stopped_runs": stopped or 0}
+        if group_by: return result
+        return result.get("", {"runs": 0, "duration": 0.0, "sends": 0, "avg_cps": 0.0,
+                               "errors": 0, "window_lost_runs": 0, "stopped_runs": 0})
+
+    def average_cps(self, since=None, macro=None, target=None):
+        """例: average_cps(time.time() - 7 * 86400) 为最近一周的平均发送速率"""
+        return self.summary(since, macro, target)["avg_cps"]
+
+    def macros(self):
+        rows = self._query("SELECT macro FROM runs UNION SELECT macro FROM daily ORDER BY 1")
+        return [r[0] for r in rows]
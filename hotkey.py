@@ -2,18 +2,20 @@ import keyboard
 from PyQt6.QtCore import QObject, pyqtSignal
 
 class HotkeyManager(QObject):
-    # 定义三个信号
+    # 定义热键信号
     sig_start = pyqtSignal()
     sig_stop = pyqtSignal()
     sig_bind = pyqtSignal()
+    sig_pause = pyqtSignal()
 
     def __init__(self):
         super().__init__()
         self.start_key = "f9"
         self.stop_key = "f10"
         self.bind_key = "f11"
+        self.pause_key = "f8"
 
-    def register_hotkeys(self, start_key, stop_key, bind_key):
+    def register_hotkeys(self, start_key, stop_key, bind_key, pause_key="f8"):
         """
         统一注册所有热键
         """
@@ -23,14 +25,16 @@ class HotkeyManager(QObject):
         self.start_key = start_key
         self.stop_key = stop_key
         self.bind_key = bind_key
+        self.pause_key = pause_key
 
         try:
             # 注册新热键
             keyboard.add_hotkey(self.start_key, self._on_start_triggered)
             keyboard.add_hotkey(self.stop_key, self._on_stop_triggered)
             keyboard.add_hotkey(self.bind_key, self._on_bind_triggered)
+            keyboard.add_hotkey(self.pause_key, self._on_pause_triggered)
             
-            return True, f"热键已更新: 启动[{self.start_key}] 停止[{self.stop_key}] 绑定[{self.bind_key}]"
+            return True, f"热键已更新: 启动[{self.start_key}] 停止[{self.stop_key}] 绑定[{self.bind_key}] 暂停[{self.pause_key}]"
         except Exception as e:
             return False, f"热键注册失败: {str(e)}"
 
@@ -49,4 +53,7 @@ class HotkeyManager(QObject):
         self.sig_stop.emit()
 
     def _on_bind_triggered(self):
-        self.sig_bind.emit()
\ No newline at end of file
+        self.sig_bind.emit()
+
+    def _on_pause_triggered(self):
+        self.sig_pause.emit()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import os
+import re
+import threading
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+from plan import compile_actions, iter_key_actions, plan_size
+from config import ConfigManager, CheckpointStore
+from flowctl import FLOW_POLICIES
+from winwatch import WAIT_CONDS
+from utils import TextUtils
+from mouse_path import PATH_KINDS
+
+ACTION_TYPES = (None, "mouse", "text", "wait", "repeat", "trail")
+MOUSE_BUTTONS = ("left", "right")
+MOUSE_CLICKS = ("click", "double", "move")
+WAIT_ON_TIMEOUT = ("continue", "stop")
+# 轨迹类参数上限: 预编译按 时长 × 采样率 分配内存，配置文件里的异常值不能撑爆进程
+MAX_MOVE_DURATION = 10000    # 鼠标移动时长 (毫秒，与编辑对话框一致)
+MAX_TRAIL_POINTS = 100000    # 录制轨迹的顶点数
+MAX_TRAIL_HZ = 1000          # 重采样频率
+MAX_TRAIL_SAMPLES = 1000000  # 重采样后的点数 (轨迹时长 × 频率)
+
+
+class HotPlan:
+    """校验并编译完成、可直接换入运行中执行器的计划 (创建后只读)"""
+    __slots__ = ("data", "actions", "loop", "speed", "min_gap", "flow", "steps", "hash", "key_texts", "size", "source")
+
+    def __init__(self, data, steps, source=""):
+        self.data = data
+        self.actions = data.get("actions", [])
+        self.loop = data.get("loop", 0)
+        self.speed = float(data.get("speed", 1.0))
+        self.min_gap = data.get("min_gap", 0) / 1000.0
+        self.flow = data.get("flow", "slow")
+        self.steps = steps
+        self.hash = CheckpointStore.config_hash(self.actions, self.loop)
+        # 按键显示名在后台预先格式化，换入时只需登记到日志字符串表
+        self.key_texts = {a.get("key"): TextUtils.format_key_text(a.get("key")) for a in iter_key_actions(self.actions)}
+        self.size = plan_size(steps)
+        # 来源: 配置文件路径，空字符串表示界面
+        self.source = source
+
+    @property
+    def signature(self):
+        """判断两份计划是否等价 (与当前运行相同时无需换入)"""
+        return self.hash, self.speed, self.min_gap, self.flow
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_action(a):
+    """单个动作的错误描述，合法时返回 None (repeat 的子动作由调用方递归检查)"""
+    if not isinstance(a, dict): return "格式错误"
+    kind = a.get("type")
+    if kind not in ACTION_TYPES: return f"未知类型: {kind}"
+    if kind != "repeat" and not (_is_number(a.get("delay", 100)) and a.get("delay", 100) >= 0):
+        return f"等待时长无效: {a.get('delay')}"
+    if kind is None:
+        key = a.get("key")
+        if not isinstance(key, str) or not key.strip(): return "按键为空"
+        hold = a.get("hold")
+        if hold is not None and not (_is_number(hold) and hold >= 0): return f"按住时长无效: {hold}"
+    elif kind == "mouse":
+        if not (isinstance(a.get("x", 0), int) and isinstance(a.get("y", 0), int)): return "坐标必须为整数"
+        if a.get("button", "left") not in MOUSE_BUTTONS: return f"未知鼠标按键: {a.get('button')}"
+        if a.get("click", "click") not in MOUSE_CLICKS: return f"未知点击方式: {a.get('click')}"
+        if a.get("path", "none") not in PATH_KINDS: return f"未知移动轨迹: {a.get('path')}"
+        duration = a.get("duration", 0)
+        if not (_is_number(duration) and 0 <= duration <= MAX_MOVE_DURATION):
+            return f"移动时长无效 (0~{MAX_MOVE_DURATION} ms): {duration}"
+    elif kind == "trail":
+        points = a.get("points")
+        if not isinstance(points, list) or not points: return "轨迹为空"
+        if len(points) > MAX_TRAIL_POINTS: return f"轨迹点过多 ({len(points)} > {MAX_TRAIL_POINTS})"
+        if not all(isinstance(p, list) and len(p) == 3 and all(_is_number(v) for v in p) for p in points):
+            return "轨迹点格式错误 (应为 [x, y, t_ms])"
+        if any(q[2] < p[2] for p, q in zip(points, points[1:])): return "轨迹时间必须递增"
+        hz = a.get("hz", 1)
+        if not (_is_number(hz) and 0 < hz <= MAX_TRAIL_HZ): return f"重采样频率无效 (0~{MAX_TRAIL_HZ}): {hz}"
+        if (points[-1][2] - points[0][2]) / 1000.0 * hz > MAX_TRAIL_SAMPLES:
+            return f"轨迹过长: 重采样后超过 {MAX_TRAIL_SAMPLES} 个点"
+        if a.get("button", "left") not in MOUSE_BUTTONS: return f"未知鼠标按键: {a.get('button')}"
+        if a.get("click", "move") not in MOUSE_CLICKS: return f"未知点击方式: {a.get('click')}"
+    elif kind == "text":
+        if not isinstance(a.get("text", ""), str): return "文本格式错误"
+    elif kind == "wait":
+        if a.get("cond", "exists") not in WAIT_CONDS: return f"未知等待条件: {a.get('cond')}"
+        if a.get("on_timeout", "continue") not in WAIT_ON_TIMEOUT: return f"未知超时处理: {a.get('on_timeout')}"
+        if not (_is_number(a.get("timeout", 10000)) and a.get("timeout", 10000) >= 0): return "超时时长无效"
+        if a.get("cond") == "title":
+            try:
+                re.compile(a.get("pattern", ""))
+            except re.error as e:
+                return f"标题正则无效: {str(e)}"
+    elif kind == "repeat":
+        if not (isinstance(a.get("count", 1), int) and a.get("count", 1) >= 0): return f"重复次数无效: {a.get('count')}"
+        if not isinstance(a.get("actions", []), list): return "重复块内容格式错误"
+    return None
+
+
+def validate_actions(actions, prefix=""):
+    """逐个检查动作，返回第一处错误的描述 (含位置)，全部合法时返回 None"""
+    if not isinstance(actions, list): return f"{prefix}动作列表格式错误"
+    for i, a in enumerate(actions, 1):
+        where = f"{prefix}第 {i} 步"
+        err = _check_action(a)
+        if err: return f"{where}: {err}"
+        if a.get("type") == "repeat":
+            err = validate_actions(a.get("actions", []), f"{where} > ")
+            if err: return err
+    return None
+
+
+def build_plan(data, source=""):
+    """
+    配置 -> (HotPlan, msg)，校验或编译失败时 HotPlan 为 None
+    耗时的轨迹/文本预编译在此完成，供后台线程调用
+    """
+    if not isinstance(data, dict): return None, "配置格式错误"
+    actions = data.get("actions", [])
+    if not actions: return None, "没有任何动作"
+    err = validate_actions(actions)
+    if err: return None, err
+    loop = data.get("loop", 0)
+    if not (isinstance(loop, int) and loop >= 0): return None, f"循环次数无效: {loop}"
+    speed = data.get("speed", 1.0)
+    if not (_is_number(speed) and speed >= 0): return None, f"速度无效: {speed}"
+    if not (_is_number(data.get("min_gap", 0)) and data.get("min_gap", 0) >= 0): return None, "最小间隔无效"
+    if data.get("flow", "slow") not in FLOW_POLICIES: return None, f"未知拥塞策略: {data.get('flow')}"
+    try:
+        steps = compile_actions(actions)
+    except Exception as e:
+        return None, f"编译失败: {str(e)}"
+    return HotPlan(data, steps, source), "编译成功"
+
+
+class PlanReloader(QObject):
+    """
+    后台编译新计划并在 GUI 线程交付; 多次提交时只交付最后一次的结果
+    可监视一个配置文件，文件变化 (防抖后) 自动重新读取并提交
+    """
+    sig_ready = pyqtSignal(object)  # HotPlan
+    sig_failed = pyqtSignal(str, str)  # 来源, 原因
+    _sig_done = pyqtSignal(int, object, str, str)
+    DEBOUNCE_MS = 300
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._gen = 0
+        self.path = None
+        self._sig_done.connect(self._on_done)
+        self._fs = QFileSystemWatcher(self)
+        self._fs.fileChanged.connect(self._on_file_changed)
+        # 编辑器保存时常触发多次变化 (截断 + 写入 / 改名替换)，合并为一次
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.reload_file)
+
+    def submit(self, data, source=""):
+        self._gen += 1
+        threading.Thread(target=self._compile, args=(self._gen, data, source),
+                         name="PlanCompile", daemon=True).start()
+
+    def _compile(self, gen, data, source):
+        plan, msg = build_plan(data, source)
+        # 工作线程 -> GUI 线程 (排队连接)
+        self._sig_done.emit(gen, plan, msg, source)
+
+    def _on_done(self, gen, plan, msg, source):
+        if gen != self._gen: return  # 已有更新的提交
+        if plan is None:
+            self.sig_failed.emit(source, msg)
+        else:
+            self.sig_ready.emit(plan)
+
+    def watch(self, path):
+        """切换监视的配置文件 (None 停止监视)"""
+        if self._fs.files(): self._fs.removePaths(self._fs.files())
+        self._debounce.stop()
+        self.path = os.path.abspath(path) if path else None
+        if self.path and os.path.exists(self.path): self._fs.addPath(self.path)
+
+    def _on_file_changed(self, path):
+        self._debounce.start()
+
+    def reload_file(self):
+        if not self.path: return
+        # 改名替换式保存会让路径脱离监视，重新加入
+        if self.path not in self._fs.files() and os.path.exists(self.path):
+            self._fs.addPath(self.path)
+        data, msg = ConfigManager.load_config(self.path)
+        if data is None:
+            self.sig_failed.emit(self.path, msg)
+            return
+        self.submit(data, self.path)
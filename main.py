@@ -1,62 +1,141 @@
 import sys
 import os
+import gc
 import json
+import time
 import ctypes
 import keyboard
 from PyQt6.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QMessageBox, QFileDialog, QTableWidgetItem, QInputDialog)
 from PyQt6.QtGui import QIcon, QAction, QFont
 from PyQt6.QtCore import QTimer, pyqtSignal, pyqtSlot, Qt
 
-from gui import MainWindowUI, HotkeySettingDialog
-from executor import TaskExecutor
+from gui import (MainWindowUI, HotkeySettingDialog, MouseActionDialog, TextActionDialog, WaitActionDialog,
+                 LogViewerDialog, TriggerDialog, HistoryDialog)
+from executor import TaskExecutor, STATE_IDLE, STATE_PAUSED, STATE_RUNNING, dry_run
 from hotkey import HotkeyManager
-from config import ConfigManager
-from utils import WindowMgr, TextUtils, IconUtils
+from config import ConfigManager, CheckpointStore
+from compress import compress_actions, count_actions
+from eventlog import INFO, WARN, ERROR
+from control_api import ControlServer
+from winwatch import WindowWatcher, WinEventSource
+from scheduler import TriggerScheduler
+from hotreload import PlanReloader
+from history import HistoryStore
+from calibration import MachineProfile, CalibrationRunner
+from backend import CalibratedClock
+from winbackend import Win32Backend
+from utils import WindowMgr, TextUtils, IconUtils, ClientRectCache, MemoryUtils
 
 DEFAULT_CONFIG_FILE = "default_config.json"
+# 宏内容相关的配置项 (控制接口切换宏时只替换这些)
+MACRO_KEYS = ("loop", "actions", "mode", "mouse_cps", "mouse_pos", "mouse_type", "mouse_click", "speed", "min_gap", "flow")
+
+def parse_api_port(argv):
+    """解析 --api-port N (0 表示关闭控制接口)，未指定时返回 None"""
+    for i, arg in enumerate(argv):
+        if arg.startswith("--api-port="):
+            return int(arg.split("=", 1)[1])
+        if arg == "--api-port" and i + 1 < len(argv):
+            return int(argv[i + 1])
+    return None
 
 class AutoKeyApp(MainWindowUI):
     sig_bind_window = pyqtSignal(int, str)
 
-    def __init__(self):
+    def __init__(self, api_port=None):
         super().__init__()
+        self.cli_api_port = api_port
         
         self.executor = TaskExecutor()
+        # 所有 wait_for 步骤共用一个窗口事件监视器 (钩子装在 GUI 线程)
+        self.watcher = WindowWatcher(WinEventSource())
+        self.executor.watcher = self.watcher
+        # 定时触发 (不依赖主界面控件，精简托盘模式下照常运行)
+        self.scheduler = TriggerScheduler(self)
+        self._queued_trigger = None
+        # 热更新: 后台编译界面修改 / 配置文件变化，运行中在循环边界换入
+        self.reloader = PlanReloader(self)
+        # 运行历史: 每次运行结束追加一条，后台线程批量写入 SQLite
+        self.history = HistoryStore()
+        self.history.start()
+        self._run_info = None
+        # 本机计时校准: 缓存的结果按机器标识匹配，缺失时启动后在后台校准
+        self.calibrator = CalibrationRunner(self)
         self.hotkey_mgr = HotkeyManager()
+        self.control_server = ControlServer(self.executor, WindowMgr.find_window)
+        self.api_port = 0
+        self.api_token = ""
         self.config_mgr = ConfigManager()
         self.tray_icon = None
+        self.log_dialog = None
+        self._log_seq = 0
+        # 精简托盘模式: 界面释放期间的配置模型 (None 表示界面存在)
+        self._lean = None
+        self.lean_tray = True
         
         self.current_start_key = "f9"
         self.current_stop_key = "f10"
         self.current_bind_key = "f11"
+        self.current_pause_key = "f8"
         self.setWindowIcon(QIcon(IconUtils.create_default_icon()))
 
         self.bind_events()          
         self.init_tray()            
         self.load_startup_config()  
+        self.load_timing_profile()
         self.refresh_windows()      
+        ClientRectCache.install_hook()
+        self.watcher.start()
 
         self.sig_bind_window.connect(self.on_bind_window_signal)
 
+        # 状态栏按需从日志渲染最新一条 (执行线程不再逐条发信号)
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.poll_log)
+        self.status_timer.start(100)
+
     def bind_events(self):
+        self.bind_ui_events()
+        self.executor.sig_finished.connect(self.on_finished)
+        self.executor.sig_state.connect(self.on_executor_state)
+        self.hotkey_mgr.sig_start.connect(self.start_task)
+        self.hotkey_mgr.sig_stop.connect(self.stop_task)
+        self.hotkey_mgr.sig_bind.connect(self.do_bind_window)
+        self.hotkey_mgr.sig_pause.connect(self.pause_task)
+        self.control_server.sig_start.connect(self.on_api_start)
+        self.control_server.sig_bind.connect(self.on_api_bind)
+        self.scheduler.sig_fire.connect(self.on_trigger)
+        self.scheduler.sig_missed.connect(self.on_trigger_missed)
+        self.reloader.sig_ready.connect(self.on_plan_ready)
+        self.reloader.sig_failed.connect(self.on_plan_failed)
+        self.calibrator.sig_done.connect(self.on_calibrated)
+        self.calibrator.sig_failed.connect(lambda msg: self.update_status(f"❌ 计时校准失败: {msg}"))
+
+    def bind_ui_events(self):
+        """界面控件的信号 (重建界面后需重新连接)"""
         self.btn_mod_hotkey.clicked.connect(self.open_hotkey_settings)
         self.btn_add.clicked.connect(lambda: self.add_row_data("a", 1000))
+        self.btn_add_mouse.clicked.connect(self.add_mouse_row)
+        self.btn_add_text.clicked.connect(self.add_text_row)
+        self.btn_add_wait.clicked.connect(self.add_wait_row)
+        self.btn_compress.clicked.connect(self.compress_rows)
+        self.btn_dry_run.clicked.connect(self.dry_run_rows)
+        self.btn_apply.clicked.connect(self.apply_edits)
         self.btn_del.clicked.connect(self.remove_row)
         self.btn_up.clicked.connect(self.move_up)
         self.btn_down.clicked.connect(self.move_down)
         self.btn_refresh_win.clicked.connect(self.refresh_windows)
         self.btn_start.clicked.connect(self.start_task)
         self.btn_stop.clicked.connect(self.stop_task)
+        self.btn_pause.clicked.connect(self.pause_task)
         
         # 绑定保存与加载按钮
         self.btn_save.clicked.connect(self.handle_save_file)
         self.btn_load.clicked.connect(self.handle_load_file)
         
-        self.executor.sig_progress.connect(self.update_status)
-        self.executor.sig_finished.connect(self.on_finished)
-        self.hotkey_mgr.sig_start.connect(self.start_task)
-        self.hotkey_mgr.sig_stop.connect(self.stop_task)
-        self.hotkey_mgr.sig_bind.connect(self.do_bind_window)
+        self.btn_log.clicked.connect(self.show_log)
+        self.btn_triggers.clicked.connect(self.open_trigger_settings)
+        self.btn_history.clicked.connect(self.show_history)
 
     def init_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
@@ -68,7 +147,7 @@ class AutoKeyApp(MainWindowUI):
         action_show = QAction("显示主界面", self)
         action_quit = QAction("退出程序", self)
         
-        action_show.triggered.connect(self.showNormal)
+        action_show.triggered.connect(self.show_main_window)
         action_quit.triggered.connect(self.quit_app)
         
         menu.addAction(action_show)
@@ -81,7 +160,8 @@ class AutoKeyApp(MainWindowUI):
         ok, msg = self.hotkey_mgr.register_hotkeys(
             self.current_start_key, 
             self.current_stop_key, 
-            self.current_bind_key
+            self.current_bind_key,
+            self.current_pause_key
         )
         self.update_status(msg)
 
@@ -97,14 +177,15 @@ class AutoKeyApp(MainWindowUI):
         except Exception as e:
             self.update_status(f"❌ 绑定出错: {e}")
 
-    def _bind_window_ui(self, hwnd, title):
+    def _bind_window_ui(self, hwnd, title, notify=True):
         display_title = title if title and title.strip() else "无标题窗口"
-        idx = self.combo_win.findData(hwnd)
-        if idx == -1:
-            self.combo_win.addItem(f"[{hwnd}] {display_title[:25]}...", hwnd)
-            idx = self.combo_win.count() - 1
-        self.combo_win.setCurrentIndex(idx)
+        if self.is_lean:
+            self._lean["hwnd"] = hwnd
+            self._lean["win_text"] = f"[{hwnd}] {display_title[:25]}..."
+        else:
+            self._select_window(hwnd, f"[{hwnd}] {display_title[:25]}...")
         self.update_status(f"✅ 已绑定: [{hwnd}] {display_title[:15]}...")
+        if not notify: return
         
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("绑定成功")
@@ -114,76 +195,312 @@ class AutoKeyApp(MainWindowUI):
         msg_box.setWindowFlags(msg_box.windowFlags() | Qt.WindowType.WindowStaysOnTopHint)
         msg_box.exec()
 
+    def _select_window(self, hwnd, text):
+        idx = self.combo_win.findData(hwnd)
+        if idx == -1:
+            self.combo_win.addItem(text, hwnd)
+            idx = self.combo_win.count() - 1
+        self.combo_win.setCurrentIndex(idx)
+
     @pyqtSlot(int, str)
     def on_bind_window_signal(self, hwnd, title):
         self._bind_window_ui(hwnd, title)
 
+    # --- 控制接口 (信号已由工作线程排队到 GUI 线程) ---
+    @pyqtSlot(str, bool)
+    def on_api_start(self, name, resume):
+        if self.executor.isRunning(): return
+        if name:
+            path = self.control_server.macro_path(name)
+            data, msg = ConfigManager.load_config(path)
+            if not data:
+                self.update_status(f"❌ 加载宏失败: {msg}")
+                return
+            self._load_macro_data(data)
+            self.reloader.watch(path)
+        self.start_task(interactive=False, resume=resume)
+
+    def _load_macro_data(self, data):
+        """只替换宏内容 (热键等全局设置保持不变)"""
+        if self.is_lean:
+            # 界面已释放: 只替换配置模型中的宏内容，重新打开界面时据此重建
+            cfg = self._lean["config"]
+            for k in MACRO_KEYS: cfg.pop(k, None)
+            cfg.update({k: data[k] for k in MACRO_KEYS if k in data})
+        else:
+            self.restore_ui_from_data(data, with_hotkeys=False)
+
+    @pyqtSlot(int, str)
+    def on_api_bind(self, hwnd, title):
+        self._bind_window_ui(hwnd, title, notify=False)
+
+    # --- 热更新 ---
+    def apply_edits(self):
+        """运行中应用界面修改: 后台校验并编译，结果由 on_plan_ready / on_plan_failed 处理"""
+        self.update_status("🔁 正在校验新计划...")
+        self.reloader.submit(self._get_current_config_dict())
+
+    def on_plan_ready(self, plan):
+        ex = self.executor
+        hot = ex.isRunning() and ex.mode == "keyboard"
+        name = os.path.basename(plan.source) if plan.source else "界面修改"
+        if plan.source:
+            # 配置文件变化: 与当前内容一致 (如本程序自己保存) 时忽略
+            current = self._get_current_config_dict()
+            if all(current.get(k) == plan.data.get(k) for k in MACRO_KEYS): return
+            if hot and plan.data.get("mode") == "mouse":
+                self.update_status(f"⚠️ {name} 已改为鼠标连点模式，需停止后重新开始")
+                return
+            self._load_macro_data(plan.data)
+            if not hot:
+                self.update_status(f"🔁 配置文件已变化，已重新加载: {name}")
+                return
+        if not hot: return
+        if plan.signature == (ex.kb_hash, ex.speed, ex.min_gap, ex.flow.policy) and not ex.plan_pending:
+            self.update_status("🔁 计划没有变化")
+            return
+        ex.swap_plan(plan)
+        self.update_status(f"🔁 新计划已通过校验 ({name}, {plan.size} 步)，将在本轮结束后换入")
+
+    def on_plan_failed(self, source, msg):
+        name = os.path.basename(source) if source else "界面修改"
+        self.update_status(f"❌ 新计划未通过校验 ({name}): {msg}，继续使用当前计划")
+
+    # --- 定时任务 ---
+    def on_trigger(self, trig):
+        # 立即保存 last_run: 程序异常退出后不会按旧的 last_run 误判错过而补跑
+        self.save_current_config(DEFAULT_CONFIG_FILE)
+        if self.executor.isRunning():
+            if trig.overlap == "skip":
+                self.update_status(f"⚠️ 定时任务 {trig.name}: 上一次运行尚未结束，已跳过")
+                return
+            # queue / restart: 记录下来，当前运行结束后启动 (只保留最新的一个)
+            self._queued_trigger = trig
+            if trig.overlap == "restart":
+                self.executor.stop()
+                self.update_status(f"⏰ 定时任务 {trig.name}: 停止当前运行后重新开始")
+            else:
+                self.update_status(f"⏰ 定时任务 {trig.name}: 等待当前运行结束")
+            return
+        self._launch_trigger(trig)
+
+    def on_trigger_missed(self, trig, count):
+        self.update_status(f"⚠️ 定时任务 {trig.name}: 错过 {count} 次触发，已跳过")
+
+    def _launch_trigger(self, trig):
+        self.update_status(f"⏰ 定时任务触发: {trig.name}")
+        self.on_api_start(trig.macro, False)
+
+    def _run_queued_trigger(self):
+        trig, self._queued_trigger = self._queued_trigger, None
+        if trig is None: return
+        # sig_finished 发出时线程可能尚未完全退出
+        if self.executor.state == STATE_IDLE: self.executor.wait()
+        self._launch_trigger(trig)
+
+    def load_triggers(self, specs):
+        ok, msg = self.scheduler.load(specs)
+        self.update_status(msg if ok else f"❌ {msg}")
+
+    def open_trigger_settings(self):
+        dlg = TriggerDialog(self.scheduler.dump(), self)
+        if dlg.exec():
+            self.load_triggers(dlg.specs)
+            self.save_current_config(DEFAULT_CONFIG_FILE)
+
+    def start_api(self, port, token=""):
+        self.api_port = port
+        self.api_token = token
+        self.control_server.stop()
+        if port:
+            ok, msg = self.control_server.start(port, token)
+            self.update_status(msg if ok else f"❌ {msg}")
+
     def open_hotkey_settings(self):
         """打开热键设置窗口"""
         # 【关键修复】设置期间暂停热键，防止冲突
         self.hotkey_mgr.unregister_all()
         
         try:
-            dlg = HotkeySettingDialog(self.current_start_key, self.current_stop_key, self.current_bind_key, self)
+            dlg = HotkeySettingDialog(self.current_start_key, self.current_stop_key, self.current_bind_key, self.current_pause_key, self)
             if dlg.exec():
                 self.current_start_key = dlg.results['start']
                 self.current_stop_key = dlg.results['stop']
                 self.current_bind_key = dlg.results['bind']
-                
-                self.lbl_start_hk.setText(f"启动: {TextUtils.format_key_text(self.current_start_key)}")
-                self.lbl_stop_hk.setText(f"停止: {TextUtils.format_key_text(self.current_stop_key)}")
-                self.lbl_bind_hk.setText(f"绑定: {TextUtils.format_key_text(self.current_bind_key)}")
+                self.current_pause_key = dlg.results['pause']
+                self._refresh_hotkey_labels()
         finally:
             # 无论保存还是取消，窗口关闭后恢复热键
             self.apply_hotkeys()
 
-    def start_task(self):
+    def start_task(self, interactive=True, resume=False):
+        """interactive=False 时 (控制接口调用) 不弹出任何对话框"""
         if self.executor.isRunning(): return
-        is_mouse = self.rb_mouse.isChecked()
-        if is_mouse:
-            m_type = "left" if self.combo_m_type.currentIndex() == 0 else "right"
-            m_click = "click" if self.combo_m_click.currentIndex() == 0 else "double"
-            cps = self.spin_m_cps.value()
-            self.executor.setup_mouse(m_type, m_click, cps)
+        # 界面存在时以界面为准，精简托盘模式下直接使用配置模型
+        run = self._lean or self._ui_snapshot()
+        cfg, hwnd = run["config"], run["hwnd"]
+        if cfg.get("mode") == "mouse":
+            pos = tuple(cfg["mouse_pos"]) if cfg.get("mouse_pos") else None
+            self.executor.setup_mouse(cfg.get("mouse_type", "left"), cfg.get("mouse_click", "click"),
+                                      cfg.get("mouse_cps", 5), pos, hwnd, cfg.get("flow", "slow"))
         else:
-            actions = self.get_table_data()
+            actions = cfg.get("actions", [])
             if not actions:
-                QMessageBox.warning(self, "提示", "请先添加按键！")
+                if interactive:
+                    QMessageBox.warning(self, "提示", "请先添加按键！")
+                else:
+                    self.update_status("⚠️ 未添加按键，忽略启动请求")
                 return
-            loop = self.spin_loop.value()
-            hwnd = self.combo_win.currentData()
-            self.executor.setup_keyboard(actions, loop, hwnd)
-        self.toggle_ui(False)
+            loop = cfg.get("loop", 0)
+            if interactive:
+                resume_from = self._ask_resume(actions, loop)
+            else:
+                resume_from = self.executor.checkpoint.load(CheckpointStore.config_hash(actions, loop)) if resume else None
+            self.executor.setup_keyboard(actions, loop, hwnd, resume_from,
+                                         cfg.get("speed", 1.0), cfg.get("min_gap", 0) / 1000.0,
+                                         cfg.get("flow", "slow"))
+        self.executor.profile = run["profile"]
+        self._run_info = {"macro": self._macro_name(),
+                          "target": (WindowMgr.get_window_title(hwnd) or "未知窗口") if hwnd else "前台"}
+        if not self.is_lean: self.toggle_ui(False)
         self.executor.start()
 
+    def _macro_name(self):
+        """运行历史中的宏名: 宏文件名 (不含扩展名)，默认配置或未关联文件时为“当前配置”"""
+        path = self.reloader.path
+        if not path or os.path.basename(path) == DEFAULT_CONFIG_FILE: return "当前配置"
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def _ask_resume(self, actions, loop):
+        """检测到同一配置的未完成检查点时，询问是否续跑"""
+        cfg_hash = CheckpointStore.config_hash(actions, loop)
+        pos = self.executor.checkpoint.load(cfg_hash)
+        if not pos: return None
+        ret = QMessageBox.question(
+            self, "继续上次运行",
+            f"检测到未完成的运行 (第 {pos[0]} 轮 第 {pos[1] + 1} 步)。\n\n是否从该位置继续？\n选择“否”将从头开始。")
+        if ret == QMessageBox.StandardButton.Yes:
+            return pos
+        self.executor.checkpoint.clear()
+        return None
+
     def stop_task(self):
         if self.executor.isRunning():
             self.executor.stop()
             self.update_status("正在停止...")
 
+    def pause_task(self):
+        if self.executor.isRunning():
+            self.executor.toggle_pause()
+
+    def on_executor_state(self, state):
+        if self.is_lean: return
+        if state == STATE_PAUSED:
+            self.btn_pause.setText("▶ 继续")
+        else:
+            self.btn_pause.setText("⏸ 暂停")
+            if state == STATE_RUNNING and self.lbl_status.text().startswith("⏸"):
+                self.update_status("▶ 已继续")
+
     def on_finished(self):
-        self.toggle_ui(True)
+        run = self.executor.last_run
+        if run and self._run_info:
+            self.history.append({**run, **self._run_info})
+        self._run_info = None
+        if not self.is_lean: self.toggle_ui(True)
         self.update_status("运行结束")
+        if self._queued_trigger: QTimer.singleShot(0, self._run_queued_trigger)
 
     def toggle_ui(self, enabled):
         self.btn_start.setEnabled(enabled)
         self.btn_stop.setEnabled(not enabled)
-        self.stack.setEnabled(enabled)
+        self.btn_pause.setEnabled(not enabled)
+        # 键盘宏运行中仍可编辑表格，通过“应用修改”热更新; 目标窗口与运行模式在运行中不可改
+        hot = not enabled and self.executor.mode == "keyboard"
+        self.stack.setEnabled(enabled or hot)
+        self.btn_apply.setEnabled(hot)
+        for w in (self.combo_win, self.btn_refresh_win, self.rb_keyboard, self.rb_mouse, self.rb_record):
+            w.setEnabled(enabled)
         self.btn_mod_hotkey.setEnabled(enabled)
+        self.chk_profile.setEnabled(enabled)
 
     def update_status(self, msg):
-        self.lbl_status.setText(msg)
+        level = ERROR if msg.startswith("❌") else WARN if msg.startswith("⚠️") else INFO
+        log = self.executor.log
+        log.message(level, msg)
+        self._log_seq = log.seq
+        if not self.is_lean: self.lbl_status.setText(msg)
+
+    def poll_log(self):
+        log = self.executor.log
+        if log.seq != self._log_seq:
+            self._log_seq = log.seq
+            rec = log.latest()
+            if rec: self.lbl_status.setText(log.format(rec))
+
+    def show_log(self):
+        if self.log_dialog is None:
+            self.log_dialog = LogViewerDialog(self.executor.log, self)
+            self.log_dialog.sig_calibrate.connect(self.recalibrate)
+        self.log_dialog.show()
+        self.log_dialog.raise_()
+
+    def load_timing_profile(self):
+        profile, _ = MachineProfile.load()
+        if profile is None:
+            # 首次运行 / 换了机器 / 系统升级后
+            self.recalibrate()
+            return
+        self.executor.clock = CalibratedClock(profile)
+
+    def recalibrate(self):
+        # 校准会与执行线程争用 CPU，两者的计时结果都会失真
+        if self.executor.isRunning():
+            self.update_status("⚠️ 运行中无法校准计时，请先停止")
+            return
+        hwnd = 0 if self.is_lean else int(self.winId())
+        if self.calibrator.start(Win32Backend, hwnd):
+            self.update_status("🧭 正在校准本机计时...")
+
+    def on_calibrated(self, profile):
+        ok, msg = profile.save()
+        # 两种时钟读数相同 (perf_counter)，运行中替换只影响之后的等待
+        self.executor.clock = CalibratedClock(profile)
+        self.update_status(profile.summary() if ok else f"❌ 校准结果{msg}")
+
+    def show_history(self):
+        HistoryDialog(self.history, self).exec()
 
     # --- 表格逻辑 ---
     def get_table_data(self):
         data = []
         for r in range(self.table.rowCount()):
-            k_text = self.table.item(r, 1).text()
+            k_item = self.table.item(r, 1)
             d_text = self.table.item(r, 2).text()
-            data.append({"key": k_text, "delay": int(d_text)})
+            # 鼠标动作 / 重复块的完整参数保存在单元格的 UserRole 中
+            action = k_item.data(Qt.ItemDataRole.UserRole)
+            if action and action.get("type") == "repeat":
+                data.append(action)
+            elif action:
+                data.append(dict(action, delay=int(d_text)))
+            else:
+                item = {"key": k_item.text(), "delay": int(d_text)}
+                # 按住时长留空表示使用默认值
+                h_text = self.table.item(r, 3).text()
+                if h_text.isdigit(): item["hold"] = int(h_text)
+                data.append(item)
         return data
 
-    def add_row_data(self, key="a", delay=500):
+    def _make_action_item(self, key=None, action=None):
+        if action:
+            item = QTableWidgetItem(TextUtils.format_action_text(action))
+            item.setData(Qt.ItemDataRole.UserRole, action)
+        else:
+            item = QTableWidgetItem(TextUtils.format_key_text(key))
+        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        return item
+
+    def add_row_data(self, key="a", delay=500, action=None, hold=None):
         r = self.table.rowCount()
         self.table.insertRow(r)
         
@@ -191,14 +508,67 @@ class AutoKeyApp(MainWindowUI):
         item_idx.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
         self.table.setItem(r, 0, item_idx)
 
-        item_key = QTableWidgetItem(TextUtils.format_key_text(key))
-        item_key.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setItem(r, 1, item_key)
+        self.table.setItem(r, 1, self._make_action_item(key, action))
 
-        item_delay = QTableWidgetItem(str(delay))
+        # 重复块没有自身的等待时长
+        item_delay = QTableWidgetItem("—" if delay is None else str(delay))
         item_delay.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
         self.table.setItem(r, 2, item_delay)
 
+        # 按住时长只对按键有效
+        item_hold = QTableWidgetItem("—" if action else ("" if hold is None else str(hold)))
+        item_hold.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table.setItem(r, 3, item_hold)
+
+    def add_mouse_row(self):
+        dlg = MouseActionDialog(parent=self)
+        if dlg.exec():
+            action = dlg.get_action(1000)
+            self.add_row_data(delay=action["delay"], action=action)
+
+    def add_text_row(self):
+        dlg = TextActionDialog(parent=self)
+        if dlg.exec():
+            action = dlg.get_action(1000)
+            self.add_row_data(delay=action["delay"], action=action)
+
+    def add_wait_row(self):
+        dlg = WaitActionDialog(parent=self)
+        if dlg.exec():
+            action = dlg.get_action(0)
+            self.add_row_data(delay=action["delay"], action=action)
+
+    def compress_rows(self):
+        """将表格中相邻重复的动作折叠为重复块"""
+        actions = self.get_table_data()
+        compressed = compress_actions(actions)
+        self._fill_table(compressed)
+        self.update_status(f"🗜️ 已压缩: {len(actions)} 行 -> {len(compressed)} 行 (展开共 {count_actions(compressed)} 步)")
+
+    def dry_run_rows(self):
+        """虚拟时钟模拟运行: 给出总时长与各按键次数，可导出完整时间线"""
+        actions = self.get_table_data()
+        if not actions:
+            QMessageBox.warning(self, "提示", "请先添加按键！")
+            return
+        cfg = self._get_current_config_dict()
+        result = dry_run(actions, cfg["loop"], self.combo_win.currentData() or 0,
+                         cfg["speed"], cfg["min_gap"] / 1000.0)
+        self.update_status(f"🧪 模拟完成: {len(result.events)} 个事件, 总时长 {result.duration:.3f} 秒")
+        text = result.summary()
+        if cfg["loop"] == 0: text += "\n\n(无限循环，仅模拟一轮)"
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("模拟运行")
+        msg_box.setText(text)
+        btn_export = msg_box.addButton("导出时间线...", QMessageBox.ButtonRole.ActionRole)
+        msg_box.addButton(QMessageBox.StandardButton.Ok)
+        msg_box.exec()
+        if msg_box.clickedButton() == btn_export:
+            path, _ = QFileDialog.getSaveFileName(self, "导出时间线", "timeline.csv", "CSV Files (*.csv)")
+            if path:
+                ok, msg = result.export_csv(path)
+                if not ok: QMessageBox.critical(self, "导出失败", msg)
+
     def renumber_rows(self):
         for r in range(self.table.rowCount()):
             item = self.table.item(r, 0)
@@ -219,14 +589,31 @@ class AutoKeyApp(MainWindowUI):
         if r < self.table.rowCount()-1: self.swap_row(r, r+1)
         
     def swap_row(self, r1, r2):
-        k1 = self.table.item(r1, 1).text(); d1 = self.table.item(r1, 2).text()
-        k2 = self.table.item(r2, 1).text(); d2 = self.table.item(r2, 2).text()
-        self.table.item(r1, 1).setText(k2); self.table.item(r1, 2).setText(d2)
-        self.table.item(r2, 1).setText(k1); self.table.item(r2, 2).setText(d1)
+        k1 = self.table.takeItem(r1, 1); d1 = self.table.item(r1, 2).text(); h1 = self.table.item(r1, 3).text()
+        k2 = self.table.takeItem(r2, 1); d2 = self.table.item(r2, 2).text(); h2 = self.table.item(r2, 3).text()
+        self.table.setItem(r1, 1, k2); self.table.item(r1, 2).setText(d2); self.table.item(r1, 3).setText(h2)
+        self.table.setItem(r2, 1, k1); self.table.item(r2, 2).setText(d1); self.table.item(r2, 3).setText(h1)
         self.table.selectRow(r2)
 
     def on_table_double_click(self, row, col):
-        if col == 1:
+        row_action = self.table.item(row, 1).data(Qt.ItemDataRole.UserRole)
+        is_repeat = bool(row_action) and row_action.get("type") == "repeat"
+        if col == 1 and is_repeat:
+            count, ok = QInputDialog.getInt(self, "修改重复次数", "重复次数:", row_action["count"], 1, 10000000, 1)
+            if ok:
+                self.table.setItem(row, col, self._make_action_item(action=dict(row_action, count=count)))
+        elif is_repeat:
+            pass
+        elif col == 1 and row_action:
+            dialog_cls = {"text": TextActionDialog, "wait": WaitActionDialog,
+                          "trail": None}.get(row_action.get("type"), MouseActionDialog)
+            # 录制的轨迹不提供逐点编辑 (只能整行删除 / 移动)
+            if dialog_cls is None: return
+            dlg = dialog_cls(row_action, parent=self)
+            if dlg.exec():
+                action = dlg.get_action(row_action.get("delay", 0))
+                self.table.setItem(row, col, self._make_action_item(action=action))
+        elif col == 1:
             # 【关键修复】录制按键前，暂停全局热键，防止按键冲突
             self.hotkey_mgr.unregister_all()
             
@@ -251,6 +638,13 @@ class AutoKeyApp(MainWindowUI):
                 item = QTableWidgetItem(str(new_val))
                 item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
                 self.table.setItem(row, col, item)
+        elif col == 3 and not row_action:
+            current_val = self.table.item(row, col).text()
+            val_int = int(current_val) if current_val.isdigit() else -1
+            new_val, ok = QInputDialog.getInt(
+                self, "修改按住时长", "按住时长(ms)，-1 表示默认\n(后台 50ms / 前台立即抬起):", val_int, -1, 100000, 10)
+            if ok:
+                self.table.item(row, col).setText("" if new_val < 0 else str(new_val))
 
     def refresh_windows(self):
         current_idx = self.combo_win.currentIndex()
@@ -269,7 +663,7 @@ class AutoKeyApp(MainWindowUI):
         """加载或创建默认配置"""
         if not os.path.exists(DEFAULT_CONFIG_FILE):
             default_data = {
-                "start": "f9", "stop": "f10", "bind": "f11", 
+                "start": "f9", "stop": "f10", "bind": "f11", "pause": "f8", 
                 "loop": 0, 
                 "actions": [
                     {"key": "A", "delay": 1000}, 
@@ -282,21 +676,45 @@ class AutoKeyApp(MainWindowUI):
         
         data, _ = ConfigManager.load_config(DEFAULT_CONFIG_FILE)
         if data: self.restore_ui_from_data(data)
+        self.reloader.watch(DEFAULT_CONFIG_FILE)
+        # 命令行 --api-port 优先于配置文件 (便于同机多开)
+        port = self.cli_api_port if self.cli_api_port is not None else (data or {}).get("api_port", 0)
+        self.start_api(port, (data or {}).get("api_token", ""))
 
-    def restore_ui_from_data(self, data):
-        self.current_start_key = data.get("start", "f9")
-        self.current_stop_key = data.get("stop", "f10")
-        self.current_bind_key = data.get("bind", "f11")
+    def _refresh_hotkey_labels(self):
         self.lbl_start_hk.setText(f"启动: {TextUtils.format_key_text(self.current_start_key)}")
         self.lbl_stop_hk.setText(f"停止: {TextUtils.format_key_text(self.current_stop_key)}")
         self.lbl_bind_hk.setText(f"绑定: {TextUtils.format_key_text(self.current_bind_key)}")
-        self.apply_hotkeys()
+        self.lbl_pause_hk.setText(f"暂停: {TextUtils.format_key_text(self.current_pause_key)}")
+
+    def restore_ui_from_data(self, data, with_hotkeys=True):
+        """with_hotkeys=False 时只恢复宏内容 (控制接口切换宏时保留当前热键)"""
+        if with_hotkeys:
+            self.current_start_key = data.get("start", "f9")
+            self.current_stop_key = data.get("stop", "f10")
+            self.current_bind_key = data.get("bind", "f11")
+            self.current_pause_key = data.get("pause", "f8")
+            self._refresh_hotkey_labels()
+            self.apply_hotkeys()
+            self.lean_tray = data.get("lean_tray", True)
+            self.load_triggers(data.get("triggers", []))
         self.spin_loop.setValue(data.get("loop", 0))
-        self.chk_tray.setChecked(data.get("minimize_to_tray", False))
+        if with_hotkeys: self.chk_tray.setChecked(data.get("minimize_to_tray", False))
         
-        self.table.setRowCount(0)
-        for a in data.get("actions", []):
-            self.add_row_data(a["key"], a["delay"])
+        self._fill_table(data.get("actions", []))
+        self.combo_m_type.setCurrentIndex(1 if data.get("mouse_type") == "right" else 0)
+        self.combo_m_click.setCurrentIndex(1 if data.get("mouse_click") == "double" else 0)
+        speed_idx = self.combo_speed.findData(float(data.get("speed", 1.0)))
+        self.combo_speed.setCurrentIndex(speed_idx if speed_idx >= 0 else self.combo_speed.findData(1.0))
+        self.spin_min_gap.setValue(data.get("min_gap", 10))
+        flow_idx = self.combo_flow.findData(data.get("flow", "slow"))
+        self.combo_flow.setCurrentIndex(max(0, flow_idx))
+
+        mouse_pos = data.get("mouse_pos")
+        self.chk_m_pos.setChecked(bool(mouse_pos))
+        if mouse_pos:
+            self.spin_m_x.setValue(mouse_pos[0])
+            self.spin_m_y.setValue(mouse_pos[1])
             
         if data.get("mode") == "mouse":
             self.rb_mouse.setChecked(True)
@@ -304,16 +722,38 @@ class AutoKeyApp(MainWindowUI):
         else:
             self.rb_keyboard.setChecked(True)
 
+    def _fill_table(self, actions):
+        self.table.setRowCount(0)
+        for a in actions:
+            if a.get("type") == "repeat":
+                self.add_row_data(delay=None, action=a)
+            elif a.get("type") in ("mouse", "text", "wait", "trail"):
+                self.add_row_data(delay=a["delay"], action=a)
+            else:
+                self.add_row_data(a["key"], a["delay"], hold=a.get("hold"))
+
     def _get_current_config_dict(self):
+        if self.is_lean: return dict(self._lean["config"], triggers=self.scheduler.dump())
         return {
             "start": self.current_start_key,
             "stop": self.current_stop_key,
             "bind": self.current_bind_key,
+            "pause": self.current_pause_key,
             "loop": self.spin_loop.value(),
             "actions": self.get_table_data(),
+            "speed": self.combo_speed.currentData(),
+            "min_gap": self.spin_min_gap.value(),
+            "flow": self.combo_flow.currentData(),
             "mode": "mouse" if self.rb_mouse.isChecked() else "keyboard",
             "mouse_cps": self.spin_m_cps.value(),
-            "minimize_to_tray": self.chk_tray.isChecked()
+            "mouse_type": "left" if self.combo_m_type.currentIndex() == 0 else "right",
+            "mouse_click": "click" if self.combo_m_click.currentIndex() == 0 else "double",
+            "mouse_pos": [self.spin_m_x.value(), self.spin_m_y.value()] if self.chk_m_pos.isChecked() else None,
+            "minimize_to_tray": self.chk_tray.isChecked(),
+            "lean_tray": self.lean_tray,
+            "triggers": self.scheduler.dump(),
+            "api_port": self.api_port,
+            "api_token": self.api_token
         }
 
     def save_current_config(self, filepath):
@@ -326,6 +766,7 @@ class AutoKeyApp(MainWindowUI):
             if not path.lower().endswith(".json"):
                 path += ".json"
             self.save_current_config(path)
+            self.reloader.watch(path)
             self.update_status(f"配置已保存: {os.path.basename(path)}")
 
     def handle_load_file(self):
@@ -334,6 +775,7 @@ class AutoKeyApp(MainWindowUI):
             data, msg = ConfigManager.load_config(path)
             if data:
                 self.restore_ui_from_data(data)
+                self.reloader.watch(path)
                 self.update_status(f"配置已加载: {os.path.basename(path)}")
             else:
                 QMessageBox.critical(self, "加载失败", msg)
@@ -345,6 +787,9 @@ class AutoKeyApp(MainWindowUI):
             self.hide()
             event.ignore()
             self.update_status("程序已最小化到托盘")
+            if self.lean_tray:
+                # 隐藏完成后再释放界面
+                QTimer.singleShot(0, self.enter_lean_mode)
         else:
             self.perform_cleanup()
             event.accept()
@@ -352,12 +797,82 @@ class AutoKeyApp(MainWindowUI):
 
     def on_tray_activated(self, reason):
         if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
-            self.showNormal()
-            self.activateWindow()
+            self.show_main_window()
+
+    def show_main_window(self):
+        if self.is_lean: self.exit_lean_mode()
+        self.showNormal()
+        self.activateWindow()
+
+    # --- 精简托盘模式 ---
+    @property
+    def is_lean(self):
+        return self._lean is not None
+
+    def _ui_snapshot(self):
+        """界面 -> 配置模型 (另含未持久化的运行参数: 绑定窗口、性能分析开关)"""
+        return {
+            "config": self._get_current_config_dict(),
+            "hwnd": self.combo_win.currentData() or 0,
+            "win_text": self.combo_win.currentText(),
+            "profile": self.chk_profile.isChecked(),
+        }
+
+    def enter_lean_mode(self):
+        """
+        释放主界面的全部控件 (表格、各页面、窗口列表、日志窗口)
+        执行器、热键、托盘与控制接口不受影响，启动任务时直接读取配置模型
+        """
+        if self.is_lean or self.isVisible(): return
+        # 拆除界面前测量 (不裁剪工作集)，前后差值才是释放界面省下的内存
+        gc.collect()
+        before = MemoryUtils.get_usage()
+        self._lean = self._ui_snapshot()
+        self.status_timer.stop()
+        self.log_dialog = None
+        self.teardown_ui()
+        # 等 deleteLater 的对象销毁后再测量
+        QTimer.singleShot(500, lambda: self._report_lean_memory(before))
+
+    def _report_lean_memory(self, before):
+        if not self.is_lean: return
+        gc.collect()
+        after = MemoryUtils.get_usage()
+        # 裁剪工作集是单独的一步，只影响工作集 (不影响私有字节)，单独报告
+        MemoryUtils.trim_working_set()
+        trimmed = MemoryUtils.get_rss()
+        mb = 1024 * 1024
+        self.update_status(f"📥 精简托盘模式: 工作集 {before[0] / mb:.1f} MB -> {after[0] / mb:.1f} MB, "
+                           f"私有 {before[1] / mb:.1f} MB -> {after[1] / mb:.1f} MB (裁剪后工作集 {trimmed / mb:.1f} MB)")
+        self.tray_icon.setToolTip(f"AutoKey Tool (私有内存 {after[1] / mb:.1f} MB)")
+
+    def exit_lean_mode(self):
+        """按配置模型重建界面"""
+        lean, self._lean = self._lean, None
+        t0 = time.perf_counter()
+        self.setup_ui()
+        self.bind_ui_events()
+        self.refresh_windows()
+        self.restore_ui_from_data(lean["config"], with_hotkeys=False)
+        self.chk_tray.setChecked(lean["config"].get("minimize_to_tray", False))
+        self._refresh_hotkey_labels()
+        if lean["hwnd"]: self._select_window(lean["hwnd"], lean["win_text"])
+        self.chk_profile.setChecked(lean["profile"])
+        self.toggle_ui(not self.executor.isRunning())
+        self.on_executor_state(self.executor.state)
+        self.status_timer.start(100)
+        self.tray_icon.setToolTip("AutoKey Tool")
+        elapsed = (time.perf_counter() - t0) * 1000
+        self.update_status(f"🔄 界面已重建 ({elapsed:.0f} ms, 内存 {MemoryUtils.get_rss() / (1024 * 1024):.1f} MB)")
 
     def perform_cleanup(self):
+        self.control_server.stop()
+        self.scheduler.stop()
         self.executor.stop()
         self.executor.wait()
+        ClientRectCache.uninstall_hook()
+        self.watcher.stop()
+        self.history.stop()
         try: keyboard.unhook_all()
         except: pass
 
@@ -371,6 +886,6 @@ if __name__ == "__main__":
     font = QFont("Microsoft YaHei", 9) 
     app.setFont(font)
     app.setQuitOnLastWindowClosed(False)
-    window = AutoKeyApp()
+    window = AutoKeyApp(api_port=parse_api_port(sys.argv))
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,100 @@
+from profiler import PHASE_NAMES
+
+
+class RunMetrics:
+    """
+    执行统计计数器 (只由执行线程累加，其他线程只读)
+    纯属性自增，不加锁: 读取方容忍瞬时不一致
+    """
+
+    def __init__(self):
+        self.runs_total = 0
+        self.sends_total = 0
+        self.moves_total = 0
+        self.loops_total = 0
+        self.errors_total = 0
+        self.window_lost_total = 0
+        self.reloads_total = 0
+        # 调度迟到 (实际唤醒 - 计划时刻)
+        self.lateness_sum = 0.0
+        self.lateness_count = 0
+        self.lateness_max = 0.0
+        # 后台发送流控: 探测次数 / 超时次数 / 进入拥塞次数 / 被丢弃的事件 / 降速等待总时长 / 投递失败
+        self.flow_probes_total = 0
+        self.flow_probe_timeouts_total = 0
+        self.flow_congested_total = 0
+        self.flow_dropped_total = 0
+        self.flow_delayed_seconds = 0.0
+        self.post_failures_total = 0
+        # 最近一次探测的结果 (gauge)
+        self.flow_latency = 0.0
+        self.flow_pace = 0.0
+        # 各阶段累计耗时 (运行结束时从 PhaseTimer 汇总)
+        self.phase_seconds = dict.fromkeys(PHASE_NAMES + ("other",), 0.0)
+
+    # 写入运行历史的计数器 (历史字段名 -> 属性名)
+    RUN_COUNTERS = {"loops": "loops_total", "sends": "sends_total", "moves": "moves_total",
+                    "errors": "errors_total", "window_lost": "window_lost_total", "dropped": "flow_dropped_total"}
+
+    def run_counters(self):
+        """当前累计值快照，运行前后相减即为单次运行的统计"""
+        return {k: getattr(self, attr) for k, attr in self.RUN_COUNTERS.items()}
+
+    def add_phases(self, phases):
+        for name, seconds, _ in phases.breakdown():
+            self.phase_seconds[name] += seconds
+
+    def observe_flow(self, flow):
+        self.flow_probes_total += 1
+        if flow.latency is None:
+            self.flow_probe_timeouts_total += 1
+        else:
+            self.flow_latency = flow.latency
+        self.flow_pace = flow.pace
+
+    def observe_lateness(self, seconds):
+        self.lateness_sum += seconds
+        self.lateness_count += 1
+        if seconds > self.lateness_max:
+            self.lateness_max = seconds
+
+
+def _metric(lines, name, kind, help_text, value, labels=""):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    lines.append(f"{name}{labels} {value}")
+
+
+def render_prometheus(metrics, state, states=()):
+    """按 Prometheus 文本格式 (0.0.4) 输出"""
+    m = metrics
+    lines = []
+    _metric(lines, "autokey_runs_total", "counter", "Macro runs started.", m.runs_total)
+    _metric(lines, "autokey_sends_total", "counter", "Key presses and mouse clicks sent.", m.sends_total)
+    _metric(lines, "autokey_mouse_moves_total", "counter", "Mouse move events sent.", m.moves_total)
+    _metric(lines, "autokey_loops_total", "counter", "Completed macro loops.", m.loops_total)
+    _metric(lines, "autokey_errors_total", "counter", "Input errors raised while sending.", m.errors_total)
+    _metric(lines, "autokey_reloads_total", "counter", "Hot-reloaded plans swapped into a running macro.", m.reloads_total)
+    _metric(lines, "autokey_window_lost_total", "counter", "Times the bound window became invalid.", m.window_lost_total)
+    lines.append("# HELP autokey_lateness_seconds Scheduler wakeup lateness.")
+    lines.append("# TYPE autokey_lateness_seconds summary")
+    lines.append(f"autokey_lateness_seconds_sum {m.lateness_sum:.9f}")
+    lines.append(f"autokey_lateness_seconds_count {m.lateness_count}")
+    _metric(lines, "autokey_lateness_max_seconds", "gauge", "Worst scheduler lateness seen.", f"{m.lateness_max:.9f}")
+    _metric(lines, "autokey_flow_probes_total", "counter", "Responsiveness probes sent to the target window.", m.flow_probes_total)
+    _metric(lines, "autokey_flow_probe_timeouts_total", "counter", "Probes that timed out or hit a hung window.", m.flow_probe_timeouts_total)
+    _metric(lines, "autokey_flow_congested_total", "counter", "Times the target window became congested.", m.flow_congested_total)
+    _metric(lines, "autokey_flow_dropped_total", "counter", "Background events dropped by the drop policy.", m.flow_dropped_total)
+    _metric(lines, "autokey_flow_delayed_seconds_total", "counter", "Time spent holding back background sends.", f"{m.flow_delayed_seconds:.6f}")
+    _metric(lines, "autokey_post_failures_total", "counter", "PostMessage calls rejected by the system.", m.post_failures_total)
+    _metric(lines, "autokey_flow_latency_seconds", "gauge", "Last probe round-trip to the target window.", f"{m.flow_latency:.6f}")
+    _metric(lines, "autokey_flow_pace_seconds", "gauge", "Current minimum interval between background sends.", f"{m.flow_pace:.6f}")
+    lines.append("# HELP autokey_phase_seconds_total Executor thread time by phase.")
+    lines.append("# TYPE autokey_phase_seconds_total counter")
+    for name, seconds in m.phase_seconds.items():
+        lines.append(f'autokey_phase_seconds_total{{phase="{name}"}} {seconds:.6f}')
+    lines.append("# HELP autokey_state Current executor state.")
+    lines.append("# TYPE autokey_state gauge")
+    for s in states:
+        lines.append(f'autokey_state{{state="{s}"}} {1 if s == state else 0}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,120 @@
+import numpy as np
+
+# 支持的移动轨迹类型
+PATH_KINDS = ("none", "linear", "bezier", "jitter")
+# 轨迹采样频率 (点/秒)
+SAMPLE_HZ = 125
+# 抖动轨迹的最大偏移 (像素)
+JITTER_PX = 3.0
+
+
+def _smoothstep(t):
+    """缓入缓出，让起止速度更接近真人"""
+    return t * t * (3.0 - 2.0 * t)
+
+
+def build_path(kind, start, end, duration_ms, seed=None):
+    """
+    一次性向量化生成整条移动轨迹
+    返回 (points[int32, N×2], offsets[float64, N])，offsets 为相对起点的秒数
+    """
+    p0 = np.asarray(start, dtype=np.float64)
+    p3 = np.asarray(end, dtype=np.float64)
+    if kind == "none" or duration_ms <= 0:
+        return np.array([end], dtype=np.int32), np.zeros(1)
+
+    n = max(2, int(duration_ms * SAMPLE_HZ / 1000) + 1)
+    t = np.linspace(0.0, 1.0, n)
+    s = _smoothstep(t)
+    rng = np.random.default_rng(seed)
+    delta = p3 - p0
+
+    if kind == "bezier":
+        # 控制点沿法线方向随机偏移，形成自然弧线
+        normal = np.array([-delta[1], delta[0]])
+        c1 = p0 + delta * 0.3 + normal * rng.uniform(-0.35, 0.35)
+        c2 = p0 + delta * 0.7 + normal * rng.uniform(-0.35, 0.35)
+        u = 1.0 - s
+        coef = np.stack([u ** 3, 3 * u * u * s, 3 * u * s * s, s ** 3], axis=1)
+        pts = coef @ np.stack([p0, c1, c2, p3])
+    else:
+        pts = p0 + np.outer(s, delta)
+        if kind == "jitter":
+            # 两端收敛为 0，保证起点/终点精确
+            amp = (np.sin(np.pi * t) * JITTER_PX)[:, None]
+            pts = pts + rng.standard_normal((n, 2)) * amp
+
+    points = np.rint(pts).astype(np.int32)
+    points[0] = p0
+    points[-1] = p3
+    return points, t * (duration_ms / 1000.0)
+
+
+def pack_lparams(points):
+    """批量打包 MAKELPARAM(x, y)，供 WM_MOUSEMOVE / WM_xBUTTONxxx 使用"""
+    pts = np.asarray(points, dtype=np.int64)
+    return ((pts[:, 1] & 0xFFFF) << 16) | (pts[:, 0] & 0xFFFF)
+
+
+def _sync_distance(xy, t, kept):
+    """
+    每个点到其所在简化段 (相邻保留点之间) 在同一时刻的插值位置的距离
+    按时间插值而非垂足: 回放按时间重采样，这正是回放时的位置误差
+    """
+    seg = np.searchsorted(kept, np.arange(len(t)), side='right') - 1
+    seg = np.minimum(seg, len(kept) - 2)
+    i0, i1 = kept[seg], kept[seg + 1]
+    span = t[i1] - t[i0]
+    f = np.divide(t - t[i0], span, out=np.zeros_like(t), where=span > 0)
+    pos = xy[i0] + f[:, None] * (xy[i1] - xy[i0])
+    return np.hypot(*(xy - pos).T), seg
+
+
+def simplify_trail(xy, t, tolerance, keep=None):
+    """
+    Ramer–Douglas–Peucker 简化 (时间同步距离)，返回保留点的下标 (升序)
+    每一轮对所有未达标的段同时求最远点并切分，轮数约为 log2(点数)，不逐段递归
+    keep: 必须保留的点 (如点击时刻)
+    """
+    xy = np.asarray(xy, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    n = len(t)
+    if n <= 2: return np.arange(n)
+    mask = np.zeros(n, dtype=bool)
+    mask[[0, -1]] = True
+    if keep is not None: mask[np.asarray(keep, dtype=np.int64)] = True
+    while True:
+        kept = np.flatnonzero(mask)
+        dist, seg = _sync_distance(xy, t, kept)
+        dist[mask] = 0.0
+        seg_max = np.maximum.reduceat(dist, kept[:-1])
+        worst = np.flatnonzero((dist > tolerance) & (dist == seg_max[seg]))
+        if not len(worst): return kept
+        # 同一段内距离并列最大的点只取第一个
+        _, first = np.unique(seg[worst], return_index=True)
+        mask[worst[first]] = True
+
+
+def trail_error(xy, t, kept):
+    """简化后按时间插值回放，相对原始轨迹的最大位置误差 (像素)"""
+    xy = np.asarray(xy, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    if len(t) <= 2: return 0.0
+    return float(_sync_distance(xy, t, np.asarray(kept))[0].max())
+
+
+def resample_trail(points, hz=SAMPLE_HZ):
+    """
+    将简化后的轨迹 [[x, y, t_ms], ...] 按 hz 重采样为等间隔的点 (线性插值)
+    终点原样保留，保证点击位置与时刻精确
+    返回 (points[int32, N×2], offsets[float64, N])，offsets 为相对起点的秒数
+    """
+    arr = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    t = (arr[:, 2] - arr[0, 2]) / 1000.0
+    duration = t[-1]
+    if len(arr) == 1 or duration <= 0:
+        return np.rint(arr[-1:, :2]).astype(np.int32), np.zeros(1)
+    grid = np.arange(0.0, duration, 1.0 / hz)
+    grid = np.append(grid, duration)
+    xy = np.stack([np.interp(grid, t, arr[:, 0]), np.interp(grid, t, arr[:, 1])], axis=1)
+    return np.rint(xy).astype(np.int32), grid
@@ -0,0 +1,199 @@
+import zlib
+from mouse_path import build_path, pack_lparams, resample_trail, SAMPLE_HZ
+from textinput import encode_text
+from utils import TextUtils
+
+
+class KeyStep:
+    """单个按键步骤; hold 为按住时长 (秒)，None 表示使用执行器默认值"""
+    __slots__ = ("key", "delay", "hold")
+
+    def __init__(self, key, delay, hold=None):
+        self.key = key
+        self.delay = delay
+        self.hold = hold
+
+
+class MouseStep:
+    """
+    鼠标步骤 (坐标相对目标窗口客户区; 全局模式下为屏幕坐标)
+    轨迹在编译期一次性生成，运行时只按序取点
+    """
+    __slots__ = ("button", "click", "x", "y", "points", "lparams", "offsets", "max_x", "max_y", "delay")
+
+    def __init__(self, button, click, x, y, points, offsets, delay):
+        self.button = button
+        self.click = click
+        self.x = x
+        self.y = y
+        # 转成 Python 原生类型，避免运行时逐点拆箱 numpy 标量
+        self.points = [tuple(p) for p in points.tolist()]
+        self.lparams = pack_lparams(points).tolist()
+        self.offsets = offsets.tolist()
+        self.max_x = int(points[:, 0].max())
+        self.max_y = int(points[:, 1].max())
+        self.delay = delay
+
+
+class TextStep:
+    """
+    文本输入步骤: 编码 (UTF-16 码元块 / SendInput 批次) 在编译期完成并缓存
+    每块一次性发出，块与块之间按 cps 限速
+    """
+    __slots__ = ("text", "cps", "chunks", "offsets", "batches", "length", "delay")
+
+    def __init__(self, text, cps, chunk, delay):
+        self.text = text
+        self.cps = cps
+        self.chunks, self.offsets, self.batches = encode_text(text, cps, chunk)
+        self.length = sum(len(c) for c in self.chunks)
+        self.delay = delay
+
+
+class WaitStep:
+    """
+    等待窗口条件成立 (由共享的窗口监视器驱动); timeout 为秒，0 表示一直等待
+    text 为编译时格式化好的日志文本，text_id 由执行器换入计划时登记到日志字符串表
+    """
+    __slots__ = ("cond", "pattern", "timeout", "on_timeout", "delay", "text", "text_id")
+
+    def __init__(self, cond, pattern, timeout, on_timeout, delay):
+        self.cond = cond
+        self.pattern = pattern
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self.delay = delay
+        self.text = TextUtils.format_wait_text(cond, pattern, timeout)
+        self.text_id = 0
+
+
+class RepeatBlock:
+    """重复块: 子步骤只编译/存储一份，执行时按次数循环，不展开"""
+    __slots__ = ("count", "steps", "body_size", "size")
+
+    def __init__(self, count, steps):
+        self.count = count
+        self.steps = steps
+        self.body_size = plan_size(steps)
+        self.size = self.body_size * count
+
+
+def is_mouse_action(action):
+    return action.get("type") == "mouse"
+
+
+def is_repeat_action(action):
+    return action.get("type") == "repeat"
+
+
+def is_text_action(action):
+    return action.get("type") == "text"
+
+
+def is_wait_action(action):
+    return action.get("type") == "wait"
+
+
+def is_trail_action(action):
+    """录制的鼠标轨迹 (已简化): points 为 [[x, y, t_ms], ...]"""
+    return action.get("type") == "trail"
+
+
+def iter_key_actions(actions):
+    """遍历所有按键动作 (含重复块内部)，每个动作只访问一次"""
+    for action in actions:
+        if is_repeat_action(action):
+            yield from iter_key_actions(action.get("actions", []))
+        elif "type" not in action:
+            yield action
+
+
+def iter_wait_steps(steps):
+    """遍历编译结果中的所有等待步骤 (含重复块内部，每个只访问一次)"""
+    for step in steps:
+        if isinstance(step, RepeatBlock):
+            yield from iter_wait_steps(step.steps)
+        elif isinstance(step, WaitStep):
+            yield step
+
+
+def plan_size(steps):
+    """展开后的步骤总数"""
+    return sum(s.size if isinstance(s, RepeatBlock) else 1 for s in steps)
+
+
+def _path_seed(start, end, kind, duration):
+    """未指定 seed 时由轨迹参数决定，保证相同动作 (无论是否被压缩) 生成相同轨迹"""
+    return zlib.crc32(repr((tuple(start), tuple(end), kind, duration)).encode())
+
+
+def compile_actions(actions, last_pos=None):
+    """将配置中的 actions 列表编译为步骤序列"""
+    return _compile(actions, last_pos)[0]
+
+
+def _compile(actions, last_pos):
+    steps = []
+    for action in actions:
+        if is_repeat_action(action):
+            body, last_pos = _compile(action.get("actions", []), last_pos)
+            if action.get("count", 1) > 0 and body:
+                steps.append(RepeatBlock(action.get("count", 1), body))
+            continue
+        delay = action.get("delay", 100) / 1000.0
+        if is_text_action(action):
+            steps.append(TextStep(action.get("text", ""), action.get("cps", 0), action.get("chunk", 16), delay))
+        elif is_wait_action(action):
+            steps.append(WaitStep(action.get("cond", "exists"), action.get("pattern", ""),
+                                  action.get("timeout", 10000) / 1000.0, action.get("on_timeout", "continue"), delay))
+        elif is_trail_action(action):
+            # 简化后的顶点按 hz 重采样为回放点，终点即点击位置
+            points, offsets = resample_trail(action.get("points", []), action.get("hz", SAMPLE_HZ))
+            x, y = (int(v) for v in points[-1])
+            steps.append(MouseStep(action.get("button", "left"), action.get("click", "move"),
+                                   x, y, points, offsets, delay))
+            last_pos = (x, y)
+        elif is_mouse_action(action):
+            x, y = int(action.get("x", 0)), int(action.get("y", 0))
+            start = tuple(action.get("from") or last_pos or (x, y))
+            kind, duration = action.get("path", "none"), action.get("duration", 0)
+            seed = action.get("seed")
+            if seed is None: seed = _path_seed(start, (x, y), kind, duration)
+            points, offsets = build_path(kind, start, (x, y), duration, seed)
+            steps.append(MouseStep(action.get("button", "left"), action.get("click", "click"),
+                                   x, y, points, offsets, delay))
+            last_pos = (x, y)
+        else:
+            hold = action.get("hold")
+            steps.append(KeyStep(action.get("key"), delay, None if hold is None else hold / 1000.0))
+    return steps, last_pos
+
+
+def iter_plan(steps, start=0):
+    """
+    按执行顺序惰性遍历计划，yield (展开后的序号, 步骤)
+    start 为展开后的起始序号 (断点续跑)，重复块按算术跳过，不逐个展开
+    """
+    return _iter_plan(steps, start, 0)
+
+
+def _iter_plan(steps, skip, base):
+    idx = base
+    for step in steps:
+        if not isinstance(step, RepeatBlock):
+            if skip:
+                skip -= 1
+            else:
+                yield idx, step
+            idx += 1
+            continue
+        if skip >= step.size:
+            skip -= step.size
+            idx += step.size
+            continue
+        first, skip = divmod(skip, step.body_size)
+        idx += first * step.body_size
+        for _ in range(first, step.count):
+            yield from _iter_plan(step.steps, skip, idx)
+            idx += step.body_size
+            skip = 0
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# 常驻的分阶段计时 (每次测量只是两次 perf_counter + 一次列表累加)
+PH_SEND, PH_WINDOW, PH_LOG, PH_SLEEP = range(4)
+PHASE_NAMES = ("send", "window", "log", "sleep")
+PHASE_LABELS = ("发送", "窗口检查", "日志", "睡眠")
+
+
+class PhaseTimer:
+    """按阶段累计执行线程耗时，未覆盖的部分计为 other"""
+
+    def __init__(self):
+        self.totals = [0.0] * len(PHASE_NAMES)
+        self.counts = [0] * len(PHASE_NAMES)
+        self.wall = 0.0
+        self._start = 0.0
+
+    def begin(self):
+        self.totals = [0.0] * len(PHASE_NAMES)
+        self.counts = [0] * len(PHASE_NAMES)
+        self.wall = 0.0
+        self._start = time.perf_counter()
+
+    def end(self):
+        self.wall = time.perf_counter() - self._start
+
+    def add(self, phase, seconds):
+        self.totals[phase] += seconds
+        self.counts[phase] += 1
+
+    def elapsed(self):
+        return self.wall or (time.perf_counter() - self._start if self._start else 0.0)
+
+    def breakdown(self):
+        """[(阶段名, 秒, 次数)]，最后一项为 other"""
+        rows = [(name, self.totals[i], self.counts[i]) for i, name in enumerate(PHASE_NAMES)]
+        rows.append(("other", max(0.0, self.elapsed() - sum(self.totals)), 0))
+        return rows
+
+    def summary(self):
+        wall = self.elapsed() or 1e-9
+        labels = PHASE_LABELS + ("其他",)
+        parts = [f"{labels[i]} {sec / wall:.1%}" for i, (_, sec, _) in enumerate(self.breakdown())]
+        return f"⏱️ 耗时分布 ({wall:.2f}s): " + " | ".join(parts)
+
+
+class SamplingProfiler:
+    """
+    采样式分析器: 独立线程按固定间隔读取目标线程的调用栈
+    目标线程不做任何插桩；采样自身的耗时单独统计，用于评估结果可信度
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.busy = 0.0
+        self.wall = 0.0
+        self._target = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, thread_ident):
+        self.stacks.clear()
+        self.samples = 0
+        self.busy = 0.0
+        self._target = thread_ident
+        self._stop.clear()
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """可重复调用，已停止时为空操作"""
+        if not self._thread: return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.wall = time.perf_counter() - self._t0
+
+    @property
+    def overhead(self):
+        """采样占用的时间比例 (采样期间持有 GIL，目标线程同样被阻塞)"""
+        return self.busy / self.wall if self.wall else 0.0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            t = time.perf_counter()
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            self.samples += 1
+            self.busy += time.perf_counter() - t
+
+    def function_stats(self):
+        """每个函数的 (自身样本数, 累计样本数)"""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += n
+            for f in set(frames):
+                total_counts[f] += n
+        return self_counts, total_counts
+
+    def dump(self, directory, prefix, phases=None, top=30):
+        """
+        写出 <prefix>.collapsed (flamegraph.pl / speedscope 可直接读取) 与 <prefix>.txt 摘要
+        返回摘要文件路径
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, prefix)
+        with open(base + ".collapsed", 'w', encoding='utf-8') as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+        self_counts, total_counts = self.function_stats()
+        total = self.samples or 1
+        lines = [
+            f"samples: {self.samples}  interval: {self.interval * 1000:.1f} ms  wall: {self.wall:.3f} s",
+            f"profiler overhead: {self.busy * 1000:.1f} ms ({self.overhead:.2%} of wall time)",
+            "",
+        ]
+        if phases is not None:
+            lines.append("phase breakdown (always-on timers):")
+            wall = phases.elapsed() or 1e-9
+            for name, sec, count in phases.breakdown():
+                lines.append(f"  {name:<8} {sec:10.3f} s  {sec / wall:7.2%}  calls={count}")
+            lines.append("")
+        lines.append(f"{'self%':>7} {'total%':>7}  function")
+        for func, n in self_counts.most_common(top):
+            lines.append(f"{n / total:7.2%} {total_counts[func] / total:7.2%}  {func}")
+        with open(base + ".txt", 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        return base + ".txt"
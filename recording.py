@@ -0,0 +1,70 @@
+import numpy as np
+from mouse_path import simplify_trail, trail_error, SAMPLE_HZ
+
+# 轨迹简化的默认容差 (像素)
+DEFAULT_TOLERANCE = 1.0
+
+
+class TrailReport:
+    """一次录制的后处理统计: 压缩比与回放时的最大位置误差"""
+
+    def __init__(self, raw_points, kept_points, max_error, clicks, tolerance):
+        self.raw_points = raw_points
+        self.kept_points = kept_points
+        self.max_error = max_error
+        self.clicks = clicks
+        self.tolerance = tolerance
+
+    @property
+    def ratio(self):
+        return self.raw_points / self.kept_points if self.kept_points else 1.0
+
+    def summary(self):
+        return (f"🗜️ 轨迹简化: {self.raw_points} 点 -> {self.kept_points} 点 (压缩 {self.ratio:.1f}x), "
+                f"最大误差 {self.max_error:.2f} px (容差 {self.tolerance:g} px), 点击 {self.clicks} 次")
+
+
+def process_recording(moves, clicks=(), tolerance=DEFAULT_TOLERANCE, hz=SAMPLE_HZ):
+    """
+    录制结果后处理 (鼠标钩子产生的原始事件 -> 精简的 trail 动作)
+    moves: [(t_ms, x, y)] 原始移动事件; clicks: [(t_ms, x, y, button, double)]
+    整条轨迹一次性做 RDP 简化 (点击位置强制保留)，再在点击处切分:
+    每段生成一个 trail 动作，终点即点击位置，时间偏移相对上一次点击，点击时刻与位置不做任何近似
+    返回 (actions, TrailReport)
+    """
+    moves = np.asarray(moves, dtype=np.float64).reshape(-1, 3)
+    clicks = sorted(clicks, key=lambda c: c[0])
+    click_arr = np.asarray([c[:3] for c in clicks], dtype=np.float64).reshape(-1, 3)
+    # 点击也作为轨迹点; 稳定排序保证同一时刻的点击排在移动之后
+    merged = np.concatenate([moves, click_arr])
+    order = np.argsort(merged[:, 0], kind='stable')
+    merged = merged[order]
+    click_pos = np.flatnonzero(order >= len(moves))
+    if not len(merged):
+        return [], TrailReport(0, 0, 0.0, 0, tolerance)
+
+    t, xy = merged[:, 0], merged[:, 1:]
+    kept = simplify_trail(xy, t, tolerance, keep=click_pos)
+    error = trail_error(xy, t, kept)
+
+    actions = []
+    bounds = list(click_pos)
+    if not bounds or bounds[-1] != len(merged) - 1:
+        # 最后一次点击之后仍有移动: 末段只移动不点击
+        bounds.append(len(merged) - 1)
+    start = 0
+    stored = 0
+    for k, end in enumerate(bounds):
+        idx = kept[(kept >= start) & (kept <= end)]
+        seg = merged[idx]
+        points = [[int(round(x)), int(round(y)), int(round(ts - seg[0, 0]))] for ts, x, y in seg.tolist()]
+        action = {"type": "trail", "points": points, "hz": hz, "delay": 0}
+        if k < len(clicks):
+            _, _, _, button, double = clicks[k]
+            action.update(button=button, click="double" if double else "click")
+        else:
+            action["click"] = "move"
+        actions.append(action)
+        stored += len(points)
+        start = end
+    return actions, TrailReport(len(moves), stored, error, len(clicks), tolerance)
@@ -0,0 +1,260 @@
+import math
+import time
+import heapq
+import random
+import datetime
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# 错过的触发 (程序未运行 / 系统休眠) 的处理: skip 直接跳过，once 补跑一次
+MISSED_POLICIES = ("skip", "once")
+# 触发时上一次运行仍未结束: skip 放弃本次，queue 排队等结束后运行，restart 停止当前运行后重新开始
+OVERLAP_POLICIES = ("skip", "queue", "restart")
+# 计时器单次最长等待 (秒)；Qt 定时器间隔为 int 毫秒，且长时间等待后需按墙钟重新对齐
+MAX_WAIT = 3600
+# 晚于计划时刻超过该值 (秒) 视为错过
+LATE_GRACE = 60
+# 统计错过次数的上限 (每分钟触发的 cron 停机数月时不逐个数完)
+MAX_MISSED = 9999
+
+
+class CronSpec:
+    """5 段 cron 表达式 (分 时 日 月 周)，支持 * , - /；周日为 0 或 7"""
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要 5 段: {expr}")
+        parsed = [self._parse(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        # 日与周同时受限时满足其一即可 (与标准 cron 一致)
+        self.day_any = fields[2] == "*"
+        self.weekday_any = fields[4] == "*"
+        self.expr = expr
+        # 永不匹配的表达式 (如 2 月 30 日) 在解析时就报错，而不是等到排期时
+        self.next_after(datetime.datetime.now())
+
+    @staticmethod
+    def _parse(field, lo, hi):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1: raise ValueError(f"步长无效: {field}")
+            if part == '*':
+                start, end = lo, hi
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-', 1))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if not (lo <= start <= end <= hi):
+                raise ValueError(f"取值超出范围 {lo}-{hi}: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt):
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.day_any: return dow
+        if self.weekday_any: return dom
+        return dom or dow
+
+    def next_after(self, dt):
+        """dt 之后 (不含) 的下一个触发时刻 (本地时间，精确到分钟)"""
+        dt = dt.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        # 逐级跳过不匹配的月 / 日 / 时 / 分; 上限约 5 年，防止永不匹配的表达式 (如 2 月 30 日) 死循环
+        limit = dt + datetime.timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + datetime.timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += datetime.timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"cron 表达式没有可触发的时间: {self.expr}")
+
+
+class Trigger:
+    """
+    一个定时触发器 (对应配置 triggers 中的一项):
+    {"name", "macro" (宏名，空为当前配置), "cron" | "at" ("HH:MM") | "interval" (秒),
+     "jitter" (秒), "missed", "overlap", "enabled", "last_run" (时间戳)}
+    """
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError(f"触发器需要是对象: {spec!r}")
+        self.name = spec.get("name") or spec.get("macro") or "当前配置"
+        self.macro = spec.get("macro", "")
+        if not isinstance(self.name, str) or not isinstance(self.macro, str):
+            raise ValueError(f"{self.name}: name / macro 必须是字符串")
+        self.jitter = max(0.0, self._number(spec, "jitter", 0))
+        self.missed = spec.get("missed", "skip")
+        self.overlap = spec.get("overlap", "skip")
+        self.enabled = spec.get("enabled", True)
+        if not isinstance(self.enabled, bool):
+            raise ValueError(f"{self.name}: enabled 必须是 true / false: {self.enabled!r}")
+        self.last_run = spec.get("last_run")
+        if self.last_run is not None: self.last_run = self._number(spec, "last_run")
+        self.cron = None
+        self.interval = 0.0
+        if self.missed not in MISSED_POLICIES:
+            raise ValueError(f"{self.name}: missed 只能是 {'/'.join(MISSED_POLICIES)}")
+        if self.overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"{self.name}: overlap 只能是 {'/'.join(OVERLAP_POLICIES)}")
+        if "interval" in spec:
+            self.interval = self._number(spec, "interval")
+            if self.interval <= 0: raise ValueError(f"{self.name}: interval 必须大于 0")
+        elif "at" in spec:
+            at = spec["at"]
+            parts = at.split(':') if isinstance(at, str) else ()
+            if len(parts) != 2 or not all(p.strip().isdigit() for p in parts):
+                raise ValueError(f"{self.name}: at 必须是 \"HH:MM\" 格式的字符串: {at!r}")
+            hour, minute = (int(v) for v in parts)
+            self.cron = CronSpec(f"{minute} {hour} * * *")
+        elif "cron" in spec:
+            if not isinstance(spec["cron"], str):
+                raise ValueError(f"{self.name}: cron 必须是字符串: {spec['cron']!r}")
+            self.cron = CronSpec(spec["cron"])
+        else:
+            raise ValueError(f"{self.name}: 需要 cron / at / interval 之一")
+        self.spec = dict(spec)
+        # 当前计划的基准时刻 (不含抖动)
+        self.base = None
+
+    def _number(self, spec, field, default=None):
+        value = spec.get(field, default)
+        # bool 是 int 的子类，这里不接受
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{self.name}: {field} 必须是数字: {value!r}")
+        return float(value)
+
+    def next_base(self, after, anchor=None):
+        """after 之后的下一个基准时刻 (时间戳); 间隔触发器以 anchor 为相位起点"""
+        if self.cron:
+            return self.cron.next_after(datetime.datetime.fromtimestamp(after)).timestamp()
+        if anchor is None:
+            return after + self.interval
+        periods = max(1, int((after - anchor) // self.interval) + 1)
+        return anchor + periods * self.interval
+
+    def missed_between(self, first, now):
+        """
+        从基准时刻 first (含) 起已超出宽限期的触发次数，即落在 [first, now - LATE_GRACE) 内的计划时刻数
+        (至少 1，至多 MAX_MISSED)；与 _schedule_initial 一致，恰好在宽限期边界上的不算错过
+        """
+        if self.interval:
+            return int(min(MAX_MISSED, max(1, math.ceil((now - LATE_GRACE - first) / self.interval))))
+        count, base = 1, first
+        while count < MAX_MISSED:
+            base = self.next_base(base)
+            if base + LATE_GRACE >= now: break
+            count += 1
+        return count
+
+    def to_spec(self):
+        spec = dict(self.spec)
+        if self.last_run is not None: spec["last_run"] = round(self.last_run, 3)
+        return spec
+
+
+class TriggerScheduler(QObject):
+    """
+    定时触发调度: 所有触发器放在一个最小堆中，单个 QTimer 睡到最近的触发时刻，不轮询
+    只依赖 GUI 线程的事件循环，与主界面是否存在 (精简托盘模式) 无关
+    """
+    sig_fire = pyqtSignal(object)       # Trigger (last_run 已更新，接收方应立即保存)
+    sig_missed = pyqtSignal(object, int)  # Trigger, 跳过的次数
+
+    def __init__(self, parent=None, clock=time.time, rng=None):
+        super().__init__(parent)
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.triggers = []
+        self._heap = []
+        self._seq = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timer)
+
+    def load(self, specs):
+        """替换全部触发器; 返回 (ok, msg)，解析或排期失败时保留原有计划"""
+        heap, missed = [], []
+        try:
+            triggers = [Trigger(s) for s in specs]
+            now = self.clock()
+            for trig in triggers:
+                if trig.enabled:
+                    self._schedule_initial(heap, missed, trig, now)
+        except (ValueError, TypeError, KeyError) as e:
+            return False, f"定时任务配置无效: {str(e)}"
+        # 全部排期成功后才替换
+        self.triggers = triggers
+        self._heap = heap
+        for trig, count in missed:
+            self.sig_missed.emit(trig, count)
+        self._arm()
+        return True, f"⏰ 已加载 {len([t for t in triggers if t.enabled])} 个定时任务"
+
+    def dump(self):
+        return [t.to_spec() for t in self.triggers]
+
+    def upcoming(self):
+        """[(触发时刻, Trigger)]，按时间排序"""
+        return [(due, trig) for due, _, trig in sorted(self._heap)]
+
+    def stop(self):
+        self._timer.stop()
+        self._heap = []
+
+    def _push(self, heap, trig, base, due=None):
+        trig.base = base
+        if due is None:
+            due = base + (self.rng.uniform(0, trig.jitter) if trig.jitter else 0.0)
+        self._seq += 1
+        heapq.heappush(heap, (due, self._seq, trig))
+
+    def _schedule_initial(self, heap, missed, trig, now):
+        """首次排期放入 heap；程序未运行期间跳过的触发记入 missed [(Trigger, 次数)]"""
+        if trig.last_run is None:
+            self._push(heap, trig, trig.next_base(now))
+            return
+        expected = trig.next_base(trig.last_run, anchor=trig.last_run)
+        if expected + LATE_GRACE >= now:
+            self._push(heap, trig, expected)
+            return
+        # 程序未运行期间错过了触发
+        if trig.missed == "once":
+            self._push(heap, trig, now, now)
+        else:
+            missed.append((trig, trig.missed_between(expected, now)))
+            self._push(heap, trig, trig.next_base(now, anchor=trig.last_run))
+
+    def _arm(self):
+        if not self._heap:
+            self._timer.stop()
+            return
+        delay = min(max(0.0, self._heap[0][0] - self.clock()), MAX_WAIT)
+        self._timer.start(int(delay * 1000))
+
+    def _on_timer(self):
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            due, _, trig = heapq.heappop(self._heap)
+            if now - due > LATE_GRACE and trig.missed == "skip":
+                # 系统休眠等原因导致严重迟到
+                self.sig_missed.emit(trig, trig.missed_between(trig.base, now))
+            else:
+                trig.last_run = now
+                self.sig_fire.emit(trig)
+            anchor = trig.base if trig.interval else None
+            self._push(self._heap, trig, trig.next_base(max(now, trig.base), anchor=anchor))
+        self._arm()
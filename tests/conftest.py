@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 模块平铺在仓库根目录，测试从根目录导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
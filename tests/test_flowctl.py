@@ -0,0 +1,89 @@
+import threading
+import time
+from backend import RealClock, VirtualClock, SlowConsumerBackend
+from config import CheckpointStore
+from executor import TaskExecutor
+from flowctl import FlowController
+
+HWND = 1234
+
+
+def run_virtual(policy, stalls=((1.0, 3.0),), rate=50.0, n=200):
+    clock = VirtualClock()
+    backend = SlowConsumerBackend(clock, rate=rate, stalls=stalls)
+    executor = TaskExecutor(clock, backend, CheckpointStore(None))
+    executor.setup_keyboard([{"key": "a", "delay": 10}] * n, 1, HWND, flow=policy)
+    executor.run()
+    return executor, backend
+
+
+def test_slow_policy_backs_off():
+    _, off = run_virtual("off")
+    executor, slow = run_virtual("slow")
+    m = executor.metrics
+    assert m.flow_congested_total >= 1
+    assert m.flow_delayed_seconds > 0
+    # 降速后送达延迟明显小于不做流控
+    assert slow.max_delay() < off.max_delay() / 2
+    # 不丢任何按键，按下与抬起成对
+    kinds = [ev[1] for ev in slow.events]
+    assert kinds.count("down") == kinds.count("up") == 200
+
+
+def test_drop_policy_drops_instead_of_waiting():
+    executor, backend = run_virtual("drop")
+    assert executor.metrics.flow_dropped_total > 0
+    kinds = [ev[1] for ev in backend.events]
+    assert kinds.count("down") == kinds.count("up")
+
+
+class ThreadedSlowConsumer(SlowConsumerBackend):
+    """真实时钟下的慢速窗口: 探测按积压真实阻塞，并记录在哪个线程执行"""
+    probe_blocks = True
+
+    def __init__(self, clock, **kwargs):
+        super().__init__(clock, **kwargs)
+        self.probe_threads = set()
+
+    def probe(self, hwnd, timeout):
+        self.probe_threads.add(threading.get_ident())
+        now = self.clock.now() - self.t0
+        latency = self._serve_from(max(now, self._busy_until)) - now
+        time.sleep(min(latency, timeout))
+        return latency if latency <= timeout else None
+
+
+def test_probes_run_off_executor_thread_and_sends_back_off():
+    # 探测间隔 0.2 秒且结果晚一个间隔生效，运行需持续数个间隔
+    backend = ThreadedSlowConsumer(RealClock, rate=100.0, stalls=((0.2, 0.8),))
+    executor = TaskExecutor(RealClock, backend, CheckpointStore(None))
+    executor.setup_keyboard([{"key": "a", "delay": 5}] * 300, 1, HWND, flow="slow")
+    worker = threading.Thread(target=executor.run)
+    worker.start()
+    # 降速后跑完需要很久，观察到拥塞所需的时间后停止
+    time.sleep(1.5)
+    executor.stop()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert backend.probe_threads
+    assert worker.ident not in backend.probe_threads
+    m = executor.metrics
+    assert m.flow_congested_total >= 1
+    assert m.flow_delayed_seconds > 0
+    # 运行结束后探测线程退出
+    assert executor.flow._worker is None
+
+
+def test_background_probe_applies_previous_result():
+    results = iter([0.5, 0.001])
+    flow = FlowController("slow", lambda hwnd, timeout: next(results), background=True)
+    # 首次到期只发起探测
+    assert flow.run_probe(HWND, 0.0) is None
+    deadline = time.monotonic() + 2.0
+    changed = None
+    while changed is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+        changed = flow.run_probe(HWND, 0.0)
+    flow.close()
+    assert changed is True
+    assert flow.congested and flow.pace > 0
@@ -0,0 +1,82 @@
+import threading
+import time
+from backend import RealClock, NullBackend
+from config import CheckpointStore
+from executor import TaskExecutor
+from winwatch import WindowWatcher, FakeEventSource
+
+
+def make_watcher():
+    source = FakeEventSource()
+    watcher = WindowWatcher(source)
+    watcher.start()
+    return source, watcher
+
+
+def test_scripted_events_update_state():
+    source, watcher = make_watcher()
+    notified = []
+    watcher.subscribe(lambda: notified.append(watcher.version))
+
+    assert not watcher.check("exists", "记事本", 0)
+    source.set_window(10, "无标题 - 记事本")
+    assert watcher.check("exists", "记事本", 0)
+    assert not watcher.check("foreground", "记事本", 0)
+    source.set_foreground(10)
+    assert watcher.check("foreground", "记事本", 0)
+    assert watcher.check("title", r"记事本$", 10)
+    source.set_hung(10)
+    assert not watcher.check("responding", "", 10)
+    source.set_hung(10, False)
+    assert watcher.check("responding", "", 10)
+    source.remove_window(10)
+    assert not watcher.check("exists", "记事本", 0)
+    assert source.foreground() == 0
+    # 每个事件恰好通知一次
+    assert notified == [1, 2, 3, 4, 5]
+
+
+def test_unsubscribed_callback_not_called():
+    source, watcher = make_watcher()
+    calls = []
+    callback = lambda: calls.append(1)
+    watcher.subscribe(callback)
+    source.set_window(1)
+    watcher.unsubscribe(callback)
+    source.set_window(2)
+    assert calls == [1]
+    assert watcher.version == 2
+
+
+def run_wait(source_script, action):
+    """在执行线程中运行一个只含等待步骤的宏，同时在另一线程按脚本产生窗口事件"""
+    source, watcher = make_watcher()
+    executor = TaskExecutor(RealClock, NullBackend(RealClock), CheckpointStore(None))
+    executor.watcher = watcher
+    executor.setup_keyboard([action, {"key": "a", "delay": 0}], 1, 0)
+    script = threading.Thread(target=source_script, args=(source,))
+    script.start()
+    t = time.perf_counter()
+    executor.run()
+    script.join()
+    return executor, time.perf_counter() - t
+
+
+def test_wait_step_released_by_event():
+    def script(source):
+        time.sleep(0.05)
+        source.set_window(7, "目标窗口")
+
+    executor, elapsed = run_wait(script, {"type": "wait", "cond": "exists", "pattern": "目标", "timeout": 5000, "delay": 0})
+    assert executor.last_run["outcome"] == "completed"
+    assert executor.last_run["sends"] == 1
+    assert elapsed < 2.0
+
+
+def test_wait_step_timeout_stops_run():
+    executor, elapsed = run_wait(lambda source: source.set_window(7, "其他窗口"),
+                                 {"type": "wait", "cond": "exists", "pattern": "目标", "timeout": 100,
+                                  "on_timeout": "stop", "delay": 0})
+    assert executor.last_run["outcome"] == "wait_timeout"
+    assert executor.last_run["sends"] == 0
+    assert elapsed < 2.0
@@ -0,0 +1,89 @@
+import ctypes
+from ctypes import wintypes
+from functools import lru_cache
+
+# SendInput 结构 (仅定义布局，不依赖 Windows，便于在其他平台构造/校验)
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _INPUTUNION(ctypes.Union):
+    # 联合体大小需按最大成员 (MOUSEINPUT) 计算，否则 SendInput 会因 cbSize 不符而失败
+    _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+
+class INPUT(ctypes.Structure):
+    _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+
+def normalize_text(text):
+    """统一换行: \\r\\n / \\n -> \\r (编辑框与游戏聊天框都以回车换行)"""
+    return text.replace("\r\n", "\r").replace("\n", "\r")
+
+
+@lru_cache(maxsize=256)
+def encode_units(text):
+    """文本 -> UTF-16 码元 (BMP 以外的字符拆成代理对，WM_CHAR / SendInput 均按码元发送)"""
+    data = normalize_text(text).encode("utf-16-le")
+    return tuple(int.from_bytes(data[i:i + 2], "little") for i in range(0, len(data), 2))
+
+
+@lru_cache(maxsize=256)
+def chunk_units(text, chunk):
+    """按块切分码元; 代理对不会被拆到两个块中"""
+    units = encode_units(text)
+    chunk = max(1, chunk)
+    chunks = []
+    i = 0
+    while i < len(units):
+        end = min(i + chunk, len(units))
+        if end < len(units) and 0xD800 <= units[end - 1] <= 0xDBFF:
+            end += 1
+        chunks.append(units[i:end])
+        i = end
+    return tuple(chunks)
+
+
+def chunk_offsets(chunks, cps):
+    """每块的发送时刻 (相对起点的秒数); cps<=0 表示不限速"""
+    offsets = []
+    t = 0.0
+    for c in chunks:
+        offsets.append(t)
+        if cps > 0:
+            t += len(c) / cps
+    return tuple(offsets)
+
+
+def build_input_batch(units):
+    """构造一次 SendInput 调用所需的 INPUT 数组 (每个码元按下 + 抬起)"""
+    batch = (INPUT * (len(units) * 2))()
+    for i, unit in enumerate(units):
+        for j, flags in enumerate((KEYEVENTF_UNICODE, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)):
+            item = batch[i * 2 + j]
+            item.type = INPUT_KEYBOARD
+            item.u.ki.wScan = unit
+            item.u.ki.dwFlags = flags
+    return batch
+
+
+@lru_cache(maxsize=64)
+def encode_text(text, cps, chunk):
+    """
+    编译文本动作，结果按 (text, cps, chunk) 缓存
+    返回 (码元块, 发送时刻, SendInput 批次)
+    """
+    chunks = chunk_units(text, chunk)
+    batches = tuple(build_input_batch(c) for c in chunks)
+    return chunks, chunk_offsets(chunks, cps), batches
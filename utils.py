@@ -1,6 +1,13 @@
-import win32gui
-import win32con
-import win32api
+import time
+import ctypes
+from ctypes import wintypes
+try:
+    import win32gui
+    import win32con
+    import win32api
+except ImportError:
+    # 非 Windows (模拟运行 / 计时校准): 仅按键表、文本格式化等不调用系统接口的部分可用
+    win32gui = win32con = win32api = None
 from PyQt6.QtGui import QPixmap, QPainter, QColor, QLinearGradient, QBrush, QFont, QPen
 from PyQt6.QtCore import Qt, QRect
 
@@ -15,12 +22,88 @@ class WindowMgr:
         titles.sort(key=lambda x: x[1])
         return titles
 
+    @staticmethod
+    def find_window(pattern):
+        """按标题查找可见窗口 (先精确匹配，再不区分大小写的子串匹配)"""
+        wins = WindowMgr.get_window_list()
+        for hwnd, title in wins:
+            if title == pattern:
+                return hwnd, title
+        needle = pattern.lower()
+        for hwnd, title in wins:
+            if needle in title.lower():
+                return hwnd, title
+        return None
+
+    @staticmethod
+    def get_window_title(hwnd):
+        """窗口已关闭时返回空字符串"""
+        try:
+            return win32gui.GetWindowText(hwnd) if hwnd and win32gui.IsWindow(hwnd) else ""
+        except Exception:
+            return ""
+
     @staticmethod
     def get_foreground_window_info():
         hwnd = win32gui.GetForegroundWindow()
         title = win32gui.GetWindowText(hwnd)
         return hwnd, title
 
+class ClientRectCache:
+    """窗口客户区矩形缓存 (屏幕坐标)，窗口移动/缩放时由 WinEvent 钩子失效"""
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+
+    _cache = {}
+    _hook = None
+    _proc = None
+
+    @classmethod
+    def get(cls, hwnd):
+        """返回 (left, top, width, height)"""
+        rect = cls._cache.get(hwnd)
+        if rect is None:
+            left, top, right, bottom = win32gui.GetClientRect(hwnd)
+            sx, sy = win32gui.ClientToScreen(hwnd, (left, top))
+            rect = (sx, sy, right - left, bottom - top)
+            cls._cache[hwnd] = rect
+        return rect
+
+    @classmethod
+    def invalidate(cls, hwnd=None):
+        if hwnd is None:
+            cls._cache.clear()
+        else:
+            cls._cache.pop(hwnd, None)
+
+    @classmethod
+    def install_hook(cls):
+        """需在有消息循环的线程 (GUI 主线程) 中调用"""
+        if cls._hook: return
+        proc_type = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def _on_location_change(hook, event, hwnd, id_object, id_child, thread, ms):
+            # 光标移动也会触发此事件，只关心窗口本身
+            if id_object == cls.OBJID_WINDOW and hwnd in cls._cache:
+                cls._cache.pop(hwnd, None)
+
+        # 保留回调引用，防止被 GC 回收
+        cls._proc = proc_type(_on_location_change)
+        cls._hook = ctypes.windll.user32.SetWinEventHook(
+            cls.EVENT_OBJECT_LOCATIONCHANGE, cls.EVENT_OBJECT_LOCATIONCHANGE,
+            0, cls._proc, 0, 0, cls.WINEVENT_OUTOFCONTEXT)
+
+    @classmethod
+    def uninstall_hook(cls):
+        if cls._hook:
+            ctypes.windll.user32.UnhookWinEvent(cls._hook)
+            cls._hook = None
+            cls._proc = None
+        cls._cache.clear()
+
 class BackgroundInput:    
     # 扩充常用的虚拟键码映射
     VK_MAP = {
@@ -53,8 +136,9 @@ class BackgroundInput:
         key_lower = key_str.lower().strip()
         vk_code = BackgroundInput.VK_MAP.get(key_lower)
         
-        # 尝试解析单字符 (如果是未映射的字母/数字)
-        if not vk_code and len(key_str) == 1:
+        # 只有 ASCII 字母/数字的码位与虚拟键码一致; 其他字符 (中文、标点) 返回 None，由调用方投递 WM_CHAR
+        # (例如 ord(',') == 0x2C 是 VK_SNAPSHOT，ord('中') 不是任何按键)
+        if not vk_code and len(key_str) == 1 and key_str.isascii() and key_str.isalnum():
             vk_code = ord(key_str.upper())
         
         return vk_code
@@ -72,7 +156,164 @@ class BackgroundInput:
             # lParam 设置为 0xC0000000 表示 keyup
             win32api.PostMessage(hwnd, win32con.WM_KEYUP, vk_code, 0xC0000000)
 
+    @staticmethod
+    def post_chars(hwnd, units):
+        """批量投递 WM_CHAR (UTF-16 码元，支持中文等非 ASCII 字符)"""
+        post = win32api.PostMessage
+        for unit in units:
+            post(hwnd, win32con.WM_CHAR, unit, 1)
+
+    # 鼠标消息: (按下消息, 抬起消息, wParam 按键标志)
+    # WM_LBUTTONDOWN / WM_LBUTTONUP / MK_LBUTTON, WM_RBUTTONDOWN / WM_RBUTTONUP / MK_RBUTTON
+    MOUSE_MSG = {
+        'left': (0x0201, 0x0202, 0x0001),
+        'right': (0x0204, 0x0205, 0x0002),
+    }
+
+    @staticmethod
+    def make_lparam(x, y):
+        return ((y & 0xFFFF) << 16) | (x & 0xFFFF)
+
+    @staticmethod
+    def mouse_move(hwnd, lparam):
+        """移动消息 (lParam 为预先打包的客户区坐标)"""
+        win32api.PostMessage(hwnd, win32con.WM_MOUSEMOVE, 0, lparam)
+
+    @staticmethod
+    def mouse_click(hwnd, button, lparam, double=False):
+        """在客户区坐标处发送一次 (或两次) 完整点击"""
+        msg_down, msg_up, mk = BackgroundInput.MOUSE_MSG[button]
+        for _ in range(2 if double else 1):
+            win32api.PostMessage(hwnd, msg_down, mk, lparam)
+            win32api.PostMessage(hwnd, msg_up, 0, lparam)
+
+    SMTO_ABORTIFHUNG = 0x0002
+
+    @staticmethod
+    def probe(hwnd, timeout):
+        """
+        同步发送 WM_NULL，返回目标线程处理完毕的往返耗时 (秒)
+        超时或窗口已挂起时返回 None
+        """
+        result = ctypes.c_size_t()
+        t = time.perf_counter()
+        ok = ctypes.windll.user32.SendMessageTimeoutW(
+            hwnd, win32con.WM_NULL, 0, 0, BackgroundInput.SMTO_ABORTIFHUNG,
+            max(1, int(timeout * 1000)), ctypes.byref(result))
+        return time.perf_counter() - t if ok else None
+
+class ForegroundInput:
+    """前台鼠标输入 (真实光标)"""
+    MOUSE_FLAGS = {
+        'left': (0x0002, 0x0004),   # MOUSEEVENTF_LEFTDOWN / LEFTUP
+        'right': (0x0008, 0x0010),  # MOUSEEVENTF_RIGHTDOWN / RIGHTUP
+    }
+
+    @staticmethod
+    def mouse_move(x, y):
+        win32api.SetCursorPos((x, y))
+
+    @staticmethod
+    def send_input(batch):
+        """一次 SendInput 调用发出整批 INPUT (由 textinput.build_input_batch 预先构造)"""
+        sent = ctypes.windll.user32.SendInput(len(batch), batch, ctypes.sizeof(batch._type_))
+        if sent != len(batch):
+            raise OSError(f"SendInput 仅发送 {sent}/{len(batch)} 个事件")
+
+    @staticmethod
+    def mouse_click(button, double=False):
+        """在当前光标位置点击"""
+        flag_down, flag_up = ForegroundInput.MOUSE_FLAGS[button]
+        for _ in range(2 if double else 1):
+            ctypes.windll.user32.mouse_event(flag_down, 0, 0, 0, 0)
+            ctypes.windll.user32.mouse_event(flag_up, 0, 0, 0, 0)
+
+class MemoryUtils:
+    """当前进程内存 (工作集) 查询与回收"""
+
+    class PROCESS_MEMORY_COUNTERS_EX(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+                    ("PrivateUsage", ctypes.c_size_t)]
+
+    @staticmethod
+    def get_usage():
+        """
+        (工作集, 私有字节) (字节)，获取失败返回 (0, 0)
+        工作集会被 trim_working_set 暂时压低，私有字节才反映进程实际占用的内存
+        """
+        counters = MemoryUtils.PROCESS_MEMORY_COUNTERS_EX()
+        counters.cb = ctypes.sizeof(counters)
+        try:
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize, counters.PrivateUsage
+        except Exception:
+            pass
+        return 0, 0
+
+    @staticmethod
+    def get_rss():
+        """工作集大小 (字节)，获取失败返回 0"""
+        return MemoryUtils.get_usage()[0]
+
+    @staticmethod
+    def trim_working_set():
+        """把已释放的页交还系统 (对应的内存在下次访问时再按需调入)"""
+        try:
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            ctypes.windll.kernel32.SetProcessWorkingSetSize(handle, ctypes.c_size_t(-1), ctypes.c_size_t(-1))
+        except Exception:
+            pass
+
 class TextUtils:
+    MOUSE_BUTTON_TEXT = {"left": "左键", "right": "右键"}
+    MOUSE_CLICK_TEXT = {"click": "单击", "double": "双击", "move": "移动"}
+    MOUSE_PATH_TEXT = {"none": "瞬移", "linear": "直线", "bezier": "曲线", "jitter": "抖动"}
+    WAIT_COND_TEXT = {"exists": "窗口存在", "foreground": "成为前台", "title": "标题匹配", "responding": "恢复响应"}
+
+    @staticmethod
+    def format_wait_text(cond, pattern, timeout):
+        """等待条件描述; timeout 为秒，0 表示不限"""
+        target = f" '{pattern}'" if pattern else ""
+        limit = f"≤{timeout:g}s" if timeout > 0 else "不限时"
+        return f"{TextUtils.WAIT_COND_TEXT.get(cond, cond)}{target} ({limit})"
+
+    @staticmethod
+    def format_action_text(action):
+        """表格中显示的动作描述"""
+        if action.get("type") == "repeat":
+            inner = action.get("actions", [])
+            preview = ", ".join(TextUtils.format_action_text(a) for a in inner[:3])
+            if len(inner) > 3: preview += ", ..."
+            return f"🔁 重复 ×{action.get('count', 1)} [{preview}]"
+        if action.get("type") == "text":
+            text = action.get("text", "").replace("\n", "⏎")
+            preview = text if len(text) <= 12 else text[:12] + "…"
+            cps = action.get("cps", 0)
+            return f"⌨️ 文本: {preview} ({len(action.get('text', ''))} 字, {f'{cps} 字/秒' if cps else '不限速'})"
+        if action.get("type") == "wait":
+            text = TextUtils.format_wait_text(action.get("cond", "exists"), action.get("pattern", ""),
+                                              action.get("timeout", 10000) / 1000.0)
+            return f"⏳ 等待: {text}"
+        if action.get("type") == "trail":
+            points = action.get("points") or [[0, 0, 0]]
+            x, y, t_ms = points[-1]
+            btn = TextUtils.MOUSE_BUTTON_TEXT.get(action.get("button", "left"), "")
+            click = TextUtils.MOUSE_CLICK_TEXT.get(action.get("click", "move"), "")
+            if action.get("click", "move") == "move": btn = ""
+            return f"〰️ 录制轨迹 {btn}{click} ({x}, {y}) · {len(points)} 点 / {t_ms} ms"
+        if action.get("type") != "mouse":
+            return TextUtils.format_key_text(action.get("key"))
+        btn = TextUtils.MOUSE_BUTTON_TEXT.get(action.get("button", "left"), "")
+        click = TextUtils.MOUSE_CLICK_TEXT.get(action.get("click", "click"), "")
+        path = TextUtils.MOUSE_PATH_TEXT.get(action.get("path", "none"), "")
+        if action.get("click") == "move": btn = ""
+        return f"🖱️ {btn}{click} ({action.get('x', 0)}, {action.get('y', 0)}) · {path}"
+
     @staticmethod
     def format_key_text(key_str):
         if not key_str: return ""
@@ -0,0 +1,26 @@
+import keyboard
+import win32gui
+from utils import BackgroundInput, ForegroundInput, ClientRectCache
+
+
+class Win32Backend:
+    """真实输入: 前台走 keyboard 库 / SetCursorPos / SendInput，后台走 PostMessage"""
+    is_window = staticmethod(win32gui.IsWindow)
+    send_key = staticmethod(keyboard.send)
+    press_key = staticmethod(keyboard.press)
+    release_key = staticmethod(keyboard.release)
+    key_down = staticmethod(BackgroundInput.key_down)
+    key_up = staticmethod(BackgroundInput.key_up)
+    post_chars = staticmethod(BackgroundInput.post_chars)
+    mouse_move = staticmethod(BackgroundInput.mouse_move)
+    mouse_click = staticmethod(BackgroundInput.mouse_click)
+    cursor_move = staticmethod(ForegroundInput.mouse_move)
+    cursor_click = staticmethod(ForegroundInput.mouse_click)
+    send_input = staticmethod(ForegroundInput.send_input)
+    probe = staticmethod(BackgroundInput.probe)
+    # 探测为同步 SendMessageTimeout，放到后台线程执行，不阻塞执行线程
+    probe_blocks = True
+
+    @staticmethod
+    def client_size(hwnd):
+        return ClientRectCache.get(hwnd)[2:]
@@ -0,0 +1,218 @@
+import re
+import ctypes
+import threading
+from ctypes import wintypes
+
+# wait_for 条件: 窗口存在 / 成为前台 / 标题匹配 / 恢复响应
+WAIT_CONDS = ("exists", "foreground", "title", "responding")
+
+
+class WindowWatcher:
+    """
+    共享窗口状态监视器: 所有 wait_for 等待共用一个事件源
+    事件源只在窗口状态可能变化时调用 notify()，等待方收到通知后重新求值，不各自轮询
+    """
+
+    def __init__(self, source, poll_interval=0.1):
+        self.source = source
+        # 事件计数 (单调递增)
+        self.version = 0
+        self._subs = []
+        self._lock = threading.Lock()
+        # "未响应" 没有对应的系统事件: 有等待者需要时，由一个共享定时器补发通知
+        self.poll_interval = poll_interval
+        self._pollers = 0
+        self._ticker = None
+        self._ticker_stop = threading.Event()
+
+    def start(self):
+        """安装事件源 (WinEvent 钩子需在有消息循环的 GUI 线程中调用)"""
+        self.source.start(self.notify)
+
+    def stop(self):
+        self.source.stop()
+        self._ticker_stop.set()
+
+    def subscribe(self, callback, poll=False):
+        with self._lock:
+            self._subs.append(callback)
+            if poll:
+                self._pollers += 1
+                if self._ticker is None:
+                    self._ticker_stop.clear()
+                    self._ticker = threading.Thread(target=self._tick, name="WindowWatcherTick", daemon=True)
+                    self._ticker.start()
+
+    def unsubscribe(self, callback, poll=False):
+        with self._lock:
+            if callback in self._subs:
+                self._subs.remove(callback)
+            if poll:
+                self._pollers -= 1
+
+    def notify(self):
+        self.version += 1
+        for callback in list(self._subs):
+            callback()
+
+    def _tick(self):
+        while not self._ticker_stop.wait(self.poll_interval):
+            with self._lock:
+                if self._pollers <= 0:
+                    self._ticker = None
+                    return
+            self.notify()
+        with self._lock:
+            self._ticker = None
+
+    @staticmethod
+    def needs_poll(cond):
+        return cond == "responding"
+
+    def check(self, cond, pattern, hwnd):
+        """
+        求值一次条件; hwnd 为绑定窗口 (0 表示全局模式)
+        pattern: exists/foreground/responding 为窗口标题 (留空表示绑定窗口)，title 为正则
+        """
+        src = self.source
+        if cond == "title":
+            win = hwnd or src.foreground()
+            return bool(win) and re.search(pattern, src.title(win), re.IGNORECASE) is not None
+        target = src.find(pattern) if pattern else hwnd
+        if cond == "exists":
+            if not pattern and not hwnd: return True
+            return bool(target) and src.is_window(target)
+        if not target:
+            # 未指定目标窗口: 有标题时视为尚未出现，全局模式下视为满足
+            return not pattern
+        if cond == "foreground":
+            return src.foreground() == target
+        if cond == "responding":
+            return src.is_window(target) and not src.is_hung(target)
+        raise ValueError(f"未知条件: {cond}")
+
+
+class WinEventSource:
+    """
+    WinEvent 钩子事件源: 前台切换、窗口创建/销毁/显示/隐藏、标题变化
+    pywin32 在用到时才导入，使本模块 (及 FakeEventSource) 在非 Windows 环境下可用
+    """
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+
+    def __init__(self):
+        self._hooks = []
+        self._proc = None
+
+    def start(self, notify):
+        if self._hooks: return
+        proc_type = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def _on_event(hook, event, hwnd, id_object, id_child, thread, ms):
+            # 只关心窗口本身 (控件、光标等对象的事件直接忽略)
+            if id_object == self.OBJID_WINDOW and id_child == 0:
+                notify()
+
+        # 保留回调引用，防止被 GC 回收
+        self._proc = proc_type(_on_event)
+        for lo, hi in ((self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND),
+                       (self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_HIDE),
+                       (self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE)):
+            hook = ctypes.windll.user32.SetWinEventHook(lo, hi, 0, self._proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+            if hook: self._hooks.append(hook)
+
+    def stop(self):
+        for hook in self._hooks:
+            ctypes.windll.user32.UnhookWinEvent(hook)
+        self._hooks = []
+        self._proc = None
+
+    @staticmethod
+    def find(pattern):
+        from utils import WindowMgr
+        found = WindowMgr.find_window(pattern)
+        return found[0] if found else 0
+
+    @staticmethod
+    def is_window(hwnd):
+        import win32gui
+        return bool(win32gui.IsWindow(hwnd))
+
+    @staticmethod
+    def foreground():
+        import win32gui
+        return win32gui.GetForegroundWindow()
+
+    @staticmethod
+    def title(hwnd):
+        import win32gui
+        return win32gui.GetWindowText(hwnd)
+
+    @staticmethod
+    def is_hung(hwnd):
+        return bool(ctypes.windll.user32.IsHungAppWindow(hwnd))
+
+
+class FakeEventSource:
+    """
+    内存中的窗口状态 (测试 / 非 Windows 环境)
+    通过 set_* 方法修改状态，每次修改都会像真实钩子一样触发一次通知
+    """
+
+    def __init__(self):
+        self.windows = {}
+        self.fg = 0
+        self.hung = set()
+        self._notify = None
+
+    def start(self, notify):
+        self._notify = notify
+
+    def stop(self):
+        self._notify = None
+
+    def _fire(self):
+        if self._notify: self._notify()
+
+    def set_window(self, hwnd, title=""):
+        self.windows[hwnd] = title
+        self._fire()
+
+    def remove_window(self, hwnd):
+        self.windows.pop(hwnd, None)
+        self.hung.discard(hwnd)
+        if self.fg == hwnd: self.fg = 0
+        self._fire()
+
+    def set_foreground(self, hwnd):
+        self.fg = hwnd
+        self._fire()
+
+    def set_hung(self, hwnd, hung=True):
+        (self.hung.add if hung else self.hung.discard)(hwnd)
+        self._fire()
+
+    def find(self, pattern):
+        needle = pattern.lower()
+        for hwnd, title in self.windows.items():
+            if title == pattern or needle in title.lower():
+                return hwnd
+        return 0
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def foreground(self):
+        return self.fg
+
+    def title(self, hwnd):
+        return self.windows.get(hwnd, "")
+
+    def is_hung(self, hwnd):
+        return hwnd in self.hung